@@ -0,0 +1,4 @@
+from src import create_app
+from src.assincrono import AplicacaoAsgi
+
+app = AplicacaoAsgi(create_app())
@@ -0,0 +1,4 @@
+"""
+Benchmarks da API. Cada módulo deste pacote pode ser executado através do comando 'python -m benchmarks.<modulo>', a
+partir do diretório raiz do projeto.
+"""
@@ -0,0 +1,365 @@
+"""
+Benchmark de carga das rotas da API (autenticação, pedidos e usuários), com um banco de dados populado com pedidos
+sintéticos. Há dois modos de execução:
+
+- micro: as requisições são feitas sequencialmente através do cliente de testes do Flask, no mesmo processo,
+  medindo também a quantidade de consultas SQL por requisição;
+- macro: a aplicação é executada pelo Gunicorn (com as configurações de 'gunicorn.conf.py') e as requisições são
+  feitas via HTTP por vários clientes simultâneos.
+
+O resultado (latências p50/p95/p99 em milissegundos, vazão, consultas por requisição e pico de memória RSS) é
+impresso em JSON e pode ser salvo com '--saida', permitindo comparar execuções ao longo do tempo.
+
+Uso: python -m benchmarks.api [--pedidos 10000] [--modo micro|macro] [--requisicoes 200] [--concorrencia 8]
+                              [--database-url URL] [--rotas nome,nome] [--saida resultado.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from sqlalchemy import event, func, select
+
+from benchmarks.comum import criar_administrador, criar_aplicacao, popular_banco
+
+# Credenciais do administrador utilizado nas requisições.
+EMAIL = 'benchmark@benchmark.dev'
+SENHA = 'benchmark'
+
+# Acima desta quantidade de pedidos, as rotas que retornam todos os pedidos não são executadas por padrão.
+LIMITE_ROTAS_COMPLETAS = 100000
+
+# Números dos pedidos criados pelo benchmark (individualmente e em lote), acima dos números dos pedidos sintéticos.
+NUMERO_CRIADOS = 1000000000
+NUMERO_LOTE = 1100000000
+
+
+class Contexto:
+    """ Dados compartilhados entre as requisições de uma execução (pedidos existentes e usuários criados). """
+
+    def __init__(self, chaves: list):
+        self.chaves = chaves
+        self.usuarios = []
+        self.trava = threading.Lock()
+
+    def chave(self, indice: int) -> tuple:
+        return self.chaves[indice % len(self.chaves)]
+
+    def usuario(self, indice: int) -> int:
+        with self.trava:
+            return self.usuarios[indice % len(self.usuarios)] if self.usuarios else 1
+
+
+def _pedido(numero: int) -> dict:
+    return {
+        'numero': numero,
+        'tipo': 'RM',
+        'data_chegada': date.today().isoformat(),
+        'secretaria_solicitante': 'BENCHMARK',
+        'projeto': 'BENCHMARK',
+        'descricao': 'Pedido criado pelo benchmark {}'.format(numero),
+    }
+
+
+def _lote_ndjson(indice: int, tamanho: int = 100) -> bytes:
+    inicio = NUMERO_LOTE + indice * tamanho
+    return ''.join(json.dumps(_pedido(inicio + numero)) + '\n' for numero in range(tamanho)).encode()
+
+
+def _chaves_lote(indice: int, tamanho: int = 100) -> list:
+    inicio = NUMERO_LOTE + indice * tamanho
+    return [{'tipo': 'RM', 'numero': inicio + numero} for numero in range(tamanho)]
+
+
+def _usuario_criado(contexto: Contexto, corpo: dict):
+    with contexto.trava:
+        contexto.usuarios.append(corpo['usuario']['id'])
+
+
+# Rotas medidas, na ordem de execução: (nome, função que retorna (método, URI, corpo) a partir do índice da requisição
+# e do contexto, função executada com o corpo JSON de cada resposta, True caso retorne todos os pedidos). As rotas de
+# alteração e exclusão utilizam os registros criados pelas rotas de criação.
+ROTAS = (
+    ('auth_login', lambda i, ctx: ('POST', '/api/auth/login', {'email': EMAIL, 'senha': SENHA}), None, False),
+    ('auth_me', lambda i, ctx: ('POST', '/api/auth/me', None), None, False),
+    ('pedidos_pagina', lambda i, ctx: ('GET', '/api/pedidos?limit=50', None), None, False),
+    ('pedidos_filtro', lambda i, ctx: ('GET', '/api/pedidos?secretaria_solicitante=SAUDE&limit=50', None), None,
+     False),
+    ('pedidos_busca', lambda i, ctx: ('GET', '/api/pedidos?q=notebook&limit=50', None), None, False),
+    ('pedidos_completo', lambda i, ctx: ('GET', '/api/pedidos', None), None, True),
+    ('pedidos_campos', lambda i, ctx: ('GET', '/api/pedidos?fields=tipo,numero,data_chegada', None), None, True),
+    ('pedidos_stream', lambda i, ctx: ('GET', '/api/pedidos?stream=ndjson', None), None, True),
+    ('pedidos_estatisticas', lambda i, ctx: ('GET', '/api/pedidos/stats?agrupar=tipo,secretaria_solicitante,mes', None),
+     None, False),
+    ('pedidos_exportar', lambda i, ctx: ('GET', '/api/pedidos/export?format=csv', None), None, True),
+    ('pedidos_ler', lambda i, ctx: ('GET', '/api/pedidos/{}/{}'.format(*ctx.chave(i)), None), None, False),
+    ('pedidos_criar', lambda i, ctx: ('POST', '/api/pedidos', _pedido(NUMERO_CRIADOS + i)), None, False),
+    ('pedidos_atualizar', lambda i, ctx: ('PATCH', '/api/pedidos/RM/{}'.format(NUMERO_CRIADOS + i),
+                                          {'observacoes': 'alterado'}), None, False),
+    ('pedidos_excluir', lambda i, ctx: ('DELETE', '/api/pedidos/RM/{}'.format(NUMERO_CRIADOS + i), None), None,
+     False),
+    ('pedidos_lote', lambda i, ctx: ('POST', '/api/pedidos/bulk?format=ndjson', _lote_ndjson(i)), None, False),
+    ('pedidos_lote_atualizar', lambda i, ctx: ('PATCH', '/api/pedidos', {
+        'pedidos': _chaves_lote(i), 'alteracoes': {'observacoes': 'alterado'}}), None, False),
+    ('pedidos_lote_excluir', lambda i, ctx: ('DELETE', '/api/pedidos', {'pedidos': _chaves_lote(i)}), None, False),
+    ('usuarios_listar', lambda i, ctx: ('GET', '/api/usuarios', None), None, False),
+    ('usuarios_ler', lambda i, ctx: ('GET', '/api/usuarios/1', None), None, False),
+    ('usuarios_criar', lambda i, ctx: ('POST', '/api/usuarios', {
+        'nome': 'Benchmark {}'.format(i), 'email': 'usuario{}.{}@benchmark.dev'.format(i, time.time_ns()),
+        'senha': 'benchmark'}), _usuario_criado, False),
+    ('usuarios_atualizar', lambda i, ctx: ('PATCH', '/api/usuarios/{}'.format(ctx.usuario(i)), {'nome': 'Alterado'}),
+     None, False),
+    ('usuarios_excluir', lambda i, ctx: ('DELETE', '/api/usuarios/{}'.format(ctx.usuario(i)), None), None, False),
+)
+
+
+def percentil(valores: list, percentual: float) -> float:
+    """
+    Retorna o percentil informado (método do posto mais próximo) de uma lista ordenada de valores.
+    :param valores: list
+    :param percentual: float
+    :return: float
+    """
+    if not valores:
+        return None
+
+    return valores[min(len(valores) - 1, max(0, int(round(percentual / 100 * len(valores))) - 1))]
+
+
+def resumir(latencias: list, erros: int, duracao: float, consultas: int = None) -> dict:
+    """
+    Retorna as estatísticas de uma rota a partir das latências (em segundos) de suas requisições.
+    :param latencias: list
+    :param erros: int
+    :param duracao: float
+    :param consultas: int
+    :return: dict
+    """
+    latencias = sorted(latencias)
+
+    return {
+        'requisicoes': len(latencias),
+        'erros': erros,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'requisicoes_por_segundo': round(len(latencias) / duracao, 1),
+        'consultas_por_requisicao': round(consultas / len(latencias), 2) if consultas is not None else None,
+    }
+
+
+def preparar_banco(database_url: str, pedidos: int):
+    """
+    Cria e popula o banco de dados com os pedidos sintéticos e o administrador. Caso o banco de dados já contenha
+    pedidos, eles são mantidos. Retorna a aplicação e uma amostra das chaves (tipo, número) dos pedidos.
+    :param database_url: str
+    :param pedidos: int
+    :return: (Flask, list)
+    """
+    app = criar_aplicacao(database_url)
+    criar_administrador(app, EMAIL, SENHA)
+
+    from src.database import Pedido, db
+
+    with app.app_context():
+        if db.session.execute(select(func.count(Pedido.id))).scalar() == 0:
+            popular_banco(app, pedidos)
+
+        # Remove os registros criados por execuções anteriores do benchmark.
+        db.session.execute(Pedido.__table__.delete().where(Pedido.numero >= NUMERO_CRIADOS))
+        db.session.commit()
+
+        chaves = [tuple(linha) for linha in db.session.execute(
+            select(Pedido.tipo, Pedido.numero).order_by(func.random()).limit(1000))]
+
+    return app, chaves
+
+
+def executar_micro(app, rotas: list, contexto: Contexto, requisicoes: int) -> dict:
+    """
+    Executa as requisições sequencialmente através do cliente de testes do Flask.
+    :param app: Flask
+    :param rotas: list
+    :param contexto: Contexto
+    :param requisicoes: int
+    :return: dict
+    """
+    from src.database import db
+
+    with app.app_context():
+        consultas = [0]
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.__setitem__(0, consultas[0] + 1))
+
+    cliente = app.test_client()
+    token = cliente.post('/api/auth/login', json={'email': EMAIL, 'senha': SENHA}).get_json()['access_token']
+    cabecalhos = {'Authorization': 'Bearer ' + token}
+
+    resultados = {}
+    for nome, gerar, apos, _ in rotas:
+        latencias, erros = [], 0
+        consultas[0] = 0
+        inicio_rota = time.perf_counter()
+
+        for indice in range(requisicoes):
+            metodo, uri, corpo = gerar(indice, contexto)
+            argumentos = {'json': corpo} if isinstance(corpo, dict) else {'data': corpo}
+
+            inicio = time.perf_counter()
+            resposta = cliente.open(uri, method=metodo, headers=cabecalhos, **argumentos)
+            resposta.get_data()
+            latencias.append(time.perf_counter() - inicio)
+
+            if resposta.status_code >= 400:
+                erros += 1
+            elif apos is not None:
+                apos(contexto, resposta.get_json())
+
+        resultados[nome] = resumir(latencias, erros, time.perf_counter() - inicio_rota, consultas[0])
+
+    return resultados
+
+
+def _requisicao_http(url: str, metodo: str, corpo, cabecalhos: dict):
+    """
+    Efetua uma requisição HTTP, retornando o status, o corpo da resposta e a latência (em segundos).
+    :param url: str
+    :param metodo: str
+    :param corpo: dict | bytes | None
+    :param cabecalhos: dict
+    :return: (int, bytes, float)
+    """
+    cabecalhos = dict(cabecalhos)
+    if isinstance(corpo, dict):
+        corpo = json.dumps(corpo).encode()
+        cabecalhos['Content-Type'] = 'application/json'
+    elif corpo is not None:
+        cabecalhos['Content-Type'] = 'application/x-ndjson'
+
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=corpo, method=metodo, headers=cabecalhos)) as r:
+            status, dados = r.status, r.read()
+    except urllib.error.HTTPError as erro:
+        status, dados = erro.code, erro.read()
+
+    return status, dados, time.perf_counter() - inicio
+
+
+def executar_macro(database_url: str, rotas: list, contexto: Contexto, requisicoes: int, concorrencia: int,
+                   porta: int, aplicacao: str = 'wsgi:app', variaveis: dict = None) -> dict:
+    """
+    Executa a aplicação através do Gunicorn e efetua as requisições via HTTP, com clientes simultâneos.
+    :param database_url: str
+    :param rotas: list
+    :param contexto: Contexto
+    :param requisicoes: int
+    :param concorrencia: int
+    :param porta: int
+    :param aplicacao: str (aplicação executada pelo Gunicorn, exemplo: 'asgi:app')
+    :param variaveis: dict (variáveis de ambiente adicionais do servidor)
+    :return: dict
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ambiente = dict(os.environ, DATABASE_URL=database_url, PORT=str(porta), **(variaveis or {}))
+    servidor = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', aplicacao],
+                                cwd=raiz, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = 'http://127.0.0.1:{}'.format(porta)
+
+    try:
+        # Aguarda o servidor iniciar, efetuando a autenticação.
+        for _ in range(300):
+            try:
+                status, dados, _ = _requisicao_http(base + '/api/auth/login', 'POST',
+                                                    {'email': EMAIL, 'senha': SENHA}, {})
+                if status == 200:
+                    break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError('O servidor não foi iniciado.')
+
+        cabecalhos = {'Authorization': 'Bearer ' + json.loads(dados)['access_token']}
+
+        resultados = {}
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            for nome, gerar, apos, _ in rotas:
+                def requisitar(indice):
+                    metodo, uri, corpo = gerar(indice, contexto)
+                    status, dados, latencia = _requisicao_http(base + uri, metodo, corpo, cabecalhos)
+                    if status < 400 and apos is not None:
+                        apos(contexto, json.loads(dados))
+                    return status, latencia
+
+                inicio = time.perf_counter()
+                respostas = list(executor.map(requisitar, range(requisicoes)))
+                resultados[nome] = resumir([latencia for _, latencia in respostas],
+                                           sum(1 for status, _ in respostas if status >= 400),
+                                           time.perf_counter() - inicio)
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pedidos', type=int, default=10000)
+    parser.add_argument('--modo', choices=('micro', 'macro'), default='micro')
+    parser.add_argument('--requisicoes', type=int, default=200)
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--porta', type=int, default=8089)
+    parser.add_argument('--database-url', default=None)
+    parser.add_argument('--rotas', default=None, help='Nomes das rotas executadas, separados por vírgula.')
+    parser.add_argument('--saida', default=None, help='Arquivo em que o resultado é salvo.')
+    args = parser.parse_args()
+
+    # Seleciona as rotas executadas. Por padrão, as rotas que retornam todos os pedidos são executadas apenas com
+    # bancos de dados pequenos.
+    if args.rotas:
+        nomes = args.rotas.split(',')
+        rotas = [rota for rota in ROTAS if rota[0] in nomes]
+    else:
+        rotas = [rota for rota in ROTAS if not rota[3] or args.pedidos <= LIMITE_ROTAS_COMPLETAS]
+
+    app, chaves = preparar_banco(args.database_url, args.pedidos)
+    database_url = app.config['SQLALCHEMY_DATABASE_URI']
+    contexto = Contexto(chaves)
+
+    if args.modo == 'micro':
+        resultados = executar_micro(app, rotas, contexto, args.requisicoes)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    else:
+        resultados = executar_macro(database_url, rotas, contexto, args.requisicoes, args.concorrencia, args.porta)
+        rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    resultado = json.dumps({
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'modo': args.modo,
+        'banco': database_url.split(':', 1)[0],
+        'pedidos': args.pedidos,
+        'requisicoes': args.requisicoes,
+        'concorrencia': args.concorrencia if args.modo == 'macro' else 1,
+        'rss_maximo_mb': round(rss / 1024, 1),
+        'rotas': resultados,
+    }, indent=2)
+
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            arquivo.write(resultado)
+
+    print(resultado)
+
+
+if __name__ == '__main__':
+    main()
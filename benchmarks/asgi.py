@@ -0,0 +1,78 @@
+"""
+Compara a aplicação executada pelo Gunicorn nos dois modos de implantação, com muitos clientes simultâneos:
+
+- wsgi: 'wsgi:app' com workers gthread (cada requisição ocupa uma thread durante as consultas ao banco de dados);
+- asgi: 'asgi:app' com workers do Uvicorn (as rotas de autenticação e de pedidos utilizam o engine assíncrono, e as
+  demais rotas são atendidas pela aplicação Flask em um pool de threads).
+
+As duas execuções utilizam a mesma quantidade de processos ('--workers'). O resultado contém as latências e a vazão
+de cada rota nos dois modos, em JSON. É necessário instalar as dependências opcionais do modo ASGI (uvicorn e
+aiosqlite ou asyncpg).
+
+Uso: python -m benchmarks.asgi [--pedidos 10000] [--requisicoes 500] [--concorrencia 64] [--workers 2]
+                               [--database-url URL] [--rotas nome,nome]
+"""
+import argparse
+import json
+
+from benchmarks.api import ROTAS, Contexto, executar_macro, preparar_banco
+
+# Rotas executadas por padrão: rotas assíncronas (autenticação, páginas, leitura e criação de pedidos) e uma rota
+# atendida pela aplicação Flask no modo ASGI (listagem de usuários).
+ROTAS_PADRAO = ('auth_me', 'pedidos_pagina', 'pedidos_filtro', 'pedidos_ler', 'pedidos_criar', 'usuarios_listar')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pedidos', type=int, default=10000)
+    parser.add_argument('--requisicoes', type=int, default=500)
+    parser.add_argument('--concorrencia', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--porta', type=int, default=8791)
+    parser.add_argument('--database-url', default=None)
+    parser.add_argument('--rotas', default=','.join(ROTAS_PADRAO),
+                        help='Nomes das rotas executadas, separados por vírgula.')
+    args = parser.parse_args()
+
+    nomes = args.rotas.split(',')
+    rotas = [rota for rota in ROTAS if rota[0] in nomes]
+
+    app, chaves = preparar_banco(args.database_url, args.pedidos)
+    database_url = app.config['SQLALCHEMY_DATABASE_URI']
+
+    # A rota de criação de pedidos é executada com números diferentes em cada modo, evitando conflitos com os pedidos
+    # criados pela execução anterior.
+    modos = {
+        'wsgi': ('wsgi:app', {'GUNICORN_WORKER_CLASS': 'gthread'}),
+        'asgi': ('asgi:app', {'GUNICORN_WORKER_CLASS': 'uvicorn.workers.UvicornWorker'}),
+    }
+    resultados = {}
+    for indice, (modo, (aplicacao, variaveis)) in enumerate(modos.items()):
+        variaveis = dict(variaveis, WEB_CONCURRENCY=str(args.workers), INSTRUMENTACAO_AMOSTRAGEM='0')
+        rotas_modo = [(nome, _deslocar(gerar, indice * args.requisicoes) if nome == 'pedidos_criar' else gerar,
+                       apos, completa) for nome, gerar, apos, completa in rotas]
+        resultados[modo] = executar_macro(database_url, rotas_modo, Contexto(chaves), args.requisicoes,
+                                          args.concorrencia, args.porta + indice, aplicacao, variaveis)
+
+    print(json.dumps({
+        'banco': database_url.split(':', 1)[0],
+        'pedidos': args.pedidos,
+        'requisicoes': args.requisicoes,
+        'concorrencia': args.concorrencia,
+        'workers': args.workers,
+        'rotas': {nome: {modo: resultados[modo][nome] for modo in modos} for nome, _, _, _ in rotas},
+    }, indent=2))
+
+
+def _deslocar(gerar, deslocamento: int):
+    """
+    Retorna o gerador de requisições com os índices deslocados.
+    :param gerar: Callable
+    :param deslocamento: int
+    :return: Callable
+    """
+    return lambda i, ctx: gerar(i + deslocamento, ctx)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Compara a quantidade de consultas SQL por requisição nas rotas autenticadas, com e sem o cache do usuário
+autenticado:
+
+- sem_cache: USUARIOS_CACHE_TTL=0, o usuário é buscado no banco de dados a cada requisição (equivalente à busca do
+  requisitante que era feita em cada rota);
+- com_cache: USUARIOS_CACHE_TTL padrão, o usuário é buscado apenas na primeira requisição.
+
+Uso: python -m benchmarks.autenticacao [--requisicoes 200]
+"""
+import argparse
+import json
+import os
+import time
+
+from sqlalchemy import event
+
+from benchmarks.comum import criar_administrador, criar_aplicacao
+
+# Rotas medidas (método, URI).
+ROTAS = (
+    ('post', '/api/auth/me'),
+    ('get', '/api/usuarios'),
+    ('get', '/api/usuarios/1'),
+    ('get', '/api/pedidos?limit=10'),
+)
+
+
+def medir(ttl: int, requisicoes: int) -> dict:
+    """
+    Executa as requisições em cada rota, retornando a média de consultas SQL e o tempo médio por requisição.
+    :param ttl: int
+    :param requisicoes: int
+    :return: dict
+    """
+    os.environ['USUARIOS_CACHE_TTL'] = str(ttl)
+    app = criar_aplicacao()
+    criar_administrador(app)
+
+    from src.database import db
+
+    with app.app_context():
+        consultas = [0]
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.__setitem__(0, consultas[0] + 1))
+
+    cliente = app.test_client()
+    token = cliente.post('/api/auth/login', json={'email': 'benchmark@benchmark.dev', 'senha': 'benchmark'})
+    cabecalhos = {'Authorization': 'Bearer ' + token.get_json()['access_token']}
+
+    resultados = {}
+    for metodo, uri in ROTAS:
+        consultas[0] = 0
+        inicio = time.perf_counter()
+        for _ in range(requisicoes):
+            getattr(cliente, metodo)(uri, headers=cabecalhos)
+        resultados[uri] = {
+            'consultas_por_requisicao': round(consultas[0] / requisicoes, 2),
+            'microssegundos_por_requisicao': round((time.perf_counter() - inicio) / requisicoes * 1e6, 1),
+        }
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requisicoes', type=int, default=200)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        'requisicoes': args.requisicoes,
+        'sem_cache': medir(0, args.requisicoes),
+        'com_cache': medir(60, args.requisicoes),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Mede a relação entre o tempo de CPU e o tamanho das respostas comprimidas da API, com respostas reais de pedidos
+(páginas de 50 e 1.000 pedidos e a listagem completa) e de usuários, obtidas de um banco de dados populado com
+pedidos sintéticos.
+
+Para cada resposta e cada codificação disponível (gzip e, caso as bibliotecas estejam instaladas, Brotli e
+Zstandard), em vários níveis de compressão, são medidos o tamanho comprimido, a taxa de compressão e o tempo de
+compressão (mediana das repetições), além do tempo estimado de transferência em um link de '--banda-mbps' megabits
+por segundo. O resultado é impresso em JSON.
+
+Uso: python -m benchmarks.compressao [--pedidos 10000] [--banda-mbps 10] [--repeticoes 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.api import EMAIL, SENHA, preparar_banco
+from src.compressao import codificacoes_disponiveis, comprimir
+
+# Respostas medidas, e as respectivas URIs.
+RESPOSTAS = {
+    'pedidos_pagina_50': '/api/pedidos?limit=50',
+    'pedidos_pagina_1000': '/api/pedidos?limit=1000',
+    'pedidos_completo': '/api/pedidos',
+    'usuarios': '/api/usuarios',
+}
+
+# Níveis de compressão medidos em cada codificação.
+NIVEIS = {
+    'gzip': (1, 6, 9),
+    'br': (1, 4, 11),
+    'zstd': (1, 3, 19),
+}
+
+# Chave do nível de compressão de cada codificação na configuração da compressão (ver 'compressao.py').
+CHAVES_NIVEL = {'gzip': 'nivel', 'br': 'nivel_brotli', 'zstd': 'nivel_zstd'}
+
+
+def medir(corpo: bytes, codificacao: str, nivel: int, banda: float, repeticoes: int) -> dict:
+    """
+    Comprime o corpo informado, retornando o tamanho, a taxa de compressão, o tempo de compressão e o tempo
+    estimado de transferência (em milissegundos).
+    :param corpo: bytes
+    :param codificacao: str
+    :param nivel: int
+    :param banda: float (bytes por segundo)
+    :param repeticoes: int
+    :return: dict
+    """
+    configuracao = {CHAVES_NIVEL[codificacao]: nivel}
+    tempos = []
+
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        comprimido = comprimir(corpo, codificacao, configuracao)
+        tempos.append(time.perf_counter() - inicio)
+
+    cpu = statistics.median(tempos)
+
+    return {
+        'bytes': len(comprimido),
+        'taxa': round(len(corpo) / len(comprimido), 2),
+        'cpu_ms': round(cpu * 1000, 2),
+        'transferencia_ms': round(len(comprimido) / banda * 1000, 1),
+        'total_ms': round((cpu + len(comprimido) / banda) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pedidos', type=int, default=10000)
+    parser.add_argument('--banda-mbps', type=float, default=10)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    app, _ = preparar_banco(database_url, args.pedidos)
+    banda = args.banda_mbps * 1000 * 1000 / 8
+
+    # As respostas são obtidas sem o cabeçalho 'Accept-Encoding', portanto não são comprimidas pela aplicação.
+    cliente = app.test_client()
+    token = cliente.post('/api/auth/login', json={'email': EMAIL, 'senha': SENHA}).get_json()['access_token']
+    cabecalhos = {'Authorization': 'Bearer ' + token}
+
+    resultado = {'banda_mbps': args.banda_mbps, 'respostas': {}}
+    for nome, uri in RESPOSTAS.items():
+        corpo = cliente.get(uri, headers=cabecalhos).get_data()
+
+        transferencia = round(len(corpo) / banda * 1000, 1)
+        medidas = {'identity': {'bytes': len(corpo), 'taxa': 1.0, 'cpu_ms': 0.0, 'transferencia_ms': transferencia,
+                                'total_ms': transferencia}}
+        for codificacao in codificacoes_disponiveis(list(NIVEIS)):
+            for nivel in NIVEIS[codificacao]:
+                medidas['{}-{}'.format(codificacao, nivel)] = medir(corpo, codificacao, nivel, banda, args.repeticoes)
+
+        resultado['respostas'][nome] = medidas
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
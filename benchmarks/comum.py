@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+# Secretarias, projetos e situações utilizados na geração de pedidos sintéticos.
+SECRETARIAS = ('SAUDE', 'EDUCACAO', 'OBRAS', 'ADMINISTRACAO', 'FINANCAS', 'CULTURA', 'ESPORTES', 'ASSISTENCIA SOCIAL')
+PROJETOS = ('MANUTENCAO', 'CUSTEIO', 'INVESTIMENTO', 'CONVENIO ESTADUAL', 'CONVENIO FEDERAL')
+SITUACOES = (None, 'AUTORIZADO', 'NAO AUTORIZADO', 'AGUARDANDO')
+PALAVRAS = ('notebook', 'cadeira', 'mesa', 'papel', 'toner', 'medicamento', 'cimento', 'combustivel', 'uniforme',
+            'projetor', 'ar condicionado', 'material de limpeza', 'merenda', 'pneu', 'software', 'impressora')
+
+
+def criar_aplicacao(database_url: str = None):
+    """
+    Cria a aplicação Flask utilizada nos benchmarks. Caso não seja informado o banco de dados, é utilizado um arquivo
+    SQLite temporário.
+    :param database_url: str
+    :return: Flask
+    """
+    if database_url is None:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+
+    # As autenticações repetidas dos benchmarks não devem ser bloqueadas pelo limitador de tentativas de login.
+    os.environ.setdefault('LIMITADOR_BACKEND', 'nenhum')
+
+    from src import create_app
+    return create_app()
+
+
+def gerar_pedidos(quantidade: int, semente: int = 42):
+    """
+    Gera (em um gerador) os valores das colunas de pedidos sintéticos, com números sequenciais e datas distribuídas
+    ao longo dos últimos cinco anos.
+    :param quantidade: int
+    :param semente: int
+    :return: Generator[dict]
+    """
+    aleatorio = random.Random(semente)
+    inicio = date.today() - timedelta(days=5 * 365)
+
+    for numero in range(1, quantidade + 1):
+        data_chegada = inicio + timedelta(days=aleatorio.randrange(5 * 365))
+        enviado = aleatorio.random() < 0.7
+        retornado = enviado and aleatorio.random() < 0.8
+        data_envio = data_chegada + timedelta(days=aleatorio.randrange(1, 15)) if enviado else None
+
+        yield {
+            'numero': numero,
+            'tipo': aleatorio.choice(('SE', 'RM')),
+            'data_chegada': data_chegada,
+            'secretaria_solicitante': aleatorio.choice(SECRETARIAS),
+            'projeto': aleatorio.choice(PROJETOS),
+            'descricao': 'Aquisição de {} e {}'.format(aleatorio.choice(PALAVRAS), aleatorio.choice(PALAVRAS)),
+            'data_envio_financeiro': data_envio,
+            'data_retorno_financeiro': data_envio + timedelta(days=aleatorio.randrange(1, 30)) if retornado else None,
+            'situacao_autorizacao': aleatorio.choice(SITUACOES),
+            'observacoes': aleatorio.choice((None, 'urgente', 'parcelado', 'entrega imediata')),
+        }
+
+
+def popular_banco(app, quantidade: int, lote: int = 5000):
+    """
+    Cria as tabelas do banco de dados e insere a quantidade informada de pedidos sintéticos, em lotes.
+    :param app: Flask
+    :param quantidade: int
+    :param lote: int
+    """
+    from src.database import Pedido, db
+    from src.estatisticas import atualizar_resumo
+
+    with app.app_context():
+        db.create_all()
+
+        pedidos = []
+        for pedido in gerar_pedidos(quantidade):
+            pedidos.append(pedido)
+            if len(pedidos) == lote:
+                db.session.execute(Pedido.__table__.insert(), pedidos)
+                pedidos = []
+
+        if pedidos:
+            db.session.execute(Pedido.__table__.insert(), pedidos)
+
+        # Os pedidos são inseridos sem a utilização das entidades, portanto o resumo de pedidos é recalculado.
+        atualizar_resumo(db.session.connection())
+        db.session.commit()
+
+
+def criar_administrador(app, email: str = 'benchmark@benchmark.dev', senha: str = 'benchmark'):
+    """
+    Cria as tabelas do banco de dados (caso não existam) e um usuário administrador utilizado na autenticação das
+    requisições, caso ainda não exista.
+    :param app: Flask
+    :param email: str
+    :param senha: str
+    """
+    from werkzeug.security import generate_password_hash
+
+    from src.database import Usuario, db
+
+    with app.app_context():
+        db.create_all()
+
+        if Usuario.query.filter_by(email=email).first() is None:
+            db.session.add(Usuario(nome='Benchmark', email=email, senha=generate_password_hash(senha), admin=True))
+            db.session.commit()
@@ -0,0 +1,167 @@
+"""
+Mede a inicialização da aplicação executada pelo Gunicorn e a memória de cada worker, comparando:
+
+- padrao: GUNICORN_AQUECIMENTO=0 e GUNICORN_GC_FREEZE=0, a aplicação é apenas carregada no processo principal;
+- aquecido: GUNICORN_AQUECIMENTO=1 e GUNICORN_GC_FREEZE=1, a aplicação é aquecida e os objetos carregados são
+  congelados antes da criação dos workers (ver 'gunicorn.conf.py').
+
+Para cada modo, são medidos o tempo até a primeira resposta do servidor, as latências da primeira rajada de
+requisições (uma por thread de cada worker, atendidas por workers que ainda não receberam requisições) e, após a
+rajada, a memória de cada worker: RSS, PSS (a memória compartilhada é dividida entre os processos que a
+compartilham) e a memória privada. O resultado é a mediana das execuções, em JSON.
+
+Uso: python -m benchmarks.inicializacao [--workers 2] [--execucoes 3] [--pedidos 1000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.api import _requisicao_http, preparar_banco, resumir
+from benchmarks.senhas import _aguardar_servidor
+
+MODOS = {
+    'padrao': {'GUNICORN_AQUECIMENTO': '0', 'GUNICORN_GC_FREEZE': '0'},
+    'aquecido': {'GUNICORN_AQUECIMENTO': '1', 'GUNICORN_GC_FREEZE': '1'},
+}
+
+
+def _memoria(pid: int) -> dict:
+    """
+    Retorna a memória (em MB) do processo informado, a partir do '/proc' do Linux.
+    :param pid: int
+    :return: dict
+    """
+    valores = {}
+    with open('/proc/{}/smaps_rollup'.format(pid)) as arquivo:
+        for linha in arquivo:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == 'kB':
+                valores[partes[0].rstrip(':')] = int(partes[1])
+
+    return {
+        'rss': round(valores['Rss'] / 1024, 1),
+        'pss': round(valores['Pss'] / 1024, 1),
+        'privada': round((valores['Private_Clean'] + valores['Private_Dirty']) / 1024, 1),
+    }
+
+
+def _workers(pid: int) -> list:
+    """
+    Retorna os identificadores dos processos filhos (workers) do processo principal do Gunicorn.
+    :param pid: int
+    :return: list
+    """
+    with open('/proc/{0}/task/{0}/children'.format(pid)) as arquivo:
+        return [int(filho) for filho in arquivo.read().split()]
+
+
+def medir(database_url: str, modo: str, workers: int, threads: int, porta: int) -> dict:
+    """
+    Executa a aplicação através do Gunicorn no modo informado, medindo a inicialização e a memória dos workers.
+    :param database_url: str
+    :param modo: str
+    :param workers: int
+    :param threads: int
+    :param porta: int
+    :return: dict
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ambiente = dict(os.environ, DATABASE_URL=database_url, PORT=str(porta), WEB_CONCURRENCY=str(workers),
+                    GUNICORN_THREADS=str(threads), SENHAS_PROCESSOS='0', INSTRUMENTACAO_AMOSTRAGEM='0', **MODOS[modo])
+    base = 'http://127.0.0.1:{}'.format(porta)
+
+    inicio = time.perf_counter()
+    servidor = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                                cwd=raiz, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        # Aguarda a primeira resposta do servidor (sem autenticação, a rota retorna o status 401).
+        while True:
+            try:
+                _requisicao_http(base + '/api/pedidos', 'GET', None, {})
+                break
+            except OSError:
+                if time.perf_counter() - inicio > 30:
+                    raise RuntimeError('O servidor não foi iniciado.')
+                time.sleep(0.01)
+        inicializacao = time.perf_counter() - inicio
+
+        # Reinicia os workers após a autenticação, para que a primeira rajada seja atendida por workers novos. Os
+        # novos workers são criados pelo processo principal, sem carregar novamente a aplicação.
+        cabecalhos = _aguardar_servidor(base)
+        anteriores = set(_workers(servidor.pid))
+        for pid in anteriores:
+            os.kill(pid, 15)
+        while True:
+            atuais = set(_workers(servidor.pid))
+            if len(atuais - anteriores) == workers and not atuais & anteriores:
+                break
+            time.sleep(0.05)
+        time.sleep(0.5)
+
+        def requisitar(_):
+            status, _, latencia = _requisicao_http(base + '/api/pedidos?limit=50', 'GET', None, cabecalhos)
+            return status, latencia
+
+        with ThreadPoolExecutor(max_workers=workers * threads) as executor:
+            inicio_rajada = time.perf_counter()
+            respostas = list(executor.map(requisitar, range(workers * threads)))
+            rajada = resumir([latencia for _, latencia in respostas],
+                             sum(1 for status, _ in respostas if status >= 400), time.perf_counter() - inicio_rajada)
+
+        memorias = [_memoria(pid) for pid in _workers(servidor.pid)]
+        principal = _memoria(servidor.pid)
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    return {
+        'inicializacao_ms': round(inicializacao * 1000, 1),
+        'primeira_rajada': rajada,
+        'principal': principal,
+        'workers': {chave: round(statistics.mean(memoria[chave] for memoria in memorias), 1)
+                    for chave in ('rss', 'pss', 'privada')},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--execucoes', type=int, default=3)
+    parser.add_argument('--pedidos', type=int, default=1000)
+    parser.add_argument('--porta', type=int, default=8775)
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    preparar_banco(database_url, args.pedidos)
+
+    resultado = {'workers': args.workers, 'threads': args.threads}
+    for indice, modo in enumerate(MODOS):
+        execucoes = [medir(database_url, modo, args.workers, args.threads, args.porta + indice)
+                     for _ in range(args.execucoes)]
+
+        # Mediana de cada medida entre as execuções.
+        rajadas = [execucao['primeira_rajada'] for execucao in execucoes]
+        resultado[modo] = {
+            'inicializacao_ms': statistics.median(execucao['inicializacao_ms'] for execucao in execucoes),
+            'primeira_rajada_p50_ms': statistics.median(rajada['p50_ms'] for rajada in rajadas),
+            'primeira_rajada_p99_ms': statistics.median(rajada['p99_ms'] for rajada in rajadas),
+            'primeira_rajada_erros': sum(rajada['erros'] for rajada in rajadas),
+            'principal': {chave: statistics.median(execucao['principal'][chave] for execucao in execucoes)
+                          for chave in ('rss', 'pss', 'privada')},
+            'workers': {chave: statistics.median(execucao['workers'][chave] for execucao in execucoes)
+                        for chave in ('rss', 'pss', 'privada')},
+        }
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
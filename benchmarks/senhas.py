@@ -0,0 +1,119 @@
+"""
+Mede a vazão de autenticações (POST /api/auth/login) com clientes simultâneos e o impacto de uma rajada de
+autenticações nas demais rotas (GET /api/pedidos), com a aplicação executada pelo Gunicorn, comparando:
+
+- thread: SENHAS_PROCESSOS=0, os hashes das senhas são calculados na própria thread da requisição;
+- pool: SENHAS_PROCESSOS informado em '--processos', os hashes são calculados no pool de processos.
+
+Durante a rajada de autenticações, um cliente adicional busca pedidos continuamente; o resultado contém as
+latências e a vazão das duas rotas, em JSON.
+
+Uso: python -m benchmarks.senhas [--concorrencia 8] [--duracao 10] [--processos 1] [--pedidos 1000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.api import EMAIL, SENHA, _requisicao_http, preparar_banco, resumir
+
+
+def _aguardar_servidor(base: str) -> dict:
+    """
+    Aguarda o servidor iniciar, efetuando a autenticação, e retorna os cabeçalhos com o token de acesso.
+    :param base: str
+    :return: dict
+    """
+    for _ in range(300):
+        try:
+            status, dados, _ = _requisicao_http(base + '/api/auth/login', 'POST', {'email': EMAIL, 'senha': SENHA}, {})
+            if status == 200:
+                return {'Authorization': 'Bearer ' + json.loads(dados)['access_token']}
+        except OSError:
+            pass
+        time.sleep(0.1)
+
+    raise RuntimeError('O servidor não foi iniciado.')
+
+
+def medir(database_url: str, processos: int, concorrencia: int, duracao: float, porta: int) -> dict:
+    """
+    Executa a aplicação através do Gunicorn com a quantidade informada de processos de senhas, efetuando
+    autenticações simultâneas durante 'duracao' segundos enquanto um cliente busca pedidos.
+    :param database_url: str
+    :param processos: int
+    :param concorrencia: int
+    :param duracao: float
+    :param porta: int
+    :return: dict
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ambiente = dict(os.environ, DATABASE_URL=database_url, PORT=str(porta), SENHAS_PROCESSOS=str(processos),
+                    INSTRUMENTACAO_AMOSTRAGEM='0')
+    servidor = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                                cwd=raiz, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = 'http://127.0.0.1:{}'.format(porta)
+
+    try:
+        cabecalhos = _aguardar_servidor(base)
+        fim = time.perf_counter() + duracao
+        logins, pedidos = [], []
+        erros = {'login': 0, 'pedidos': 0}
+
+        def autenticar(_):
+            while time.perf_counter() < fim:
+                status, _, latencia = _requisicao_http(base + '/api/auth/login', 'POST',
+                                                       {'email': EMAIL, 'senha': SENHA}, {})
+                logins.append(latencia)
+                erros['login'] += status != 200
+
+        def buscar_pedidos():
+            while time.perf_counter() < fim:
+                status, _, latencia = _requisicao_http(base + '/api/pedidos?limit=10', 'GET', None, cabecalhos)
+                pedidos.append(latencia)
+                erros['pedidos'] += status != 200
+
+        leitor = threading.Thread(target=buscar_pedidos)
+        inicio = time.perf_counter()
+        leitor.start()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            list(executor.map(autenticar, range(concorrencia)))
+        leitor.join()
+        decorrido = time.perf_counter() - inicio
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    return {
+        'login': resumir(logins, erros['login'], decorrido),
+        'pedidos': resumir(pedidos, erros['pedidos'], decorrido),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--duracao', type=float, default=10)
+    parser.add_argument('--processos', type=int, default=1)
+    parser.add_argument('--pedidos', type=int, default=1000)
+    parser.add_argument('--porta', type=int, default=8765)
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    preparar_banco(database_url, args.pedidos)
+
+    print(json.dumps({
+        'concorrencia': args.concorrencia,
+        'duracao': args.duracao,
+        'thread': medir(database_url, 0, args.concorrencia, args.duracao, args.porta),
+        'pool': medir(database_url, args.processos, args.concorrencia, args.duracao, args.porta + 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compara o custo por pedido da busca de todos os pedidos antes e depois da serialização direta das colunas:
+
+- entidades: consulta de entidades (ORM), 'Pedido.to_dict' e serialização com a biblioteca 'json';
+- colunas: consulta das colunas (Core), 'serializador_pedidos' e 'serializacao.dumps' (orjson, caso instalado);
+- campos: igual a 'colunas', porém buscando apenas os campos 'tipo', 'numero' e 'data_chegada' (parâmetro 'fields').
+
+Uso: python -m benchmarks.serializacao [--pedidos 20000] [--repeticoes 5]
+"""
+import argparse
+import json
+import time
+
+from benchmarks.comum import criar_aplicacao, popular_banco
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """
+    Executa a função informada repetidas vezes e retorna o menor tempo de execução, em segundos.
+    :param funcao: Callable
+    :param repeticoes: int
+    :return: float
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pedidos', type=int, default=20000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    app = criar_aplicacao()
+    popular_banco(app, args.pedidos)
+
+    from src.consultas import consulta_pedidos
+    from src.database import Pedido, db
+    from src.serializacao import CAMPOS_PEDIDO, dumps, orjson, serializador_pedidos
+
+    def entidades():
+        dados = [pedido.to_dict() for pedido in Pedido.query.all()]
+        json.dumps({'pedidos': dados})
+        db.session.expunge_all()
+
+    def colunas(campos=CAMPOS_PEDIDO):
+        serializar = serializador_pedidos(campos)
+        dumps({'pedidos': [serializar(linha) for linha in db.session.execute(consulta_pedidos(campos, {}))]})
+
+    with app.app_context():
+        resultados = {
+            'entidades': medir(entidades, args.repeticoes),
+            'colunas': medir(colunas, args.repeticoes),
+            'campos': medir(lambda: colunas(('tipo', 'numero', 'data_chegada')), args.repeticoes),
+        }
+
+    print(json.dumps({
+        'pedidos': args.pedidos,
+        'orjson': orjson is not None,
+        'microssegundos_por_pedido': {
+            nome: round(tempo / args.pedidos * 1e6, 2) for nome, tempo in resultados.items()
+        },
+        'ganho': {
+            nome: round(resultados['entidades'] / tempo, 2) for nome, tempo in resultados.items()
+        },
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
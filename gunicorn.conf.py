@@ -0,0 +1,131 @@
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+# Endereço e porta em que o servidor aguarda as conexões (o Heroku informa a porta na variável de ambiente PORT).
+bind = '0.0.0.0:{}'.format(os.environ.get('PORT', 8000))
+
+# Quantidade de processos (workers) e de threads por processo. Cada thread utiliza no máximo uma conexão do pool do
+# banco de dados, portanto DB_POOL_SIZE deve ser igual ou maior que a quantidade de threads, e o total de conexões
+# (workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)) não deve ultrapassar o limite de conexões do banco de dados. Cada
+# conexão das alterações em tempo real (Server-Sent Events) ocupa uma thread enquanto está aberta, e são aceitas até
+# ALTERACOES_CONEXOES_MAXIMAS conexões por processo, que deve ser inferior à quantidade de threads.
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 4)))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Tempo máximo de uma requisição, e tempo em que as conexões keep-alive são mantidas abertas.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+
+# Reinicia cada processo após uma quantidade de requisições (com variação aleatória, evitando que todos os processos
+# sejam reiniciados ao mesmo tempo), limitando o crescimento do consumo de memória.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+# Carrega a aplicação no processo principal, antes da criação dos workers, compartilhando a memória do código
+# carregado entre os processos.
+preload_app = True
+
+# Aquecimento da aplicação no processo principal (ver 'src/aquecimento.py') e congelamento dos objetos carregados
+# antes da criação dos workers (gc.freeze): os objetos congelados não são percorridos pelo coletor de lixo dos
+# workers, cujas páginas de memória permanecem compartilhadas com o processo principal (copy-on-write). O coletor
+# é desabilitado durante o carregamento, evitando lacunas entre os objetos na memória.
+aquecimento = os.environ.get('GUNICORN_AQUECIMENTO', '1') == '1'
+congelamento = os.environ.get('GUNICORN_GC_FREEZE', '1') == '1'
+if congelamento:
+    gc.disable()
+
+# Diretório em que cada worker grava as suas métricas, agregadas pela rota '/metrics'.
+os.environ.setdefault('METRICAS_DIRETORIO', os.path.join(tempfile.gettempdir(), 'controle-de-pedidos-metricas'))
+
+
+def on_starting(server):
+    """
+    Ao iniciar o servidor, remove as métricas gravadas por execuções anteriores.
+    :param server: Arbiter
+    """
+    diretorio = os.environ['METRICAS_DIRETORIO']
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.makedirs(diretorio, exist_ok=True)
+
+
+def when_ready(server):
+    """
+    Após o carregamento da aplicação e antes da criação dos workers, aquece a aplicação e congela os objetos
+    carregados pelo processo principal.
+    :param server: Arbiter
+    """
+    if aquecimento:
+        from src.aquecimento import aquecer
+
+        # Uma falha no aquecimento (exemplo: banco de dados indisponível) não impede a inicialização do servidor.
+        inicio = time.perf_counter()
+        try:
+            aquecer(_aplicacao_flask(server))
+            server.log.info('Aplicação aquecida em %.0f ms.', (time.perf_counter() - inicio) * 1000)
+        except Exception:
+            server.log.exception('Erro ao aquecer a aplicação.')
+
+    if congelamento:
+        gc.collect()
+        gc.freeze()
+        gc.enable()
+
+
+def pre_fork(server, worker):
+    """
+    Antes da criação de cada worker, congela os objetos criados pelo processo principal desde o último congelamento.
+    :param server: Arbiter
+    :param worker: Worker
+    """
+    if congelamento:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Após a criação de cada worker, descarta as conexões dos pools do banco de dados (e das réplicas) herdadas do
+    processo principal, as quais não podem ser compartilhadas entre processos. O worker passa a criar as suas
+    próprias conexões.
+    :param server: Arbiter
+    :param worker: Worker
+    """
+    from src.aquecimento import preparar_pool
+    from src.database import db
+    from src.replicas import descartar_conexoes
+
+    app = _aplicacao_flask(server)
+
+    with app.app_context():
+        db.engine.dispose()
+        descartar_conexoes(app)
+
+    # Com o aquecimento, o worker abre as conexões do seu pool antes de receber as primeiras requisições.
+    if aquecimento:
+        preparar_pool(app)
+
+
+def _aplicacao_flask(server):
+    """
+    Retorna a aplicação Flask carregada pelo processo principal ('wsgi:app' ou, no modo ASGI, a aplicação Flask de
+    'asgi:app').
+    :param server: Arbiter
+    :return: Flask
+    """
+    aplicacao = server.app.wsgi()
+    return getattr(aplicacao, 'app', aplicacao)
+
+
+def child_exit(server, worker):
+    """
+    Após o encerramento de cada worker, acumula as suas métricas, mantendo os contadores crescentes.
+    :param server: Arbiter
+    :param worker: Worker
+    """
+    from src.metricas import consolidar_processo
+
+    consolidar_processo(os.environ['METRICAS_DIRETORIO'], worker.pid)
@@ -0,0 +1,45 @@
+"""Busca textual de pedidos
+
+Revision ID: 0003_busca_textual_pedidos
+Revises: 0002_indices_pedidos
+Create Date: 2026-10-18 11:02:41.512093
+
+"""
+from alembic import op
+
+from src.database import DDL_BUSCA_TEXTUAL_POSTGRESQL, DDL_BUSCA_TEXTUAL_SQLITE
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_busca_textual_pedidos'
+down_revision = '0002_indices_pedidos'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialeto = op.get_bind().dialect.name
+
+    if dialeto == 'postgresql':
+        for comando in DDL_BUSCA_TEXTUAL_POSTGRESQL:
+            op.execute(comando)
+
+    if dialeto == 'sqlite':
+        for comando in DDL_BUSCA_TEXTUAL_SQLITE:
+            op.execute(comando)
+
+        # Indexa os pedidos já cadastrados.
+        op.execute("INSERT INTO pedidos_fts(pedidos_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialeto = op.get_bind().dialect.name
+
+    if dialeto == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_pedidos_busca_textual')
+
+    if dialeto == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS pedidos_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS pedidos_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS pedidos_fts_ai')
+        op.execute('DROP TABLE IF EXISTS pedidos_fts')
@@ -3,49 +3,172 @@ from datetime import timedelta
 
 from flask import Flask
 from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 
+from src import (alteracoes, cache, compressao, instrumentacao, limitador, metricas, permissoes, replicas, senhas,
+                 serializacao)
 from src.auth import auth_bp
-from src.commands import init_database
+from src.commands import (archive_pedidos, compress_static, init_database, import_pedidos, purge_changes,
+                          purge_idempotency, refresh_stats, replica_status)
 from src.database import db
 from src.pedidos import pedidos_bp
 from src.spa import spa_bp
 from src.usuarios import usuarios_bp
 
 
+def opcoes_engine(database_url: str) -> dict:
+    """
+    Retorna as opções do engine do SQLAlchemy (pool de conexões e tempo máximo de execução das consultas), a partir
+    das variáveis de ambiente. No SQLite, que não utiliza um pool de conexões com o servidor, nenhuma opção é
+    definida.
+    :param database_url: str
+    :return: dict
+    """
+    if database_url.startswith('sqlite'):
+        return {}
+
+    opcoes = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 4)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 2)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+    }
+
+    # No PostgreSQL, as consultas que ultrapassarem o tempo máximo (em milissegundos) são canceladas pelo servidor.
+    tempo_maximo = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))
+    if database_url.startswith('postgresql') and tempo_maximo > 0:
+        opcoes['connect_args'] = {'options': '-c statement_timeout={}'.format(tempo_maximo)}
+
+    return opcoes
+
+
 def create_app() -> Flask:
     """
     Cria e inicializa a aplicação Flask.
     :return: Flask
     """
 
-    # Cria a instância da aplicação Flask.
-    app = Flask(__name__, instance_relative_config=True)
+    # Cria a instância da aplicação Flask. Os arquivos estáticos são enviados pelo Blueprint da SPA, que seleciona as
+    # versões pré-comprimidas dos arquivos.
+    app = Flask(__name__, instance_relative_config=True, static_folder=None)
+
+    # Busca o endereço do banco de dados.
+    database_url = os.environ.get('DATABASE_URL').replace("postgres://", "postgresql://", 1)
 
     # Configura a aplicação Flask.
     app.config.from_mapping(
         SECRET_KEY=os.environ.get('SECRET_KEY'),
-        SQLALCHEMY_DATABASE_URI=os.environ.get('DATABASE_URL').replace("postgres://", "postgresql://", 1),
+        SQLALCHEMY_DATABASE_URI=database_url,
+        SQLALCHEMY_ENGINE_OPTIONS=opcoes_engine(database_url),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        DATABASE_REPLICA_URLS=[url.strip().replace("postgres://", "postgresql://", 1)
+                               for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()],
+        REPLICAS_ATRASO_MAXIMO=float(os.environ.get('REPLICAS_ATRASO_MAXIMO', 5)),
+        REPLICAS_INTERVALO=float(os.environ.get('REPLICAS_INTERVALO', 5)),
         JWT_SECRET_KEY=os.environ.get('JWT_SECRET_KEY'),
         JWT_ERROR_MESSAGE_KEY='error',
         JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=24),
+        USUARIOS_CACHE_TTL=int(os.environ.get('USUARIOS_CACHE_TTL', 60)),
+        SENHAS_METODO=os.environ.get('SENHAS_METODO', 'pbkdf2:sha256:260000'),
+        SENHAS_PROCESSOS=int(os.environ.get('SENHAS_PROCESSOS', 1)),
+        SENHAS_ESPERA_MAXIMA=float(os.environ.get('SENHAS_ESPERA_MAXIMA', 5)),
+        LIMITADOR_BACKEND=os.environ.get('LIMITADOR_BACKEND', 'memoria'),
+        LIMITADOR_JANELA=int(os.environ.get('LIMITADOR_JANELA', 60)),
+        LIMITADOR_LOGIN_IP=int(os.environ.get('LIMITADOR_LOGIN_IP', 20)),
+        LIMITADOR_LOGIN_EMAIL=int(os.environ.get('LIMITADOR_LOGIN_EMAIL', 5)),
+        PROXIES_CONFIAVEIS=int(os.environ.get('PROXIES_CONFIAVEIS', 0)),
+        ASGI_THREADS=int(os.environ.get('ASGI_THREADS', 4)),
+        PEDIDOS_LIMITE_MAXIMO=int(os.environ.get('PEDIDOS_LIMITE_MAXIMO', 1000)),
+        PEDIDOS_STREAM_LOTE=int(os.environ.get('PEDIDOS_STREAM_LOTE', 500)),
+        PEDIDOS_IMPORTACAO_LOTE=int(os.environ.get('PEDIDOS_IMPORTACAO_LOTE', 1000)),
+        ALTERACOES_INTERVALO=float(os.environ.get('ALTERACOES_INTERVALO', 15)),
+        ALTERACOES_DURACAO_MAXIMA=float(os.environ.get('ALTERACOES_DURACAO_MAXIMA', 300)),
+        ALTERACOES_CONEXOES_MAXIMAS=int(os.environ.get('ALTERACOES_CONEXOES_MAXIMAS', 2)),
+        ALTERACOES_TOKEN_TTL=int(os.environ.get('ALTERACOES_TOKEN_TTL', 60)),
+        IDEMPOTENCIA_TTL=int(os.environ.get('IDEMPOTENCIA_TTL', 24 * 60 * 60)),
+        IDEMPOTENCIA_ESPERA_MAXIMA=float(os.environ.get('IDEMPOTENCIA_ESPERA_MAXIMA', 10)),
+        CACHE_BACKEND=os.environ.get('CACHE_BACKEND', 'memoria'),
+        CACHE_TTL=int(os.environ.get('CACHE_TTL', 300)),
+        CACHE_TAMANHO_MAXIMO=int(os.environ.get('CACHE_TAMANHO_MAXIMO', 64 * 1024 * 1024)),
+        REDIS_URL=os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+        INSTRUMENTACAO_AMOSTRAGEM=float(os.environ.get('INSTRUMENTACAO_AMOSTRAGEM', 0.1)),
+        CONSULTA_LENTA_MS=float(os.environ.get('CONSULTA_LENTA_MS', 500)),
+        CONSULTA_LENTA_EXPLAIN=os.environ.get('CONSULTA_LENTA_EXPLAIN', '1') == '1',
+        METRICAS_DIRETORIO=os.environ.get('METRICAS_DIRETORIO', ''),
+        METRICAS_TOKEN=os.environ.get('METRICAS_TOKEN', ''),
+        COMPRESSAO_CODIFICACOES=[codificacao.strip() for codificacao in
+                                 os.environ.get('COMPRESSAO_CODIFICACOES', 'br,zstd,gzip').split(',')
+                                 if codificacao.strip()],
+        COMPRESSAO_TAMANHO_MINIMO=int(os.environ.get('COMPRESSAO_TAMANHO_MINIMO', 1024)),
+        COMPRESSAO_NIVEL=int(os.environ.get('COMPRESSAO_NIVEL', 6)),
+        COMPRESSAO_NIVEL_BROTLI=int(os.environ.get('COMPRESSAO_NIVEL_BROTLI', 4)),
+        COMPRESSAO_NIVEL_ZSTD=int(os.environ.get('COMPRESSAO_NIVEL_ZSTD', 3)),
+        SPA_LOG_AMOSTRAGEM=float(os.environ.get('SPA_LOG_AMOSTRAGEM', 0.01)),
     )
 
+    # Caso a aplicação seja executada atrás de proxies reversos (exemplo: o roteador do Heroku), o endereço IP do
+    # cliente é obtido do cabeçalho 'X-Forwarded-For' informado pelos proxies confiáveis.
+    if app.config['PROXIES_CONFIAVEIS'] > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXIES_CONFIAVEIS'])
+
     # Inicializa o gerenciador de banco de dados (SQLAlchemy).
     db.app = app
     db.init_app(app)
 
-    # Inicializa o gerenciador de autenticação de usuários (Flask-JWT-Extended).
-    JWTManager(app)
+    # Inicializa as réplicas de leitura do banco de dados, utilizadas pelas requisições GET.
+    replicas.init_app(app)
+
+    # Inicializa o gerenciador de migrações do banco de dados (Flask-Migrate).
+    Migrate(app, db, render_as_batch=True)
+
+    # Configura a serialização JSON das respostas (orjson, caso esteja instalado).
+    serializacao.init_app(app)
+
+    # Inicializa a instrumentação das requisições (consultas SQL, tempos e consultas lentas).
+    instrumentacao.init_app(app)
+
+    # Inicializa a coleta das métricas das requisições (rota '/metrics').
+    metricas.init_app(app)
+
+    # Inicializa a compressão das respostas das rotas da API. Como as funções 'after_request' são executadas na ordem
+    # inversa do registro, a compressão precede a instrumentação e as métricas.
+    compressao.init_app(app)
+
+    # Inicializa o cache dos resultados das consultas.
+    cache.init_app(app)
+
+    # Inicializa o distribuidor das alterações de pedidos (rota '/api/pedidos/changes').
+    alteracoes.init_app(app)
+
+    # Inicializa o limitador de tentativas de login.
+    limitador.init_app(app)
+
+    # Inicializa o serviço de geração e verificação dos hashes das senhas.
+    senhas.init_app(app)
+
+    # Inicializa o gerenciador de autenticação de usuários (Flask-JWT-Extended) e a busca do usuário autenticado.
+    jwt = JWTManager(app)
+    permissoes.init_app(app, jwt)
 
     # Registra os Blueprints das rotas da aplicação.
     app.register_blueprint(auth_bp)
     app.register_blueprint(pedidos_bp)
     app.register_blueprint(usuarios_bp)
+    app.register_blueprint(cache.cache_bp)
+    app.register_blueprint(metricas.metricas_bp)
     app.register_blueprint(spa_bp)
 
     # Registra os comandos da CLI.
     app.cli.add_command(init_database)
+    app.cli.add_command(import_pedidos)
+    app.cli.add_command(compress_static)
+    app.cli.add_command(refresh_stats)
+    app.cli.add_command(purge_changes)
+    app.cli.add_command(purge_idempotency)
+    app.cli.add_command(archive_pedidos)
+    app.cli.add_command(replica_status)
 
     # Retorna a aplicação Flask.
     return app
@@ -0,0 +1,324 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, cast, event, func, select
+from sqlalchemy.orm import Session
+
+from src.database import Pedido, PedidoAlteracao, TabelaVersao, db
+from src.serializacao import CAMPOS_PEDIDO, dumps, serializador_pedidos
+from src.versionamento import ao_alterar
+
+
+def registrar_alteracoes(session: Session, alteracoes):
+    """
+    Grava no log as alterações de pedidos efetuadas na transação atual da sessão, com a versão da tabela de pedidos.
+    Deve ser chamada após 'registrar_alteracao', que incrementa a versão: como o registro da versão permanece
+    bloqueado até o fim da transação, as versões do log seguem a ordem dos commits, e um cliente que recebeu as
+    alterações até uma versão não deixa de receber as alterações das transações concluídas depois. As operações que
+    utilizam as entidades são registradas automaticamente após cada flush.
+    :param session: Session
+    :param alteracoes: Iterable[(str, int, str)] (tipo, numero e operação)
+    """
+    agora = datetime.now()
+    valores = [{'tipo': tipo, 'numero': numero, 'operacao': operacao, 'criado_em': agora}
+               for tipo, numero, operacao in alteracoes]
+
+    if not valores:
+        return
+
+    # A versão é obtida por uma subconsulta no próprio comando, evitando uma consulta adicional.
+    versao = select(TabelaVersao.versao).where(TabelaVersao.tabela == 'pedidos').scalar_subquery()
+    session.connection().execute(PedidoAlteracao.__table__.insert().values(versao=versao), valores)
+
+
+def consultar_alteracoes(desde: int, limite: int = None):
+    """
+    Retorna a versão atual da tabela de pedidos e as alterações efetuadas após a versão informada, com o estado
+    atual de cada pedido alterado ('pedido', vazio nos pedidos excluídos). As várias alterações de um mesmo pedido
+    são reduzidas à última. Retorna None caso as alterações não estejam mais disponíveis no log (removidas pelo
+    comando 'purge_changes') ou excedam o limite informado; nesses casos, o cliente deve buscar novamente todos os
+    pedidos.
+    :param desde: int
+    :param limite: int | None
+    :return: (int, list) | None
+    """
+
+    # A versão atual é lida antes das alterações, portanto nenhuma alteração concluída após a consulta possui uma
+    # versão igual ou inferior à retornada.
+    versao = db.session.execute(
+        select(TabelaVersao.versao).where(TabelaVersao.tabela == 'pedidos')).scalar_one()
+
+    # As alterações posteriores à versão informada estão disponíveis caso a versão seguinte esteja no log (ou, com o
+    # log vazio, caso a versão informada seja a atual).
+    minima = db.session.execute(select(func.min(PedidoAlteracao.versao))).scalar()
+    if desde < (minima if minima is not None else versao + 1) - 1:
+        return None
+
+    # As colunas do pedido precedem as colunas do log, conforme esperado por 'serializador_pedidos'. O tipo do log
+    # (texto) é convertido para o tipo da coluna do pedido (no PostgreSQL, um enum), mantendo o uso do índice.
+    consulta = (
+        select(*[getattr(Pedido, campo) for campo in CAMPOS_PEDIDO], PedidoAlteracao.versao.label('versao_log'),
+               PedidoAlteracao.tipo.label('tipo_log'), PedidoAlteracao.numero.label('numero_log'),
+               PedidoAlteracao.operacao)
+        .select_from(PedidoAlteracao.__table__.outerjoin(Pedido.__table__, and_(
+            Pedido.tipo == cast(PedidoAlteracao.tipo, Pedido.tipo.type), Pedido.numero == PedidoAlteracao.numero)))
+        .where(PedidoAlteracao.versao > desde)
+        .order_by(PedidoAlteracao.id)
+    )
+    if limite is not None:
+        consulta = consulta.limit(limite + 1)
+
+    linhas = db.session.execute(consulta).all()
+    if limite is not None and len(linhas) > limite:
+        return None
+
+    # Mantém apenas a última alteração de cada pedido, na ordem em que ocorreram.
+    ultimas = {}
+    for linha in linhas:
+        chave = (linha.tipo_log, linha.numero_log)
+        ultimas.pop(chave, None)
+        ultimas[chave] = linha
+
+    serializar = serializador_pedidos(CAMPOS_PEDIDO)
+
+    return max([versao] + [linha.versao_log for linha in linhas]), [{
+        'tipo': linha.tipo_log,
+        'numero': linha.numero_log,
+        'operacao': linha.operacao,
+        'versao': linha.versao_log,
+        'pedido': serializar(linha) if linha.id is not None else None,
+    } for linha in ultimas.values()]
+
+
+def remover_alteracoes(dias: int) -> int:
+    """
+    Remove do log as alterações efetuadas há mais dias que o informado. Retorna a quantidade de registros removidos.
+    :param dias: int
+    :return: int
+    """
+    resultado = db.session.execute(PedidoAlteracao.__table__.delete().where(
+        PedidoAlteracao.__table__.c.criado_em < datetime.now() - timedelta(days=dias)))
+    db.session.commit()
+
+    return resultado.rowcount
+
+
+class DistribuidorAlteracoes:
+    """ Distribui as alterações de pedidos às conexões abertas do processo atual. A cada commit que altera os
+    pedidos no processo (ou a cada 'ALTERACOES_INTERVALO' segundos, para as alterações efetuadas pelos demais
+    processos), as alterações são buscadas uma única vez e enviadas às filas de todas as conexões, portanto a
+    quantidade de consultas não depende da quantidade de conexões. """
+
+    def __init__(self, app):
+        self.app = app
+        self.condicao = threading.Condition()
+        self.filas = set()
+        self.versao = None
+        self.notificado = False
+        self.pid = None
+        self.conexoes = 0
+
+    def reservar(self) -> bool:
+        """
+        Reserva uma das 'ALTERACOES_CONEXOES_MAXIMAS' conexões simultâneas do processo atual, retornando False caso
+        todas estejam em uso. A reserva deve ser liberada ao encerrar a conexão ('liberar').
+        :return: bool
+        """
+        with self.condicao:
+            if self.conexoes >= self.app.config['ALTERACOES_CONEXOES_MAXIMAS']:
+                return False
+
+            self.conexoes += 1
+            return True
+
+    def liberar(self):
+        """
+        Libera a reserva de uma conexão encerrada.
+        """
+        with self.condicao:
+            self.conexoes -= 1
+
+    def inscrever(self) -> (queue.SimpleQueue, int):
+        """
+        Cria e retorna a fila de uma nova conexão e a versão a partir da qual as alterações são recebidas pela fila
+        (versão da tabela de pedidos na primeira inscrição).
+        :return: (SimpleQueue, int)
+        """
+        fila = queue.SimpleQueue()
+
+        with self.condicao:
+            # A thread é criada no primeiro uso em cada processo (os processos do Gunicorn são criados após a
+            # importação da aplicação).
+            if self.pid != os.getpid():
+                self.pid, self.filas, self.versao = os.getpid(), set(), None
+                threading.Thread(target=self._executar, name='alteracoes', daemon=True).start()
+
+            if self.versao is None:
+                self.versao = db.session.execute(
+                    select(TabelaVersao.versao).where(TabelaVersao.tabela == 'pedidos')).scalar_one()
+
+            self.filas.add(fila)
+
+            return fila, self.versao
+
+    def cancelar(self, fila: queue.SimpleQueue):
+        """
+        Remove a fila de uma conexão encerrada. Sem conexões abertas, as alterações deixam de ser buscadas.
+        :param fila: SimpleQueue
+        """
+        with self.condicao:
+            self.filas.discard(fila)
+            if not self.filas:
+                self.versao = None
+
+    def notificar(self):
+        """
+        Indica que os pedidos foram alterados por uma transação do processo atual.
+        """
+        with self.condicao:
+            self.notificado = True
+            self.condicao.notify_all()
+
+    def _executar(self):
+        """
+        Busca as alterações após cada notificação (ou a cada 'ALTERACOES_INTERVALO' segundos) e as envia às filas
+        das conexões abertas.
+        """
+        intervalo = self.app.config['ALTERACOES_INTERVALO']
+
+        while True:
+            with self.condicao:
+                self.condicao.wait_for(lambda: self.notificado, timeout=intervalo)
+                self.notificado = False
+                versao = self.versao
+
+            if versao is None:
+                continue
+
+            try:
+                with self.app.app_context():
+                    resultado = consultar_alteracoes(versao)
+            except Exception:
+                self.app.logger.exception('Erro ao buscar as alterações de pedidos.')
+                continue
+
+            if resultado is None:
+                continue
+
+            versao_atual, alteracoes = resultado
+
+            with self.condicao:
+                # Caso todas as conexões tenham sido encerradas durante a consulta, as alterações são descartadas.
+                if self.versao != versao:
+                    continue
+
+                self.versao = versao_atual
+                if alteracoes:
+                    for fila in self.filas:
+                        fila.put(alteracoes)
+
+
+def eventos(desde: int):
+    """
+    Gera as mensagens Server-Sent Events das alterações de pedidos efetuadas após a versão informada: primeiro as
+    alterações já registradas no log e, em seguida, as alterações recebidas pelo distribuidor, até a duração máxima
+    da conexão ('ALTERACOES_DURACAO_MAXIMA'). O identificador de cada mensagem é a versão da alteração, reenviada
+    pelo navegador na reconexão (cabeçalho 'Last-Event-ID'). Mensagens de comentário são enviadas a cada
+    'ALTERACOES_INTERVALO' segundos, mantendo a conexão aberta nos proxies.
+    :param desde: int | None
+    :return: Generator[bytes]
+    """
+    distribuidor = current_app.extensions['alteracoes']
+    intervalo = current_app.config['ALTERACOES_INTERVALO']
+    fim = time.monotonic() + current_app.config['ALTERACOES_DURACAO_MAXIMA']
+
+    # A inscrição precede a busca das alterações registradas, portanto nenhuma alteração é perdida entre as duas; as
+    # alterações recebidas em duplicidade são descartadas pela versão.
+    fila, versao = distribuidor.inscrever()
+    try:
+        resultado = consultar_alteracoes(desde if desde is not None else versao)
+
+        # A conexão com o banco de dados é devolvida ao pool enquanto a conexão aguarda as alterações.
+        db.session.remove()
+
+        if resultado is None:
+            yield b'event: recarregar\ndata: {}\n\n'
+            return
+
+        # A primeira mensagem contém a versão atual, reenviada pelo navegador caso a conexão seja encerrada antes de
+        # qualquer alteração.
+        versao, alteracoes = resultado
+        yield b'id: %d\nevent: versao\ndata: {"versao":%d}\n\n' % (versao, versao) + _mensagens(alteracoes)
+
+        while time.monotonic() < fim:
+            try:
+                alteracoes = fila.get(timeout=min(intervalo, max(fim - time.monotonic(), 0)))
+            except queue.Empty:
+                yield b': ping\n\n'
+                continue
+
+            alteracoes = [alteracao for alteracao in alteracoes if alteracao['versao'] > versao]
+            if alteracoes:
+                versao = max(alteracao['versao'] for alteracao in alteracoes)
+                yield _mensagens(alteracoes)
+    finally:
+        distribuidor.cancelar(fila)
+
+
+def _mensagens(alteracoes: list) -> bytes:
+    """
+    Retorna as mensagens Server-Sent Events das alterações informadas (uma mensagem por pedido, cujo tipo é a
+    operação).
+    :param alteracoes: list
+    :return: bytes
+    """
+    return b''.join(b'id: %d\nevent: %s\ndata: %s\n\n' % (alteracao['versao'], alteracao['operacao'].encode(),
+                                                          dumps(alteracao)) for alteracao in alteracoes)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apos_flush(session: Session, contexto):
+    """
+    Após cada flush, registra no log as criações, alterações e exclusões de pedidos. É executada após o incremento da
+    versão da tabela de pedidos (ver 'versionamento.py', cujo evento é registrado antes deste).
+    :param session: Session
+    :param contexto: UOWTransaction
+    """
+    alteracoes = []
+
+    for operacao, entidades in (('criado', session.new), ('atualizado', session.dirty), ('excluido', session.deleted)):
+        for entidade in entidades:
+            if not isinstance(entidade, Pedido):
+                continue
+
+            if operacao == 'atualizado' and not session.is_modified(entidade):
+                continue
+
+            alteracoes.append((entidade.tipo, entidade.numero, operacao))
+
+    registrar_alteracoes(session, alteracoes)
+
+
+@ao_alterar('pedidos')
+def _notificar_pedidos():
+    """
+    Após o commit de uma alteração na tabela de pedidos, notifica o distribuidor de alterações do processo.
+    """
+    if not has_app_context():
+        return
+
+    distribuidor = current_app.extensions.get('alteracoes', None)
+    if distribuidor is not None:
+        distribuidor.notificar()
+
+
+def init_app(app):
+    """
+    Cria o distribuidor das alterações de pedidos da aplicação.
+    :param app: Flask
+    """
+    app.extensions['alteracoes'] = DistribuidorAlteracoes(app)
@@ -0,0 +1,57 @@
+from flask_jwt_extended import create_access_token, decode_token
+from sqlalchemy.orm import configure_mappers
+
+from src.consultas import consulta_pedidos, paginar
+from src.database import Pedido, PedidoArquivado, Usuario, db
+from src.serializacao import CAMPOS_PEDIDO, dumps, serializador_pedidos
+from src.versionamento import versao_tabela
+
+
+def aquecer(app):
+    """
+    Prepara a aplicação no processo principal do Gunicorn, antes da criação dos workers (ver 'when_ready' em
+    'gunicorn.conf.py'): configura os mapeamentos das entidades e executa as consultas das rotas mais utilizadas,
+    cujos comandos SQL compilados permanecem no cache do engine (que não é descartado com as conexões) e são
+    herdados pelos workers. Nenhuma requisição é executada, portanto as métricas e o log não são afetados.
+    :param app: Flask
+    """
+    configure_mappers()
+
+    with app.app_context():
+        try:
+            # Versões das tabelas (requisições condicionais e cache) e usuário autenticado (ver 'permissoes.py').
+            versao_tabela('pedidos')
+            versao_tabela('usuarios')
+            Usuario.query.get(0)
+            Usuario.query.filter_by(email='').first()
+
+            # Primeira página da busca de pedidos e leitura de um pedido (com o arquivo de pedidos). A chave
+            # consultada deve ter um tipo válido (no PostgreSQL, o tipo é um enum), e um número inexistente.
+            consulta = paginar(consulta_pedidos(CAMPOS_PEDIDO, {}, 'data_chegada'), 'data_chegada').limit(1)
+            serializar = serializador_pedidos(CAMPOS_PEDIDO)
+            dumps([serializar(linha) for linha in db.session.execute(consulta)])
+            Pedido.query.filter_by(numero=0, tipo='SE').first()
+            db.session.get(PedidoArquivado, ('SE', 0))
+
+            # Geração e verificação dos tokens de acesso.
+            decode_token(create_access_token(identity=0))
+        finally:
+            db.session.remove()
+
+
+def preparar_pool(app):
+    """
+    Abre as conexões do pool do banco de dados do worker (até 'DB_POOL_SIZE'), para que as primeiras requisições não
+    aguardem a conexão com o servidor. No SQLite, que não utiliza um pool de conexões com o servidor, nada é feito.
+    :param app: Flask
+    """
+    tamanho = app.config['SQLALCHEMY_ENGINE_OPTIONS'].get('pool_size', 0)
+
+    with app.app_context():
+        conexoes = []
+        try:
+            for _ in range(tamanho):
+                conexoes.append(db.engine.connect())
+        finally:
+            for conexao in conexoes:
+                conexao.close()
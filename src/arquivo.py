@@ -0,0 +1,63 @@
+from datetime import date
+
+from sqlalchemy import select, tuple_
+
+from src.database import Pedido, PedidoArquivado, db
+
+
+def data_limite(anos: int) -> date:
+    """
+    Retorna a data de retorno do financeiro a partir da qual os pedidos não são arquivados (a data atual, há a
+    quantidade de anos informada).
+    :param anos: int
+    :return: date
+    """
+    hoje = date.today()
+
+    # O dia 29 de fevereiro não existe nos anos não bissextos.
+    return hoje.replace(year=hoje.year - anos, day=min(hoje.day, 28) if hoje.month == 2 else hoje.day)
+
+
+def arquivar_pedidos(anos: int, tamanho_lote: int) -> int:
+    """
+    Move para a tabela de pedidos arquivados os pedidos cujo ciclo do financeiro foi encerrado (data de retorno do
+    financeiro informada) há mais anos que o informado. Cada lote é arquivado em uma transação: os pedidos são
+    gravados (comprimidos) no arquivo e excluídos através das entidades, portanto o resumo das estatísticas, a versão
+    da tabela de pedidos e o log de alterações são atualizados como em qualquer exclusão. Como a criação e a
+    importação de pedidos rejeitam as chaves arquivadas, um pedido com o mesmo 'tipo' e 'numero' de um pedido já
+    arquivado indica uma inconsistência, e dispara um RuntimeError sem arquivar o lote. Retorna a quantidade de
+    pedidos arquivados.
+    :param anos: int
+    :param tamanho_lote: int
+    :return: int
+    """
+    limite = data_limite(anos)
+    total = 0
+
+    while True:
+        pedidos = (Pedido.query
+                   .filter(Pedido.data_retorno_financeiro.isnot(None), Pedido.data_retorno_financeiro < limite)
+                   .order_by(Pedido.id)
+                   .limit(tamanho_lote)
+                   .with_for_update()
+                   .all())
+
+        if not pedidos:
+            return total
+
+        # Verifica se algum pedido do lote já foi arquivado, caso em que o pedido arquivado não é substituído.
+        arquivados = sorted((arquivado.tipo, arquivado.numero) for arquivado in db.session.execute(
+            select(PedidoArquivado.tipo, PedidoArquivado.numero)
+            .where(tuple_(PedidoArquivado.tipo, PedidoArquivado.numero)
+                   .in_([(pedido.tipo, pedido.numero) for pedido in pedidos]))))
+        if arquivados:
+            db.session.rollback()
+            raise RuntimeError('Pedidos já arquivados: {}.'.format(
+                ', '.join('{} {}'.format(tipo, numero) for tipo, numero in arquivados)))
+
+        db.session.add_all([PedidoArquivado.do_pedido(pedido) for pedido in pedidos])
+        for pedido in pedidos:
+            db.session.delete(pedido)
+        db.session.commit()
+
+        total += len(pedidos)
@@ -0,0 +1,576 @@
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+from flask import current_app, g, jsonify, request, Response
+from flask_jwt_extended import create_access_token, current_user, decode_token, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import HTTPException
+from werkzeug.urls import url_decode
+
+from src.condicionais import (definir_validadores, etag_consulta, nao_modificado, parametros_normalizados,
+                              precondicao_falhou, resposta_nao_modificada)
+from src.constants.http_status_codes import (HTTP_409_CONFLICT, HTTP_201_CREATED, HTTP_200_OK, HTTP_404_NOT_FOUND,
+                                             HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED,
+                                             HTTP_412_PRECONDITION_FAILED)
+from src.consultas import armazenar_busca, busca_em_cache, extrair_busca, resposta_pagina
+from src.database import Pedido, PedidoArquivado, TabelaVersao, Usuario
+from src.limitador import limitar_login, limpar_falhas_login, registrar_falha_login
+from src.pedidos import atualizar_pedido, novo_pedido
+from src.permissoes import UsuarioAutenticado
+
+# Drivers assíncronos utilizados em cada banco de dados.
+DRIVERS_ASSINCRONOS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+# Tamanho máximo (em bytes) do corpo das requisições mantido em memória; os corpos maiores (exemplo: importação de
+# pedidos) são gravados em um arquivo temporário.
+TAMANHO_CORPO_MEMORIA = 1024 * 1024
+
+# Métodos atendidos pelas rotas assíncronas (as requisições OPTIONS são respondidas pelo Flask).
+METODOS_ASSINCRONOS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def url_assincrona(database_url: str) -> str:
+    """
+    Retorna o endereço do banco de dados com o driver assíncrono correspondente (asyncpg no PostgreSQL e aiosqlite
+    no SQLite).
+    :param database_url: str
+    :return: str
+    """
+    esquema, _, restante = database_url.partition('://')
+    driver = DRIVERS_ASSINCRONOS.get(esquema.split('+', 1)[0], esquema)
+
+    # O asyncpg recebe o modo SSL no parâmetro 'ssl', ao invés do parâmetro 'sslmode' do libpq.
+    if driver == 'postgresql+asyncpg':
+        restante = restante.replace('sslmode=', 'ssl=')
+
+    return '{}://{}'.format(driver, restante)
+
+
+def opcoes_engine_assincrono(opcoes: dict) -> dict:
+    """
+    Converte as opções do engine síncrono (ver 'opcoes_engine') para o engine assíncrono. O asyncpg não aceita o
+    parâmetro 'options' do libpq, portanto as configurações da conexão (exemplo: statement_timeout) são informadas
+    em 'server_settings'.
+    :param opcoes: dict
+    :return: dict
+    """
+    opcoes = dict(opcoes)
+    argumentos = opcoes.pop('connect_args', {})
+
+    if 'options' in argumentos:
+        opcoes['connect_args'] = {
+            'server_settings': dict(item.split('=', 1) for item in argumentos['options'].replace('-c ', '').split()),
+        }
+
+    return opcoes
+
+
+async def autenticar(sessao: AsyncSession):
+    """
+    Verifica o token de acesso da requisição, assim como o decorador 'jwt_required'. O usuário do token é buscado
+    previamente no cache ou através do engine assíncrono, para que a busca do usuário autenticado (ver
+    'permissoes.init_app') não efetue uma consulta síncrona. Os erros do token são tratados pelo Flask-JWT-Extended.
+    :param sessao: AsyncSession
+    """
+    partes = request.headers.get('Authorization', '').split()
+
+    if len(partes) == 2:
+        try:
+            dados = decode_token(partes[1])
+        except (JWTExtendedException, jwt.PyJWTError):
+            dados = None
+
+        if dados is not None:
+            cache = current_app.extensions['usuarios_cache']
+            id = dados[current_app.config['JWT_IDENTITY_CLAIM']]
+
+            usuario = cache.obter(id)
+            if usuario is None:
+                entidade = await sessao.get(Usuario, id)
+                if entidade is not None:
+                    usuario = UsuarioAutenticado(entidade)
+                    cache.definir(usuario)
+
+            g.usuarios_precarregados = {id: usuario}
+
+    verify_jwt_in_request()
+
+
+async def _executar(funcao, *args):
+    """
+    Executa uma função bloqueante (exemplo: verificação de senha) no pool de threads do event loop.
+    :param funcao: Callable
+    :return: Any
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, funcao, *args)
+
+
+async def _buscar_pedido(sessao: AsyncSession, tipo: str, numero: int) -> Pedido:
+    """
+    Busca o pedido com o tipo e numero informados, ou retorna None caso não exista.
+    :param sessao: AsyncSession
+    :param tipo: str
+    :param numero: int
+    :return: Pedido | None
+    """
+    return (await sessao.execute(select(Pedido).filter_by(numero=numero, tipo=tipo))).scalars().first()
+
+
+async def login(sessao: AsyncSession) -> (Response, int):
+    """
+    Versão assíncrona de 'auth.login'.
+    :param sessao: AsyncSession
+    :return: (Response, int)
+    """
+    email = request.json.get('email', '')
+    senha = request.json.get('senha', '')
+
+    # Verifica os limites de tentativas de login antes de qualquer consulta ao banco de dados.
+    bloqueio = limitar_login(email)
+    if bloqueio is not None:
+        return bloqueio
+
+    usuario = (await sessao.execute(select(Usuario).filter_by(email=email))).scalars().first()
+
+    # A verificação e a geração dos hashes das senhas são executadas fora do event loop.
+    senhas = current_app.extensions['senhas']
+    if usuario and await _executar(senhas.verificar, usuario.senha, senha):
+        if await _executar(senhas.precisa_atualizar, usuario.senha):
+            usuario.senha = await _executar(senhas.gerar, senha)
+            await sessao.commit()
+
+        limpar_falhas_login(email)
+
+        return jsonify({
+            'usuario': usuario.to_dict(),
+            'access_token': create_access_token(identity=usuario.id),
+        }), HTTP_200_OK
+
+    registrar_falha_login(email)
+    return jsonify({
+        'error': 'Credenciais inválidas.'
+    }), HTTP_401_UNAUTHORIZED
+
+
+async def me(sessao: AsyncSession) -> (Response, int):
+    """
+    Versão assíncrona de 'auth.me'.
+    :param sessao: AsyncSession
+    :return: (Response, int)
+    """
+    await autenticar(sessao)
+
+    return jsonify({
+        'usuario': current_user.to_dict(),
+    }), HTTP_200_OK
+
+
+async def create(sessao: AsyncSession) -> (Response, int):
+    """
+    Versão assíncrona de 'pedidos.create'.
+    :param sessao: AsyncSession
+    :return: (Response, int)
+    """
+    await autenticar(sessao)
+
+    pedido = novo_pedido(request.json)
+
+    if await sessao.get(PedidoArquivado, (pedido.tipo, pedido.numero)) is not None:
+        return jsonify({
+            'error': 'Pedido já cadastrado (arquivado).',
+        }), HTTP_409_CONFLICT
+
+    sessao.add(pedido)
+
+    try:
+        await sessao.commit()
+    except IntegrityError:
+        await sessao.rollback()
+        return jsonify({
+            'error': 'Pedido já cadastrado.',
+        }), HTTP_409_CONFLICT
+
+    response = jsonify({
+        'pedido': pedido.to_dict(),
+    })
+    return definir_validadores(response, pedido.etag, pedido.ultima_modificacao), HTTP_201_CREATED
+
+
+async def read_all(sessao: AsyncSession) -> (Response, int):
+    """
+    Versão assíncrona de 'pedidos.read_all', exceto o streaming (parâmetro 'stream'), que é atendido pela rota
+    síncrona.
+    :param sessao: AsyncSession
+    :return: (Response, int)
+    """
+    await autenticar(sessao)
+
+    try:
+        busca = extrair_busca(request.args.to_dict(), current_app.config['PEDIDOS_LIMITE_MAXIMO'])
+    except ValueError as exc:
+        return jsonify({
+            'error': str(exc),
+        }), HTTP_400_BAD_REQUEST
+
+    versao = await sessao.get(TabelaVersao, 'pedidos')
+    etag = etag_consulta(versao.versao, parametros_normalizados())
+    if nao_modificado(etag, versao.atualizado_em):
+        return resposta_nao_modificada(etag, versao.atualizado_em)
+
+    # Busca completa (sem limite), com o resultado serializado mantido no cache, ou página de pedidos.
+    if busca['limit'] is None:
+        corpo = busca_em_cache(versao.versao)
+        if corpo is None:
+            corpo = armazenar_busca(versao.versao, busca, (await sessao.execute(busca['consulta'])).all())
+        response = Response(corpo, mimetype='application/json')
+    else:
+        response = resposta_pagina(busca, (await sessao.execute(busca['consulta'])).all())
+
+    return definir_validadores(response, etag, versao.atualizado_em), HTTP_200_OK
+
+
+async def read_one(sessao: AsyncSession, tipo: str, numero: int) -> (Response, int):
+    """
+    Versão assíncrona de 'pedidos.read_one'.
+    :param sessao: AsyncSession
+    :param tipo: str
+    :param numero: int
+    :return: (Response, int)
+    """
+    await autenticar(sessao)
+
+    pedido = await _buscar_pedido(sessao, tipo, numero) or await sessao.get(PedidoArquivado, (tipo, numero))
+    if not pedido:
+        return jsonify({
+            'error': 'Pedido não cadastrado.',
+        }), HTTP_404_NOT_FOUND
+
+    if nao_modificado(pedido.etag, pedido.ultima_modificacao):
+        return resposta_nao_modificada(pedido.etag, pedido.ultima_modificacao)
+
+    response = jsonify({
+        'pedido': pedido.to_dict(),
+    })
+    return definir_validadores(response, pedido.etag, pedido.ultima_modificacao), HTTP_200_OK
+
+
+async def update(sessao: AsyncSession, tipo: str, numero: int) -> (Response, int):
+    """
+    Versão assíncrona de 'pedidos.update'.
+    :param sessao: AsyncSession
+    :param tipo: str
+    :param numero: int
+    :return: (Response, int)
+    """
+    await autenticar(sessao)
+
+    pedido = await _buscar_pedido(sessao, tipo, numero)
+    if not pedido:
+        return jsonify({
+            'error': 'Pedido não cadastrado.',
+        }), HTTP_404_NOT_FOUND
+
+    if precondicao_falhou(pedido.etag):
+        return jsonify({
+            'error': 'O pedido foi alterado por outro usuário.',
+        }), HTTP_412_PRECONDITION_FAILED
+
+    atualizar_pedido(pedido, request.json)
+
+    try:
+        await sessao.commit()
+    except StaleDataError:
+        await sessao.rollback()
+        return jsonify({
+            'error': 'O pedido foi alterado por outro usuário.',
+        }), HTTP_412_PRECONDITION_FAILED
+
+    response = jsonify({
+        'pedido': pedido.to_dict(),
+    })
+    return definir_validadores(response, pedido.etag, pedido.ultima_modificacao), HTTP_200_OK
+
+
+async def delete(sessao: AsyncSession, tipo: str, numero: int) -> (Response, int):
+    """
+    Versão assíncrona de 'pedidos.delete'.
+    :param sessao: AsyncSession
+    :param tipo: str
+    :param numero: int
+    :return: (Response, int)
+    """
+    await autenticar(sessao)
+
+    pedido = await _buscar_pedido(sessao, tipo, numero)
+    if not pedido:
+        return jsonify({
+            'error': 'Pedido não cadastrado.',
+        }), HTTP_404_NOT_FOUND
+
+    if precondicao_falhou(pedido.etag):
+        return jsonify({
+            'error': 'O pedido foi alterado por outro usuário.',
+        }), HTTP_412_PRECONDITION_FAILED
+
+    await sessao.delete(pedido)
+
+    try:
+        await sessao.commit()
+    except StaleDataError:
+        await sessao.rollback()
+        return jsonify({
+            'error': 'O pedido foi alterado por outro usuário.',
+        }), HTTP_412_PRECONDITION_FAILED
+
+    return jsonify({}), HTTP_204_NO_CONTENT
+
+
+# Rotas atendidas de forma assíncrona, indexadas pelo endpoint da rota síncrona correspondente. As demais rotas
+# (usuários, exportação, importação, métricas e SPA) são atendidas pela aplicação Flask em um pool de threads.
+ROTAS_ASSINCRONAS = {
+    'auth.login': login,
+    'auth.me': me,
+    'pedidos.create': create,
+    'pedidos.read_all': read_all,
+    'pedidos.read_one': read_one,
+    'pedidos.update': update,
+    'pedidos.delete': delete,
+}
+
+
+class AplicacaoAsgi:
+    """ Aplicação ASGI que atende as rotas de autenticação e de pedidos de forma assíncrona, através do engine
+    assíncrono do SQLAlchemy, mantendo as mesmas URIs, respostas e autenticação da aplicação Flask. As demais rotas
+    são repassadas à aplicação Flask (WSGI), executada em um pool de 'ASGI_THREADS' threads. """
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=app.config['ASGI_THREADS'])
+        self.engine = None
+        self.sessoes = None
+        self.pid = None
+
+    async def __call__(self, scope: dict, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._ciclo_de_vida(receive, send)
+
+        if scope['type'] != 'http':
+            raise RuntimeError('Tipo de conexão não suportado: {}.'.format(scope['type']))
+
+        environ = self._environ(scope, *await self._ler_corpo(receive))
+        rota = self._rota_assincrona(environ)
+
+        if rota is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._executar_wsgi, environ, send, loop)
+
+        status, cabecalhos, corpo = await self._executar_assincrona(environ, rota)
+        await send({'type': 'http.response.start', 'status': status, 'headers': cabecalhos})
+        await send({'type': 'http.response.body', 'body': corpo})
+
+    def _iniciar_engine(self):
+        """
+        Cria o engine assíncrono do banco de dados no processo atual (os processos do Gunicorn são criados após a
+        importação da aplicação, e as conexões não podem ser compartilhadas entre eles).
+        """
+        if self.engine is not None and self.pid == os.getpid():
+            return
+
+        self.engine = create_async_engine(url_assincrona(self.app.config['SQLALCHEMY_DATABASE_URI']),
+                                          **opcoes_engine_assincrono(self.app.config['SQLALCHEMY_ENGINE_OPTIONS']))
+        self.sessoes = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.pid = os.getpid()
+
+    async def _ciclo_de_vida(self, receive, send):
+        """
+        Trata os eventos de inicialização e encerramento do servidor ASGI (lifespan), criando e encerrando o engine
+        assíncrono.
+        """
+        while True:
+            mensagem = await receive()
+
+            if mensagem['type'] == 'lifespan.startup':
+                self._iniciar_engine()
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _ler_corpo(receive):
+        """
+        Lê o corpo da requisição, mantendo-o em memória ou, caso seja maior que 'TAMANHO_CORPO_MEMORIA', em um
+        arquivo temporário. Retorna o corpo e o seu tamanho (em bytes).
+        :return: (SpooledTemporaryFile, int)
+        """
+        corpo = tempfile.SpooledTemporaryFile(max_size=TAMANHO_CORPO_MEMORIA)
+        tamanho = 0
+
+        while True:
+            mensagem = await receive()
+            tamanho += corpo.write(mensagem.get('body', b''))
+            if mensagem['type'] != 'http.request' or not mensagem.get('more_body', False):
+                break
+
+        corpo.seek(0)
+        return corpo, tamanho
+
+    @staticmethod
+    def _environ(scope: dict, corpo, tamanho: int) -> dict:
+        """
+        Monta o ambiente WSGI (environ) da requisição a partir da conexão ASGI (scope). Como o corpo foi lido
+        integralmente, o seu tamanho é informado em 'CONTENT_LENGTH', inclusive nas requisições enviadas em partes
+        (chunked).
+        :param scope: dict
+        :param corpo: SpooledTemporaryFile
+        :param tamanho: int
+        :return: dict
+        """
+        servidor = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': servidor[0],
+            'SERVER_PORT': str(servidor[1] or 80),
+            'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': corpo,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+
+        if scope.get('client'):
+            environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+        for nome, valor in scope['headers']:
+            nome, valor = nome.decode('latin-1'), valor.decode('latin-1')
+            if nome == 'content-length':
+                continue
+            elif nome == 'content-type':
+                chave = 'CONTENT_TYPE'
+            else:
+                chave = 'HTTP_' + nome.upper().replace('-', '_')
+
+            environ[chave] = environ[chave] + ',' + valor if chave in environ else valor
+
+        environ['CONTENT_LENGTH'] = str(tamanho)
+
+        return environ
+
+    def _rota_assincrona(self, environ: dict):
+        """
+        Retorna a função assíncrona que atende a requisição, ou None caso ela deva ser atendida pela aplicação Flask.
+        :param environ: dict
+        :return: Callable | None
+        """
+        if environ['REQUEST_METHOD'] not in METODOS_ASSINCRONOS:
+            return None
+
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+
+        # O streaming de pedidos é enviado em partes pela rota síncrona.
+        if endpoint == 'pedidos.read_all' and 'stream' in url_decode(environ['QUERY_STRING']):
+            return None
+
+        # As requisições com chave de idempotência são atendidas pelas rotas síncronas (ver 'idempotencia.py').
+        if 'HTTP_IDEMPOTENCY_KEY' in environ:
+            return None
+
+        return ROTAS_ASSINCRONAS.get(endpoint, None)
+
+    async def _executar_assincrona(self, environ: dict, rota) -> (int, list, bytes):
+        """
+        Executa a rota assíncrona no contexto de uma requisição do Flask, aplicando as mesmas etapas de
+        'Flask.full_dispatch_request' (funções before_request/after_request e tratamento de erros).
+        :param environ: dict
+        :param rota: Callable
+        :return: (int, list, bytes)
+        """
+        self._iniciar_engine()
+
+        contexto = self.app.request_context(environ)
+        contexto.push()
+        erro = None
+        try:
+            try:
+                resultado = self.app.preprocess_request()
+                if resultado is None:
+                    async with self.sessoes() as sessao:
+                        resultado = await rota(sessao, **request.view_args)
+            except Exception as exc:
+                resultado = self.app.handle_user_exception(exc)
+            response = self.app.finalize_request(resultado)
+        except Exception as exc:
+            erro = exc
+            response = self.app.handle_exception(exc)
+
+        try:
+            iteravel, status, cabecalhos = response.get_wsgi_response(environ)
+            corpo = b''.join(iteravel)
+        finally:
+            contexto.pop(erro)
+
+        return (int(status.split(' ', 1)[0]),
+                [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in cabecalhos], corpo)
+
+    def _executar_wsgi(self, environ: dict, send, loop):
+        """
+        Executa a aplicação Flask (em uma thread do pool), enviando a resposta em partes através do event loop. A
+        resposta inteira é gerada na mesma thread, preservando o contexto das respostas enviadas em streaming.
+        :param environ: dict
+        :param send: Callable
+        :param loop: AbstractEventLoop
+        """
+        inicio = {}
+
+        def enviar(mensagem: dict):
+            asyncio.run_coroutine_threadsafe(send(mensagem), loop).result()
+
+        def escrever(dados: bytes):
+            if inicio:
+                enviar(inicio.pop('mensagem'))
+            enviar({'type': 'http.response.body', 'body': dados, 'more_body': True})
+
+        def start_response(status: str, cabecalhos: list, exc_info=None):
+            inicio['mensagem'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in cabecalhos],
+            }
+            return escrever
+
+        resultado = self.app(environ, start_response)
+        try:
+            for parte in resultado:
+                if parte:
+                    escrever(parte)
+
+            if inicio:
+                enviar(inicio.pop('mensagem'))
+            enviar({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(resultado, 'close'):
+                resultado.close()
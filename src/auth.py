@@ -1,9 +1,10 @@
 from flask import Blueprint, request, jsonify, Response
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import check_password_hash
+from flask_jwt_extended import create_access_token, jwt_required, current_user
 
 from src.constants.http_status_codes import HTTP_401_UNAUTHORIZED, HTTP_200_OK
-from src.database import Usuario
+from src.database import Usuario, db
+from src.limitador import limitar_login, limpar_falhas_login, registrar_falha_login
+from src.senhas import gerar_hash, precisa_atualizar, verificar_senha
 
 # Criação do Blueprint das rotas de autenticação.
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -22,16 +23,32 @@ def login() -> (Response, int):
     email = request.json.get('email', '')
     senha = request.json.get('senha', '')
 
+    # Verifica os limites de tentativas de login do endereço IP e do email, antes de qualquer consulta ao banco de
+    # dados ou verificação de senha. Caso algum limite tenha sido atingido, retorna uma resposta JSON com status 429
+    # (Muitas Requisições), contendo o cabeçalho 'Retry-After'.
+    bloqueio = limitar_login(email)
+    if bloqueio is not None:
+        return bloqueio
+
     # Busca um usuário no banco de dados com o email informado.
     usuario = Usuario.query.filter_by(email=email).first()
 
     # Caso o usuário exista, inicia o processo de autenticação.
     if usuario:
-        # Verifica se a senha informada corresponde à senha do usuário encontrado.
-        is_pass_correct = check_password_hash(usuario.senha, senha)
+        # Verifica se a senha informada corresponde à senha do usuário encontrado (em um processo do pool de senhas).
+        is_pass_correct = verificar_senha(usuario.senha, senha)
 
         # Caso a senha corresponda, continua o processo de autenticação.
         if is_pass_correct:
+            # Caso o hash da senha tenha sido gerado com parâmetros de custo diferentes dos configurados, gera
+            # novamente o hash a partir da senha informada.
+            if precisa_atualizar(usuario.senha):
+                usuario.senha = gerar_hash(senha)
+                db.session.commit()
+
+            # Remove as tentativas mal sucedidas do email.
+            limpar_falhas_login(email)
+
             # Gera o token de acesso, contendo como identidade o id do usuário.
             access_token = create_access_token(identity=usuario.id)
 
@@ -41,8 +58,9 @@ def login() -> (Response, int):
                 'access_token': access_token,
             }), HTTP_200_OK
 
-    # Caso alguma etapa de autenticação não seja bem sucedida, retorna uma resposta JSON com status 401 (Não
-    # Autorizado), contendo a mensagem de erro.
+    # Caso alguma etapa de autenticação não seja bem sucedida, registra a tentativa mal sucedida do email e retorna
+    # uma resposta JSON com status 401 (Não Autorizado), contendo a mensagem de erro.
+    registrar_falha_login(email)
     return jsonify({
         'error': 'Credenciais inválidas.'
     }), HTTP_401_UNAUTHORIZED
@@ -58,11 +76,9 @@ def me() -> (Response, int):
     :return: (Response, int)
     """
 
-    # Busca a identidade contida no token de acesso (id do usuário).
-    usuario_id = get_jwt_identity()
-
-    # Busca um usuário no banco de dados com o id encontrado.
-    usuario = Usuario.query.filter_by(id=usuario_id).first()
+    # Busca o usuário autenticado, carregado a partir do token de acesso (mantido em cache, sem consultar o banco de
+    # dados a cada requisição).
+    usuario = current_user
 
     # Retorna uma resposta JSON com status 200 (OK), contendo o usuario autenticado.
     return jsonify({
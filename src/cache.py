@@ -0,0 +1,222 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Blueprint, current_app, has_app_context, jsonify, Response
+from flask_jwt_extended import jwt_required
+
+from src.constants.http_status_codes import HTTP_200_OK
+from src.versionamento import ao_alterar
+
+# Biblioteca opcional de comunicação com o Redis, necessária apenas para o cache compartilhado entre processos.
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Criação do Blueprint das rotas de consulta do cache.
+cache_bp = Blueprint('cache', __name__, url_prefix='/api/cache')
+
+
+class CacheMemoria:
+    """ Cache em memória (por processo), com descarte do item menos recentemente utilizado (LRU), tempo de expiração
+    (TTL) e tamanho máximo em bytes. """
+
+    def __init__(self, ttl: int, tamanho_maximo: int):
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self.tamanho = 0
+        self.itens = OrderedDict()
+        self.trava = threading.Lock()
+        self.contadores = {'acertos': 0, 'falhas': 0, 'descartes': 0, 'expiracoes': 0, 'invalidacoes': 0}
+
+    def obter(self, chave: str):
+        """
+        Retorna o valor armazenado na chave informada, ou None caso a chave não exista ou tenha expirado.
+        :param chave: str
+        :return: bytes | None
+        """
+        with self.trava:
+            item = self.itens.get(chave, None)
+
+            if item is None:
+                self.contadores['falhas'] += 1
+                return None
+
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                self._remover(chave)
+                self.contadores['expiracoes'] += 1
+                self.contadores['falhas'] += 1
+                return None
+
+            self.itens.move_to_end(chave)
+            self.contadores['acertos'] += 1
+            return valor
+
+    def definir(self, chave: str, valor: bytes):
+        """
+        Armazena o valor na chave informada, descartando os itens menos recentemente utilizados caso o tamanho máximo
+        seja ultrapassado. Valores maiores que o tamanho máximo do cache não são armazenados.
+        :param chave: str
+        :param valor: bytes
+        """
+        tamanho = len(chave) + len(valor)
+        if tamanho > self.tamanho_maximo:
+            return
+
+        with self.trava:
+            if chave in self.itens:
+                self._remover(chave)
+
+            while self.itens and self.tamanho + tamanho > self.tamanho_maximo:
+                self._remover(next(iter(self.itens)))
+                self.contadores['descartes'] += 1
+
+            self.itens[chave] = (valor, time.monotonic() + self.ttl)
+            self.tamanho += tamanho
+
+    def invalidar(self, prefixo: str = ''):
+        """
+        Remove do cache as chaves que começam com o prefixo informado.
+        :param prefixo: str
+        """
+        with self.trava:
+            for chave in [chave for chave in self.itens if chave.startswith(prefixo)]:
+                self._remover(chave)
+            self.contadores['invalidacoes'] += 1
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna os contadores e a ocupação do cache.
+        :return: dict
+        """
+        with self.trava:
+            return dict(self.contadores, backend='memoria', itens=len(self.itens), bytes=self.tamanho,
+                        bytes_maximo=self.tamanho_maximo)
+
+    def _remover(self, chave: str):
+        valor, _ = self.itens.pop(chave)
+        self.tamanho -= len(chave) + len(valor)
+
+
+class CacheRedis:
+    """ Cache compartilhado entre processos, armazenado em um servidor compatível com o protocolo do Redis. Caso o
+    servidor esteja indisponível, as consultas são tratadas como falhas e a aplicação continua funcionando. """
+
+    def __init__(self, url: str, ttl: int, prefixo: str = 'controle-de-pedidos:'):
+        if redis is None:
+            raise RuntimeError('A biblioteca "redis" é necessária para utilizar o cache Redis.')
+
+        self.cliente = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self.trava = threading.Lock()
+        self.contadores = {'acertos': 0, 'falhas': 0, 'erros': 0, 'invalidacoes': 0}
+
+    def _contar(self, contador: str):
+        with self.trava:
+            self.contadores[contador] += 1
+
+    def obter(self, chave: str):
+        try:
+            valor = self.cliente.get(self.prefixo + chave)
+        except redis.RedisError:
+            self._contar('erros')
+            valor = None
+
+        self._contar('acertos' if valor is not None else 'falhas')
+        return valor
+
+    def definir(self, chave: str, valor: bytes):
+        try:
+            self.cliente.set(self.prefixo + chave, valor, ex=self.ttl)
+        except redis.RedisError:
+            self._contar('erros')
+
+    def invalidar(self, prefixo: str = ''):
+        """
+        Apenas contabiliza a invalidação: as chaves das consultas contêm a versão da tabela (ver 'chave_consulta'),
+        portanto os resultados anteriores a uma alteração deixam de ser acessados e expiram após 'CACHE_TTL' segundos.
+        Percorrer as chaves do servidor (SCAN) a cada alteração teria custo proporcional a todo o keyspace.
+        :param prefixo: str
+        """
+        self._contar('invalidacoes')
+
+    def estatisticas(self) -> dict:
+        with self.trava:
+            estatisticas = dict(self.contadores, backend='redis')
+
+        # O número de descartes é o do servidor, compartilhado entre todos os processos.
+        try:
+            informacoes = self.cliente.info('stats')
+            estatisticas['descartes'] = informacoes.get('evicted_keys', 0)
+            estatisticas['expiracoes'] = informacoes.get('expired_keys', 0)
+        except redis.RedisError:
+            pass
+
+        return estatisticas
+
+
+def init_app(app):
+    """
+    Cria o cache da aplicação conforme a configuração 'CACHE_BACKEND' ('memoria', 'redis' ou 'nenhum').
+    :param app: Flask
+    """
+    backend = app.config['CACHE_BACKEND']
+
+    if backend == 'memoria':
+        app.extensions['cache'] = CacheMemoria(app.config['CACHE_TTL'], app.config['CACHE_TAMANHO_MAXIMO'])
+    elif backend == 'redis':
+        app.extensions['cache'] = CacheRedis(app.config['REDIS_URL'], app.config['CACHE_TTL'])
+    else:
+        app.extensions['cache'] = None
+
+
+def cache_atual():
+    """
+    Retorna o cache da aplicação atual, ou None caso o cache esteja desabilitado.
+    :return: CacheMemoria | CacheRedis | None
+    """
+    return current_app.extensions.get('cache', None)
+
+
+def chave_consulta(tabela: str, versao: int, parametros: str) -> str:
+    """
+    Retorna a chave do cache do resultado de uma consulta. A chave contém a versão da tabela, portanto qualquer
+    alteração na tabela torna inacessíveis os resultados anteriores, inclusive nos demais processos.
+    :param tabela: str
+    :param versao: int
+    :param parametros: str
+    :return: str
+    """
+    return '{}:{}:{}'.format(tabela, versao, hashlib.sha1(parametros.encode()).hexdigest())
+
+
+@ao_alterar('pedidos')
+def _invalidar_pedidos():
+    """
+    Após o commit de uma alteração na tabela de pedidos, remove do cache os resultados das consultas de pedidos.
+    """
+    if not has_app_context():
+        return
+
+    cache = cache_atual()
+    if cache is not None:
+        cache.invalidar('pedidos:')
+
+
+@cache_bp.get('')
+@jwt_required()
+def estatisticas() -> (Response, int):
+    """
+    Retorna os contadores do cache (acertos, falhas, descartes, expirações e invalidações) e a sua ocupação.
+    Método da Requisição: GET.
+    :return: (Response, int)
+    """
+    cache = cache_atual()
+
+    return jsonify({
+        'cache': cache.estatisticas() if cache is not None else None,
+    }), HTTP_200_OK
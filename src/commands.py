@@ -1,8 +1,18 @@
-from click import command
+import os
+
+from click import command, argument, option, echo, File, Choice
+from flask import current_app
 from flask.cli import with_appcontext
-from werkzeug.security import generate_password_hash
 
+from src.alteracoes import remover_alteracoes
+from src.arquivo import arquivar_pedidos
 from src.database import db, Usuario
+from src.estatisticas import atualizar_resumo
+from src.idempotencia import remover_respostas
+from src.importacao import FORMATOS, abrir_texto, importar_pedidos, ler_linhas
+from src.replicas import replicas_atuais
+from src.senhas import gerar_hash
+from src.spa import brotli, comprimir_arquivos
 
 
 @command(name='init_database')
@@ -17,7 +27,7 @@ def init_database():
     usuario = Usuario(
         nome='Administrador',
         email='admin@admin.dev',
-        senha=generate_password_hash('admin'),
+        senha=gerar_hash('admin'),
         admin=True,
     )
 
@@ -28,3 +38,112 @@ def init_database():
     db.session.commit()
 
 
+@command(name='import_pedidos')
+@argument('arquivo', type=File('rb'))
+@option('--formato', type=Choice(FORMATOS), default=None,
+        help='Formato do arquivo. Caso não seja informado, será identificado pela extensão.')
+@option('--lote', type=int, default=None, help='Quantidade de pedidos inseridos por lote.')
+@with_appcontext
+def import_pedidos(arquivo, formato, lote):
+    """
+    Importa os pedidos contidos em um arquivo CSV ou NDJSON.
+    """
+
+    # Identifica o formato do arquivo pela extensão, caso não tenha sido informado.
+    if formato is None:
+        formato = 'csv' if os.path.splitext(arquivo.name)[1].lower() == '.csv' else 'ndjson'
+
+    # Importa os pedidos, utilizando o tamanho de lote informado ou o configurado na aplicação.
+    relatorio = importar_pedidos(ler_linhas(abrir_texto(arquivo), formato),
+                                 lote or current_app.config['PEDIDOS_IMPORTACAO_LOTE'])
+
+    # Exibe os erros de cada linha e o resumo da importação.
+    for erro in relatorio['erros']:
+        echo('Linha {}: {}'.format(erro['linha'], erro['error']))
+
+    echo('{} linhas lidas, {} pedidos importados e {} erros em {}s ({} linhas/s, lotes de {}).'.format(
+        relatorio['total'], relatorio['importados'], relatorio['total_erros'], relatorio['duracao'],
+        relatorio['linhas_por_segundo'], relatorio['tamanho_lote']))
+
+
+@command(name='compress_static')
+@with_appcontext
+def compress_static():
+    """
+    Gera as versões pré-comprimidas (gzip e Brotli) dos arquivos estáticos do frontend compilado.
+    """
+    diretorios = (os.path.join(current_app.root_path, 'static'),
+                  os.path.join(current_app.root_path, current_app.template_folder))
+
+    gerados = comprimir_arquivos(diretorios)
+
+    echo('{} arquivos comprimidos gerados{}.'.format(
+        gerados, '' if brotli is not None else ' (apenas gzip: a biblioteca "brotli" não está instalada)'))
+
+
+@command(name='refresh_stats')
+@with_appcontext
+def refresh_stats():
+    """
+    Recalcula o resumo de pedidos utilizado pelas estatísticas, a partir de todos os pedidos cadastrados.
+    """
+    registros = atualizar_resumo(db.session.connection())
+    db.session.commit()
+
+    echo('Resumo de pedidos recalculado ({} registros).'.format(registros))
+
+
+@command(name='purge_changes')
+@option('--dias', type=int, default=7, help='Quantidade de dias das alterações mantidas no log.')
+@with_appcontext
+def purge_changes(dias):
+    """
+    Remove do log de alterações de pedidos as alterações mais antigas que a quantidade de dias informada.
+    """
+    removidas = remover_alteracoes(dias)
+
+    echo('{} alterações removidas do log de alterações de pedidos.'.format(removidas))
+
+
+@command(name='purge_idempotency')
+@with_appcontext
+def purge_idempotency():
+    """
+    Remove as respostas armazenadas das requisições idempotentes cuja validade expirou.
+    """
+    removidas = remover_respostas()
+
+    echo('{} respostas expiradas removidas.'.format(removidas))
+
+
+@command(name='archive_pedidos')
+@option('--anos', type=int, default=5, help='Anos desde o retorno do financeiro para que o pedido seja arquivado.')
+@option('--lote', type=int, default=1000, help='Quantidade de pedidos arquivados por transação.')
+@with_appcontext
+def archive_pedidos(anos, lote):
+    """
+    Move para o arquivo os pedidos cujo ciclo do financeiro foi encerrado há mais anos que o informado.
+    """
+    arquivados = arquivar_pedidos(anos, lote)
+
+    echo('{} pedidos arquivados.'.format(arquivados))
+
+
+@command(name='replica_status')
+@with_appcontext
+def replica_status():
+    """
+    Verifica e exibe o atraso de cada réplica de leitura do banco de dados.
+    """
+    replicas = replicas_atuais()
+
+    if replicas is None:
+        echo('Nenhuma réplica configurada (DATABASE_REPLICA_URLS).')
+        return
+
+    replicas.verificar(db.engine)
+
+    for replica in replicas.replicas:
+        dados = replica.to_dict()
+        echo('{}: {}'.format(dados['url'], 'atraso de {}s'.format(dados['atraso']) if dados['disponivel']
+                             else 'ignorada ({})'.format(dados['erro'])))
@@ -0,0 +1,166 @@
+import zlib
+
+from flask import current_app, request, Response
+
+from src.instrumentacao import cronometro
+
+# Bibliotecas opcionais de compressão Brotli e Zstandard. Caso não estejam instaladas, as respostas são comprimidas
+# apenas em gzip.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Prefixo das rotas cujas respostas são comprimidas.
+PREFIXO_API = '/api/'
+
+# Tipos de conteúdo comprimidos (os Server-Sent Events não são comprimidos, pois cada mensagem deve ser entregue
+# imediatamente, e o formato XLSX já é um arquivo ZIP).
+TIPOS_COMPRIMIVEIS = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain')
+
+# Status das respostas que não possuem corpo ou cujo corpo não pode ser comprimido.
+STATUS_SEM_COMPRESSAO = (204, 206, 304)
+
+
+def codificacoes_disponiveis(codificacoes: list) -> list:
+    """
+    Retorna as codificações configuradas cujas bibliotecas estão instaladas, na ordem de preferência do servidor.
+    :param codificacoes: list
+    :return: list
+    """
+    instaladas = {'br': brotli is not None, 'zstd': zstandard is not None, 'gzip': True}
+
+    return [codificacao for codificacao in codificacoes if instaladas.get(codificacao, False)]
+
+
+def compressor(codificacao: str, configuracao: dict):
+    """
+    Cria um compressor da codificação informada, com o nível configurado, retornando as funções que comprimem uma
+    parte do conteúdo e que finalizam a compressão.
+    :param codificacao: str
+    :param configuracao: dict
+    :return: (Callable[[bytes], bytes], Callable[[], bytes])
+    """
+    if codificacao == 'br':
+        objeto = brotli.Compressor(quality=configuracao['nivel_brotli'])
+        return objeto.process, objeto.finish
+
+    if codificacao == 'zstd':
+        objeto = zstandard.ZstdCompressor(level=configuracao['nivel_zstd']).compressobj()
+        return objeto.compress, objeto.flush
+
+    objeto = zlib.compressobj(configuracao['nivel'], zlib.DEFLATED, 31)
+    return objeto.compress, objeto.flush
+
+
+def comprimir(corpo: bytes, codificacao: str, configuracao: dict) -> bytes:
+    """
+    Comprime o conteúdo informado na codificação informada.
+    :param corpo: bytes
+    :param codificacao: str
+    :param configuracao: dict
+    :return: bytes
+    """
+    comprimir_parte, finalizar = compressor(codificacao, configuracao)
+    return comprimir_parte(corpo) + finalizar()
+
+
+def comprimir_partes(partes, codificacao: str, configuracao: dict):
+    """
+    Comprime (em partes) o conteúdo de uma resposta enviada em streaming, à medida em que é gerado.
+    :param partes: Iterable[bytes]
+    :param codificacao: str
+    :param configuracao: dict
+    :return: Generator[bytes]
+    """
+    comprimir_parte, finalizar = compressor(codificacao, configuracao)
+
+    try:
+        for parte in partes:
+            dados = comprimir_parte(parte.encode() if isinstance(parte, str) else parte)
+            if dados:
+                yield dados
+
+        yield finalizar()
+    finally:
+        if hasattr(partes, 'close'):
+            partes.close()
+
+
+def _comprimivel(response: Response) -> bool:
+    """
+    Verifica se a resposta da requisição atual pode ser comprimida.
+    :param response: Response
+    :return: bool
+    """
+    return (request.path.startswith(PREFIXO_API)
+            and response.mimetype in TIPOS_COMPRIMIVEIS
+            and response.status_code >= 200 and response.status_code not in STATUS_SEM_COMPRESSAO
+            and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers
+            and 'no-transform' not in response.headers.get('Cache-Control', ''))
+
+
+def _apos_requisicao(response: Response) -> Response:
+    """
+    Após cada requisição às rotas da API, comprime a resposta na codificação aceita pelo cliente (cabeçalho
+    'Accept-Encoding') com a maior preferência, entre as codificações disponíveis. As respostas enviadas em streaming
+    são comprimidas em partes, à medida em que são geradas; as demais, apenas caso possuam ao menos
+    'COMPRESSAO_TAMANHO_MINIMO' bytes.
+    :param response: Response
+    :return: Response
+    """
+    configuracao = current_app.extensions['compressao']
+
+    if not configuracao['codificacoes'] or not _comprimivel(response):
+        return response
+
+    # A resposta depende do cabeçalho 'Accept-Encoding', mesmo quando não é comprimida.
+    response.vary.add('Accept-Encoding')
+
+    codificacao = request.accept_encodings.best_match(configuracao['codificacoes'])
+    if codificacao is None:
+        return response
+
+    if response.is_streamed:
+        response.response = comprimir_partes(response.response, codificacao, configuracao)
+        response.headers.pop('Content-Length', None)
+    else:
+        corpo = response.get_data()
+        if len(corpo) < configuracao['tamanho_minimo']:
+            return response
+
+        with cronometro('compressao'):
+            response.set_data(comprimir(corpo, codificacao, configuracao))
+
+    response.content_encoding = codificacao
+
+    # O conteúdo comprimido é uma representação diferente do recurso, portanto o ETag recebe o sufixo da codificação
+    # (como na página da SPA). O sufixo é desconsiderado na validação das requisições condicionais.
+    etag, fraco = response.get_etag()
+    if etag:
+        response.set_etag('{}-{}'.format(etag, codificacao), fraco)
+
+    return response
+
+
+def init_app(app):
+    """
+    Inicializa a compressão das respostas das rotas da API, nas codificações 'COMPRESSAO_CODIFICACOES' (na ordem de
+    preferência do servidor) cujas bibliotecas estão instaladas, com os níveis de compressão configurados.
+    :param app: Flask
+    """
+    app.extensions['compressao'] = {
+        'codificacoes': codificacoes_disponiveis(app.config['COMPRESSAO_CODIFICACOES']),
+        'tamanho_minimo': app.config['COMPRESSAO_TAMANHO_MINIMO'],
+        'nivel': app.config['COMPRESSAO_NIVEL'],
+        'nivel_brotli': app.config['COMPRESSAO_NIVEL_BROTLI'],
+        'nivel_zstd': app.config['COMPRESSAO_NIVEL_ZSTD'],
+    }
+
+    app.after_request(_apos_requisicao)
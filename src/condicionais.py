@@ -0,0 +1,112 @@
+import hashlib
+from datetime import datetime
+
+from flask import request, Response
+
+from src.constants.http_status_codes import HTTP_304_NOT_MODIFIED
+
+# Sufixos adicionados ao ETag das respostas comprimidas, conforme a codificação (ver 'compressao.py').
+SUFIXOS_CODIFICACAO = ('-br', '-zstd', '-gzip')
+
+
+def etag_consulta(versao: int, *partes) -> str:
+    """
+    Retorna o identificador (ETag) do resultado de uma consulta, a partir da versão da tabela consultada e dos
+    parâmetros da consulta. Enquanto a tabela não for alterada, a mesma consulta resulta no mesmo ETag.
+    :param versao: int
+    :param partes: Any
+    :return: str
+    """
+    conteudo = '\x1f'.join(str(parte) for parte in (versao,) + partes)
+    return hashlib.sha1(conteudo.encode()).hexdigest()
+
+
+def parametros_normalizados() -> str:
+    """
+    Retorna os parâmetros da requisição atual ordenados, para que a ordem dos parâmetros não altere o ETag.
+    :return: str
+    """
+    return '&'.join('{}={}'.format(chave, valor) for chave, valor in sorted(request.args.items(multi=True)))
+
+
+def _contem(etags, etag: str, fraca: bool) -> bool:
+    """
+    Verifica se o ETag informado está entre os ETags do cabeçalho condicional, desconsiderando o sufixo da
+    codificação das respostas comprimidas. Na comparação fraca, os ETags fracos do cabeçalho também são considerados.
+    :param etags: ETags
+    :param etag: str
+    :param fraca: bool
+    :return: bool
+    """
+    if etags.star_tag:
+        return True
+
+    for informado in etags.as_set(include_weak=fraca):
+        if informado.endswith(SUFIXOS_CODIFICACAO):
+            informado = informado.rsplit('-', 1)[0]
+        if informado == etag:
+            return True
+
+    return False
+
+
+def nao_modificado(etag: str, ultima_modificacao: datetime = None) -> bool:
+    """
+    Verifica se o cliente já possui a versão atual do recurso, através dos cabeçalhos 'If-None-Match' e, caso este
+    não tenha sido informado, 'If-Modified-Since'.
+    :param etag: str
+    :param ultima_modificacao: datetime
+    :return: bool
+    """
+    if request.if_none_match:
+        return _contem(request.if_none_match, etag, fraca=True)
+
+    if request.if_modified_since and ultima_modificacao:
+        # O cabeçalho possui precisão de segundos, portanto a data da última modificação (armazenada no horário
+        # local) também é truncada.
+        return ultima_modificacao.replace(microsecond=0).astimezone() <= request.if_modified_since
+
+    return False
+
+
+def precondicao_falhou(etag: str) -> bool:
+    """
+    Verifica se o cabeçalho 'If-Match' foi informado e não corresponde à versão atual do recurso (ETag), ou seja, se
+    o cliente está tentando alterar uma versão desatualizada do recurso.
+    :param etag: str
+    :return: bool
+    """
+    if not request.if_match:
+        return False
+
+    return not _contem(request.if_match, etag, fraca=False)
+
+
+def definir_validadores(response: Response, etag: str, ultima_modificacao: datetime = None) -> Response:
+    """
+    Define na resposta os cabeçalhos de validação do cache HTTP (ETag e Last-Modified). O cliente deve sempre
+    revalidar a resposta, pois ela depende da autenticação.
+    :param response: Response
+    :param etag: str
+    :param ultima_modificacao: datetime
+    :return: Response
+    """
+    response.set_etag(etag)
+
+    if ultima_modificacao:
+        response.last_modified = ultima_modificacao.replace(microsecond=0).astimezone()
+
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+    return response
+
+
+def resposta_nao_modificada(etag: str, ultima_modificacao: datetime = None) -> (Response, int):
+    """
+    Retorna uma resposta vazia com status 304 (Não Modificado), contendo os cabeçalhos de validação.
+    :param etag: str
+    :param ultima_modificacao: datetime
+    :return: (Response, int)
+    """
+    return definir_validadores(Response(), etag, ultima_modificacao), HTTP_304_NOT_MODIFIED
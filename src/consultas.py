@@ -0,0 +1,395 @@
+import base64
+import json
+import operator
+from datetime import datetime
+
+from flask import Response, url_for
+from sqlalchemy import and_, or_, func, select, text
+
+from src.cache import cache_atual, chave_consulta
+from src.condicionais import parametros_normalizados
+from src.database import CONFIGURACAO_BUSCA_TEXTUAL, Pedido, db, documento_busca_pedidos
+from src.instrumentacao import cronometro
+from src.serializacao import dumps, extrair_campos, resposta_json, serializador_pedidos
+
+# Parâmetros da requisição que controlam a paginação e o formato da resposta, e que portanto não devem ser
+# utilizados como filtro da busca.
+PARAMETROS_PAGINACAO = ('limit', 'cursor', 'ordem', 'stream', 'fields')
+
+# Formatos do streaming dos pedidos (parâmetro 'stream').
+FORMATOS_STREAMING = ('json', 'ndjson')
+
+# Ordenações disponíveis para a paginação por cursor (keyset). Cada ordenação é composta por colunas que, juntas,
+# identificam unicamente um pedido, garantindo que nenhum pedido seja repetido ou omitido entre as páginas.
+ORDENACOES = {
+    'data_chegada': ('data_chegada', 'id'),
+    'numero': ('tipo', 'numero'),
+}
+
+# Colunas do pedido que armazenam datas e números inteiros.
+COLUNAS_DATA = ('data_chegada', 'data_envio_financeiro', 'data_retorno_financeiro')
+COLUNAS_INTEIRO = ('id', 'numero')
+
+# Colunas do pedido que podem ser utilizadas como filtro da busca.
+COLUNAS_FILTRO = ('id', 'numero', 'tipo', 'data_chegada', 'secretaria_solicitante', 'projeto', 'descricao',
+                  'data_envio_financeiro', 'data_retorno_financeiro', 'situacao_autorizacao', 'observacoes')
+
+# Operadores disponíveis nos filtros, informados após o nome da coluna (exemplo: 'data_chegada__gte'). A ausência do
+# operador equivale à igualdade. Os operadores 'in' e 'isnull' são tratados à parte.
+OPERADORES = {
+    '': operator.eq,
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'in': None,
+    'isnull': None,
+}
+
+
+def converter_data(valor: str):
+    """
+    Converte uma data no formato 'YYYY-MM-DD' para o tipo date. Caso o valor seja vazio, retorna None.
+    :param valor: str
+    :return: date | None
+    """
+    if valor == '':
+        return None
+
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+def _converter_valor(coluna: str, valor: str):
+    """
+    Converte o valor de um filtro (texto) para o tipo da coluna informada.
+    :param coluna: str
+    :param valor: str
+    :return: Any
+    """
+    if coluna in COLUNAS_DATA:
+        return converter_data(valor)
+
+    if coluna in COLUNAS_INTEIRO:
+        return int(valor)
+
+    return valor
+
+
+def extrair_filtros(parametros: dict) -> dict:
+    """
+    Retorna um dicionário contendo os filtros da busca de pedidos, a partir dos parâmetros da requisição. Os
+    parâmetros de paginação são removidos e os valores são convertidos para o tipo da respectiva coluna. Os filtros
+    podem conter um operador após o nome da coluna (exemplo: 'data_chegada__gte'). Dispara um ValueError caso algum
+    filtro seja inválido.
+    :param parametros: dict
+    :return: dict
+    """
+    filtros = {}
+
+    for chave, valor in parametros.items():
+        # Ignora os parâmetros que não correspondem a filtros.
+        if chave in PARAMETROS_PAGINACAO:
+            continue
+
+        # O parâmetro 'q' é a busca textual, e seu valor é mantido como texto.
+        if chave == 'q':
+            filtros[chave] = valor
+            continue
+
+        coluna, _, operador = chave.partition('__')
+        if coluna not in COLUNAS_FILTRO or operador not in OPERADORES:
+            raise ValueError('Filtro inválido: {}.'.format(chave))
+
+        if operador == 'isnull':
+            filtros[chave] = valor.lower() in ('1', 'true', 'sim')
+        elif operador == 'in':
+            filtros[chave] = [_converter_valor(coluna, item) for item in valor.split(',') if item != '']
+        elif valor == '':
+            # Caso o valor esteja informado e seja vazio, será adicionado ao filtro o valor null.
+            filtros[chave] = None
+        else:
+            filtros[chave] = _converter_valor(coluna, valor)
+
+    return filtros
+
+
+def _condicao_busca_textual(termos: str):
+    """
+    Retorna a condição da busca textual nos atributos 'descricao', 'projeto' e 'observacoes'. No PostgreSQL é
+    utilizado o índice GIN do documento 'tsvector', no SQLite é utilizada a tabela virtual FTS5 e nos demais bancos de
+    dados é feita uma busca simples (LIKE).
+    :param termos: str
+    :return: ColumnElement
+    """
+    dialeto = db.engine.dialect.name
+
+    if dialeto == 'postgresql':
+        return documento_busca_pedidos().op('@@')(func.plainto_tsquery(CONFIGURACAO_BUSCA_TEXTUAL, termos))
+
+    if dialeto == 'sqlite':
+        # Cada termo é colocado entre aspas, para que não seja interpretado como um operador da sintaxe do FTS5, e é
+        # buscado como prefixo, aproximando-se da busca por radicais do PostgreSQL.
+        expressao = ' '.join('"{}"*'.format(termo.replace('"', '""')) for termo in termos.split())
+        return Pedido.id.in_(text('SELECT rowid FROM pedidos_fts WHERE pedidos_fts MATCH :termos')
+                             .bindparams(termos=expressao))
+
+    return or_(*[coluna.ilike('%{}%'.format(termos)) for coluna in
+                 (Pedido.descricao, Pedido.projeto, Pedido.observacoes)])
+
+
+def condicoes_filtros(filtros: dict) -> list:
+    """
+    Retorna as condições (cláusula WHERE) correspondentes aos filtros gerados por 'extrair_filtros'. As condições
+    podem ser aplicadas tanto em consultas de entidades quanto em consultas diretas às colunas da tabela.
+    :param filtros: dict
+    :return: list
+    """
+    condicoes = []
+
+    for chave, valor in filtros.items():
+        if chave == 'q':
+            if valor.strip():
+                condicoes.append(_condicao_busca_textual(valor))
+            continue
+
+        coluna, _, operador = chave.partition('__')
+        atributo = getattr(Pedido, coluna)
+
+        if operador == 'isnull':
+            condicoes.append(atributo.is_(None) if valor else atributo.isnot(None))
+        elif operador == 'in':
+            condicoes.append(atributo.in_(valor))
+        elif valor is None:
+            condicoes.append(atributo.is_(None) if operador in ('', 'eq') else atributo.isnot(None))
+        else:
+            condicoes.append(OPERADORES[operador](atributo, valor))
+
+    return condicoes
+
+
+def consulta_pedidos(campos: tuple, filtros: dict, ordem: str = None):
+    """
+    Monta a consulta das colunas informadas da tabela de pedidos, aplicando os filtros gerados por 'extrair_filtros'.
+    As linhas retornadas são tuplas de valores, sem a criação de entidades. Caso seja informada uma ordenação, as
+    colunas da ordenação são adicionadas ao final da consulta (caso ainda não estejam presentes), para que seja
+    possível gerar o cursor da paginação.
+    :param campos: tuple
+    :param filtros: dict
+    :param ordem: str
+    :return: Select
+    """
+    nomes = list(campos)
+
+    if ordem is not None:
+        nomes += [nome for nome in ORDENACOES[ordem] if nome not in nomes]
+
+    return select(*[getattr(Pedido, nome) for nome in nomes]).where(*condicoes_filtros(filtros))
+
+
+def codificar_cursor(ordem: str, valores: tuple) -> str:
+    """
+    Codifica os valores das colunas de ordenação do último pedido de uma página em um cursor opaco.
+    :param ordem: str
+    :param valores: tuple
+    :return: str
+    """
+    dados = [ordem] + [valor.isoformat() if hasattr(valor, 'isoformat') else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: str, ordem: str) -> tuple:
+    """
+    Decodifica um cursor gerado por 'codificar_cursor', retornando os valores das colunas de ordenação. Dispara um
+    ValueError caso o cursor seja inválido ou tenha sido gerado para outra ordenação.
+    :param cursor: str
+    :param ordem: str
+    :return: tuple
+    """
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Cursor inválido.')
+
+    if not isinstance(dados, list) or len(dados) != 3 or dados[0] != ordem:
+        raise ValueError('Cursor inválido.')
+
+    valores = dados[1:]
+
+    # Verifica o tipo de cada valor (as colunas de ordenação não aceitam valores nulos) e converte novamente para o
+    # tipo date as colunas de data.
+    for indice, coluna in enumerate(ORDENACOES[ordem]):
+        tipo = int if coluna in COLUNAS_INTEIRO else str
+        if type(valores[indice]) is not tipo:
+            raise ValueError('Cursor inválido.')
+
+        if coluna in COLUNAS_DATA:
+            valores[indice] = converter_data(valores[indice])
+
+    return tuple(valores)
+
+
+def paginar(consulta, ordem: str, cursor: str = None):
+    """
+    Aplica a ordenação e, caso informado, o cursor da paginação por keyset na consulta de pedidos. A consulta passa a
+    buscar apenas os pedidos posteriores ao cursor, aproveitando os índices da tabela ao invés de um OFFSET.
+    :param consulta: Query
+    :param ordem: str
+    :param cursor: str
+    :return: Query
+    """
+    colunas = [getattr(Pedido, nome) for nome in ORDENACOES[ordem]]
+
+    if cursor:
+        primeiro, segundo = decodificar_cursor(cursor, ordem)
+        consulta = consulta.filter(or_(
+            colunas[0] > primeiro,
+            and_(colunas[0] == primeiro, colunas[1] > segundo),
+        ))
+
+    return consulta.order_by(*colunas)
+
+
+def cursor_do_pedido(pedido, ordem: str) -> str:
+    """
+    Retorna o cursor que aponta para os pedidos posteriores ao pedido (entidade ou linha de uma consulta) informado.
+    :param pedido: Pedido | Row
+    :param ordem: str
+    :return: str
+    """
+    return codificar_cursor(ordem, tuple(getattr(pedido, nome) for nome in ORDENACOES[ordem]))
+
+
+def mensagem_filtro_invalido(exc: ValueError) -> str:
+    """
+    Retorna a mensagem de erro de um filtro inválido. Os erros de conversão de valores (datas e números) não possuem
+    uma mensagem própria, e portanto recebem uma mensagem genérica.
+    :param exc: ValueError
+    :return: str
+    """
+    mensagem = str(exc)
+    return mensagem if mensagem.startswith('Filtro inválido') else 'Valor de filtro inválido.'
+
+
+def extrair_busca(parametros: dict, limite_maximo: int) -> dict:
+    """
+    Valida os parâmetros da busca de pedidos (filtros, campos, ordenação, streaming, limite e cursor) e monta a
+    consulta correspondente: todos os pedidos, todos os pedidos ordenados (streaming) ou uma página, com um pedido a
+    mais que o limite para saber se há uma próxima página. Utilizada pelas rotas síncrona e assíncrona da busca, que
+    apenas executam a consulta. Dispara um ValueError, com a mensagem de erro, caso algum parâmetro seja inválido.
+    :param parametros: dict
+    :param limite_maximo: int
+    :return: dict ('parametros', 'query', 'ordem', 'stream', 'limit', 'consulta' e 'serializar')
+    """
+    try:
+        query = extrair_filtros(parametros)
+    except ValueError as exc:
+        raise ValueError(mensagem_filtro_invalido(exc))
+
+    # Campos retornados (e colunas buscadas no banco de dados), e ordenação da paginação e do streaming.
+    campos = extrair_campos(parametros.get('fields', None))
+
+    ordem = parametros.get('ordem', 'data_chegada')
+    if ordem not in ORDENACOES:
+        raise ValueError('Ordenação inválida.')
+
+    stream = parametros.get('stream', None)
+    if stream is not None and stream not in FORMATOS_STREAMING:
+        raise ValueError('Formato de streaming inválido.')
+
+    # O cursor só pode ser utilizado em conjunto com o limite de pedidos por página, fora do streaming.
+    cursor = parametros.get('cursor', None)
+    limit = parametros.get('limit', None)
+    if cursor is not None and (limit is None or stream is not None):
+        raise ValueError('O parâmetro "cursor" exige o parâmetro "limit".')
+
+    consulta = consulta_pedidos(campos, query, ordem)
+
+    if stream is not None:
+        consulta, limit = paginar(consulta, ordem), None
+    elif limit is not None:
+        try:
+            limit = min(int(limit), limite_maximo)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError('Limite inválido.')
+
+        try:
+            consulta = paginar(consulta, ordem, cursor).limit(limit + 1)
+        except ValueError:
+            raise ValueError('Cursor inválido.')
+
+    return {
+        'parametros': parametros,
+        'query': query,
+        'ordem': ordem,
+        'stream': stream,
+        'limit': limit,
+        'consulta': consulta,
+        'serializar': serializador_pedidos(campos),
+    }
+
+
+def busca_em_cache(versao: int):
+    """
+    Retorna o resultado serializado da busca completa (sem limite) no cache, o qual é identificado pela versão da
+    tabela de pedidos e pelos parâmetros da busca, ou None caso não esteja no cache.
+    :param versao: int
+    :return: bytes | None
+    """
+    cache = cache_atual()
+    return cache.obter(chave_consulta('pedidos', versao, parametros_normalizados())) if cache is not None else None
+
+
+def armazenar_busca(versao: int, busca: dict, linhas: list) -> bytes:
+    """
+    Serializa o resultado da busca completa (sem limite) e o armazena no cache (ver 'busca_em_cache').
+    :param versao: int
+    :param busca: dict
+    :param linhas: list
+    :return: bytes
+    """
+    with cronometro('serializacao'):
+        corpo = dumps({
+            'query': busca['query'],
+            'pedidos': [busca['serializar'](linha) for linha in linhas],
+        })
+
+    cache = cache_atual()
+    if cache is not None:
+        cache.definir(chave_consulta('pedidos', versao, parametros_normalizados()), corpo)
+
+    return corpo
+
+
+def resposta_pagina(busca: dict, linhas: list) -> Response:
+    """
+    Retorna a resposta JSON de uma página da busca, contendo os pedidos da página, os filtros utilizados na busca e o
+    cursor da próxima página, gerado a partir do último pedido da página atual caso a consulta tenha retornado um
+    pedido a mais que o limite. O link da próxima página mantém os filtros e o limite da página atual.
+    :param busca: dict
+    :param linhas: list
+    :return: Response
+    """
+    limit, ordem = busca['limit'], busca['ordem']
+    next_cursor = cursor_do_pedido(linhas[limit - 1], ordem) if len(linhas) > limit else None
+    linhas = linhas[:limit]
+
+    links = {}
+    if next_cursor:
+        links['next'] = url_for('pedidos.read_all', _external=True,
+                                **dict(busca['parametros'], cursor=next_cursor, ordem=ordem))
+
+    with cronometro('serializacao'):
+        response = resposta_json({
+            'query': busca['query'],
+            'pedidos': [busca['serializar'](linha) for linha in linhas],
+            'next_cursor': next_cursor,
+            'links': links,
+        })
+    if next_cursor:
+        response.headers['Link'] = '<{}>; rel="next"'.format(links['next'])
+
+    return response
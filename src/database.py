@@ -1,9 +1,31 @@
-from datetime import datetime
+import json
+import zlib
+from datetime import datetime, timedelta
 
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event, func
 
-# Cria uma instância do gerenciador do banco de dados.
-db = SQLAlchemy()
+from src.replicas import BancoDeDados
+
+# Cria uma instância do gerenciador do banco de dados, cujas sessões podem utilizar réplicas de leitura.
+db = BancoDeDados()
+
+# Referência da data e hora de criação dos pedidos no identificador de versão (ETag).
+_EPOCA = datetime(1970, 1, 1)
+
+
+def etag_pedido(tipo: str, numero: int, versao: int, criado_em: datetime = None) -> str:
+    """
+    Retorna o identificador da versão de um pedido (ETag). Além do tipo, do número e da versão, o identificador contém
+    a data e hora de criação do pedido (em microssegundos, em hexadecimal), pois um pedido excluído e cadastrado
+    novamente com o mesmo tipo e número reinicia a versão, e não pode repetir o identificador do pedido anterior.
+    :param tipo: str
+    :param numero: int
+    :param versao: int
+    :param criado_em: datetime | None
+    :return: str
+    """
+    criacao = (criado_em - _EPOCA) // timedelta(microseconds=1) if criado_em is not None else 0
+    return '{}-{}-{}-{:x}'.format(tipo, numero, versao, criacao)
 
 
 class Usuario(db.Model):
@@ -18,8 +40,8 @@ class Usuario(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     senha = db.Column(db.String(255), nullable=False)
     admin = db.Column(db.Boolean, default=False)
-    criado_em = db.Column(db.DateTime, default=datetime.now())
-    atualizado_em = db.Column(db.DateTime, onupdate=datetime.now())
+    criado_em = db.Column(db.DateTime, default=datetime.now)
+    atualizado_em = db.Column(db.DateTime, onupdate=datetime.now)
 
     def to_dict(self) -> dict:
         """
@@ -40,6 +62,15 @@ class Pedido(db.Model):
     # Nome da tabela no banco de dados.
     __tablename__ = 'pedidos'
 
+    # Índices da tabela no banco de dados. O índice único de 'tipo' e 'numero' garante que não existam pedidos
+    # duplicados, e os demais índices atendem aos filtros utilizados na busca de pedidos.
+    __table_args__ = (
+        db.Index('ix_pedidos_tipo_numero', 'tipo', 'numero', unique=True),
+        db.Index('ix_pedidos_data_chegada', 'data_chegada'),
+        db.Index('ix_pedidos_secretaria_solicitante', 'secretaria_solicitante'),
+        db.Index('ix_pedidos_situacao_autorizacao', 'situacao_autorizacao'),
+    )
+
     # Colunas do banco de dados / Atributos da entidade.
     id = db.Column(db.Integer, primary_key=True)
     numero = db.Column(db.Integer, nullable=False)
@@ -52,8 +83,31 @@ class Pedido(db.Model):
     data_retorno_financeiro = db.Column(db.Date, nullable=True)
     situacao_autorizacao = db.Column(db.String(255), nullable=True)
     observacoes = db.Column(db.Text, nullable=True)
-    criado_em = db.Column(db.DateTime, default=datetime.now())
-    atualizado_em = db.Column(db.DateTime, onupdate=datetime.now())
+    criado_em = db.Column(db.DateTime, default=datetime.now)
+    atualizado_em = db.Column(db.DateTime, onupdate=datetime.now)
+    versao = db.Column(db.Integer, nullable=False, server_default='1')
+
+    # A coluna 'versao' é incrementada a cada atualização do pedido. Caso o pedido tenha sido alterado por outra
+    # transação desde que foi lido, a atualização é rejeitada (controle de concorrência otimista).
+    __mapper_args__ = {
+        'version_id_col': versao,
+    }
+
+    @property
+    def etag(self) -> str:
+        """
+        Retorna o identificador da versão atual do pedido (ETag).
+        :return: str
+        """
+        return etag_pedido(self.tipo, self.numero, self.versao, self.criado_em)
+
+    @property
+    def ultima_modificacao(self) -> datetime:
+        """
+        Retorna a data e hora da última modificação do pedido.
+        :return: datetime
+        """
+        return self.atualizado_em or self.criado_em
 
     def to_dict(self) -> dict:
         """
@@ -64,14 +118,210 @@ class Pedido(db.Model):
             id=self.id,
             numero=self.numero,
             tipo=self.tipo,
-            data_chegada=self.data_chegada.strftime('%Y-%m-%d') if self.data_chegada else None,
+            data_chegada=self.data_chegada.isoformat() if self.data_chegada else None,
             secretaria_solicitante=self.secretaria_solicitante,
             projeto=self.projeto,
             descricao=self.descricao,
-            data_envio_financeiro=self.data_envio_financeiro.strftime(
-                '%Y-%m-%d') if self.data_envio_financeiro else None,
-            data_retorno_financeiro=self.data_retorno_financeiro.strftime(
-                '%Y-%m-%d') if self.data_retorno_financeiro else None,
+            data_envio_financeiro=self.data_envio_financeiro.isoformat() if self.data_envio_financeiro else None,
+            data_retorno_financeiro=self.data_retorno_financeiro.isoformat() if self.data_retorno_financeiro else None,
             situacao_autorizacao=self.situacao_autorizacao,
             observacoes=self.observacoes,
         )
+
+
+class TabelaVersao(db.Model):
+    """ Entidade Versão de Tabela """
+
+    # Nome da tabela no banco de dados.
+    __tablename__ = 'tabelas_versoes'
+
+    # Colunas do banco de dados / Atributos da entidade. A versão da tabela é incrementada, na mesma transação, a
+    # cada alteração de seus registros.
+    tabela = db.Column(db.String(100), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=1)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
+class PedidoResumo(db.Model):
+    """ Entidade Resumo de Pedidos """
+
+    # Nome da tabela no banco de dados.
+    __tablename__ = 'pedidos_resumo'
+
+    # Colunas do banco de dados / Atributos da entidade. Cada registro contém os totais dos pedidos com o mesmo mês de
+    # chegada (primeiro dia do mês), tipo, secretaria solicitante e situação da autorização (vazia quando não
+    # informada), mantidos a cada alteração dos pedidos (ver 'estatisticas.py').
+    mes = db.Column(db.Date, primary_key=True)
+    tipo = db.Column(db.String(2), primary_key=True)
+    secretaria_solicitante = db.Column(db.String(255), primary_key=True)
+    situacao_autorizacao = db.Column(db.String(255), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    enviados_financeiro = db.Column(db.Integer, nullable=False, default=0)
+    retornados_financeiro = db.Column(db.Integer, nullable=False, default=0)
+    dias_financeiro = db.Column(db.Integer, nullable=False, default=0)
+
+
+class PedidoAlteracao(db.Model):
+    """ Entidade Alteração de Pedido """
+
+    # Nome da tabela no banco de dados.
+    __tablename__ = 'pedidos_alteracoes'
+
+    # Índice da versão, utilizado na busca das alterações efetuadas após uma versão.
+    __table_args__ = (
+        db.Index('ix_pedidos_alteracoes_versao', 'versao'),
+    )
+
+    # Colunas do banco de dados / Atributos da entidade. Cada registro indica a criação, alteração ou exclusão de um
+    # pedido, com a versão da tabela de pedidos da transação que o alterou (ver 'alteracoes.py'). Os registros são
+    # apenas inseridos, e os mais antigos são removidos pelo comando 'purge_changes'.
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False)
+    tipo = db.Column(db.String(2), nullable=False)
+    numero = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.String(10), nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
+class PedidoArquivado(db.Model):
+    """ Entidade Pedido Arquivado """
+
+    # Nome da tabela no banco de dados.
+    __tablename__ = 'pedidos_arquivo'
+
+    # Colunas do banco de dados / Atributos da entidade. Os pedidos cujo ciclo do financeiro foi encerrado há alguns
+    # anos são movidos para esta tabela (ver 'arquivo.py'), com os atributos serializados em JSON e comprimidos
+    # ('dados'); apenas as colunas utilizadas na busca e nos cabeçalhos condicionais são mantidas separadamente.
+    tipo = db.Column(db.String(2), primary_key=True)
+    numero = db.Column(db.Integer, primary_key=True)
+    data_chegada = db.Column(db.Date, nullable=False)
+    data_retorno_financeiro = db.Column(db.Date, nullable=True)
+    versao = db.Column(db.Integer, nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=True)
+    modificado_em = db.Column(db.DateTime, nullable=True)
+    arquivado_em = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    dados = db.Column(db.LargeBinary, nullable=False)
+
+    @classmethod
+    def do_pedido(cls, pedido: Pedido) -> 'PedidoArquivado':
+        """
+        Retorna o pedido arquivado correspondente ao pedido informado.
+        :param pedido: Pedido
+        :return: PedidoArquivado
+        """
+        return cls(
+            tipo=pedido.tipo,
+            numero=pedido.numero,
+            data_chegada=pedido.data_chegada,
+            data_retorno_financeiro=pedido.data_retorno_financeiro,
+            versao=pedido.versao,
+            criado_em=pedido.criado_em,
+            modificado_em=pedido.ultima_modificacao,
+            arquivado_em=datetime.now(),
+            dados=zlib.compress(json.dumps(pedido.to_dict(), ensure_ascii=False).encode()),
+        )
+
+    @property
+    def etag(self) -> str:
+        """
+        Retorna o identificador da versão do pedido arquivado (ETag), o mesmo do pedido antes do arquivamento.
+        :return: str
+        """
+        return etag_pedido(self.tipo, self.numero, self.versao, self.criado_em)
+
+    @property
+    def ultima_modificacao(self) -> datetime:
+        """
+        Retorna a data e hora da última modificação do pedido antes do arquivamento.
+        :return: datetime
+        """
+        return self.modificado_em
+
+    def to_dict(self) -> dict:
+        """
+        Retorna um dicionário contendo a entidade serializada (os mesmos atributos de Pedido, e o atributo
+        'arquivado').
+        :return: dict
+        """
+        return dict(json.loads(zlib.decompress(self.dados)), arquivado=True)
+
+
+class RespostaIdempotente(db.Model):
+    """ Entidade Resposta Idempotente """
+
+    # Nome da tabela no banco de dados.
+    __tablename__ = 'respostas_idempotentes'
+
+    # Índice da expiração, utilizado na remoção das respostas expiradas.
+    __table_args__ = (
+        db.Index('ix_respostas_idempotentes_expira_em', 'expira_em'),
+    )
+
+    # Colunas do banco de dados / Atributos da entidade. Cada registro contém a resposta de uma requisição de escrita
+    # enviada com o cabeçalho 'Idempotency-Key' (ver 'idempotencia.py'), identificada pela chave e pelo usuário
+    # autenticado. Enquanto a requisição está em execução, o registro não possui 'status'.
+    chave = db.Column(db.String(255), primary_key=True)
+    usuario_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    requisicao = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.Integer, nullable=True)
+    cabecalhos = db.Column(db.Text, nullable=True)
+    corpo = db.Column(db.LargeBinary, nullable=True)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    expira_em = db.Column(db.DateTime, nullable=False)
+
+
+# Tabelas cujas versões são controladas. Os registros das versões são criados junto com a tabela de versões.
+TABELAS_VERSIONADAS = ('pedidos',)
+
+event.listen(TabelaVersao.__table__, 'after_create', lambda tabela, conexao, **kwargs: conexao.execute(
+    tabela.insert(), [{'tabela': nome, 'versao': 1, 'atualizado_em': datetime.now()} for nome in TABELAS_VERSIONADAS]))
+
+
+# Configuração de idioma utilizada pela busca textual do PostgreSQL.
+CONFIGURACAO_BUSCA_TEXTUAL = 'portuguese'
+
+
+def documento_busca_pedidos():
+    """
+    Retorna a expressão do documento da busca textual de pedidos no PostgreSQL ('tsvector' dos atributos 'descricao',
+    'projeto' e 'observacoes'). A mesma expressão é utilizada no índice GIN e nas consultas, para que o índice seja
+    aproveitado.
+    :return: ColumnElement
+    """
+    return func.to_tsvector(
+        CONFIGURACAO_BUSCA_TEXTUAL,
+        func.coalesce(Pedido.descricao, '') + ' ' + func.coalesce(Pedido.projeto, '') + ' '
+        + func.coalesce(Pedido.observacoes, ''),
+    )
+
+
+# Comandos que criam as estruturas da busca textual de pedidos: no PostgreSQL, um índice GIN do documento 'tsvector';
+# no SQLite, uma tabela virtual FTS5 mantida por gatilhos (triggers). Os comandos são executados após a criação da
+# tabela de pedidos (db.create_all) e também pela migração correspondente.
+DDL_BUSCA_TEXTUAL_POSTGRESQL = (
+    "CREATE INDEX IF NOT EXISTS ix_pedidos_busca_textual ON pedidos USING gin (to_tsvector('portuguese', "
+    "coalesce(descricao, '') || ' ' || coalesce(projeto, '') || ' ' || coalesce(observacoes, '')))",
+)
+DDL_BUSCA_TEXTUAL_SQLITE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pedidos_fts USING fts5(descricao, projeto, observacoes, content='pedidos', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS pedidos_fts_ai AFTER INSERT ON pedidos BEGIN "
+    "INSERT INTO pedidos_fts(rowid, descricao, projeto, observacoes) "
+    "VALUES (new.id, new.descricao, new.projeto, new.observacoes); END",
+    "CREATE TRIGGER IF NOT EXISTS pedidos_fts_ad AFTER DELETE ON pedidos BEGIN "
+    "INSERT INTO pedidos_fts(pedidos_fts, rowid, descricao, projeto, observacoes) "
+    "VALUES ('delete', old.id, old.descricao, old.projeto, old.observacoes); END",
+    "CREATE TRIGGER IF NOT EXISTS pedidos_fts_au AFTER UPDATE ON pedidos BEGIN "
+    "INSERT INTO pedidos_fts(pedidos_fts, rowid, descricao, projeto, observacoes) "
+    "VALUES ('delete', old.id, old.descricao, old.projeto, old.observacoes); "
+    "INSERT INTO pedidos_fts(rowid, descricao, projeto, observacoes) "
+    "VALUES (new.id, new.descricao, new.projeto, new.observacoes); END",
+)
+
+for comando in DDL_BUSCA_TEXTUAL_POSTGRESQL:
+    event.listen(Pedido.__table__, 'after_create', DDL(comando).execute_if(dialect='postgresql'))
+
+for comando in DDL_BUSCA_TEXTUAL_SQLITE:
+    event.listen(Pedido.__table__, 'after_create', DDL(comando).execute_if(dialect='sqlite'))
+
+event.listen(Pedido.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS pedidos_fts').execute_if(dialect='sqlite'))
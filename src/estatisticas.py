@@ -0,0 +1,384 @@
+from datetime import timedelta
+
+from sqlalchemy import Date, Integer, and_, cast, event, func, inspect, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.database import Pedido, PedidoResumo, db
+
+# Colunas que identificam cada registro do resumo de pedidos, e totais acumulados em cada registro.
+CHAVES_RESUMO = ('mes', 'tipo', 'secretaria_solicitante', 'situacao_autorizacao')
+TOTAIS_RESUMO = ('quantidade', 'enviados_financeiro', 'retornados_financeiro', 'dias_financeiro')
+
+# Atributos dos pedidos utilizados no resumo. As alterações dos demais atributos não alteram o resumo.
+ATRIBUTOS_RESUMO = ('data_chegada', 'tipo', 'secretaria_solicitante', 'situacao_autorizacao', 'data_envio_financeiro',
+                    'data_retorno_financeiro')
+
+# Dimensões pelas quais as estatísticas podem ser agrupadas (parâmetro 'agrupar').
+DIMENSOES = ('tipo', 'secretaria_solicitante', 'situacao_autorizacao', 'ano', 'mes')
+
+
+def _registro(valores: dict) -> (tuple, tuple):
+    """
+    Retorna a chave e os totais do registro do resumo correspondente aos valores de um pedido. O prazo do financeiro
+    (em dias) é contado apenas para os pedidos com as datas de envio e de retorno informadas.
+    :param valores: dict
+    :return: (tuple, tuple)
+    """
+    envio, retorno = valores['data_envio_financeiro'], valores['data_retorno_financeiro']
+    retornado = envio is not None and retorno is not None
+
+    chave = (valores['data_chegada'].replace(day=1), valores['tipo'], valores['secretaria_solicitante'],
+             valores['situacao_autorizacao'] or '')
+    totais = (1, int(envio is not None), int(retornado), (retorno - envio).days if retornado else 0)
+
+    return chave, totais
+
+
+def _acumular(variacoes: dict, valores: dict, sinal: int):
+    """
+    Soma (sinal 1) ou subtrai (sinal -1) os totais de um pedido às variações do resumo.
+    :param variacoes: dict
+    :param valores: dict
+    :param sinal: int
+    """
+    chave, totais = _registro(valores)
+    atuais = variacoes.get(chave, (0, 0, 0, 0))
+    variacoes[chave] = tuple(atual + sinal * total for atual, total in zip(atuais, totais))
+
+
+def _valores_anteriores(pedido: Pedido) -> dict:
+    """
+    Retorna os valores dos atributos do resumo de um pedido antes das alterações ainda não gravadas (flush).
+    :param pedido: Pedido
+    :return: dict
+    """
+    estado = inspect(pedido)
+    valores = {}
+
+    for atributo in ATRIBUTOS_RESUMO:
+        historico = estado.attrs[atributo].load_history()
+        anteriores = historico.deleted or historico.unchanged
+        valores[atributo] = anteriores[0] if anteriores else getattr(pedido, atributo)
+
+    return valores
+
+
+def _valores_atuais(valores) -> dict:
+    """
+    Retorna os valores atuais dos atributos do resumo de um pedido (entidade ou dicionário).
+    :param valores: Pedido | dict
+    :return: dict
+    """
+    if isinstance(valores, dict):
+        return {atributo: valores.get(atributo, None) for atributo in ATRIBUTOS_RESUMO}
+
+    return {atributo: getattr(valores, atributo) for atributo in ATRIBUTOS_RESUMO}
+
+
+def aplicar_variacoes(conexao, variacoes: dict):
+    """
+    Aplica as variações dos totais ao resumo de pedidos, em um único comando de inserção ou soma (upsert), e remove
+    os registros que deixaram de conter pedidos.
+    :param conexao: Connection
+    :param variacoes: dict
+    """
+    linhas = [dict(zip(CHAVES_RESUMO + TOTAIS_RESUMO, chave + totais)) for chave, totais in variacoes.items()
+              if any(totais)]
+    if not linhas:
+        return
+
+    tabela = PedidoResumo.__table__
+    dialeto = conexao.dialect.name
+
+    if dialeto in ('postgresql', 'sqlite'):
+        comando = (postgresql if dialeto == 'postgresql' else sqlite).insert(tabela)
+        comando = comando.on_conflict_do_update(
+            index_elements=list(CHAVES_RESUMO),
+            set_={total: tabela.c[total] + comando.excluded[total] for total in TOTAIS_RESUMO},
+        )
+        conexao.execute(comando, linhas)
+    else:
+        # Nos demais bancos de dados, atualiza os registros existentes e insere os registros inexistentes.
+        for linha in linhas:
+            condicao = and_(*[tabela.c[chave] == linha[chave] for chave in CHAVES_RESUMO])
+            resultado = conexao.execute(tabela.update().where(condicao).values(
+                {total: tabela.c[total] + linha[total] for total in TOTAIS_RESUMO}))
+            if resultado.rowcount == 0:
+                conexao.execute(tabela.insert(), linha)
+
+    if any(linha['quantidade'] < 0 for linha in linhas):
+        conexao.execute(tabela.delete().where(tabela.c.quantidade <= 0))
+
+
+def registrar_substituicoes(session: Session, anteriores, atuais):
+    """
+    Atualiza o resumo de pedidos com pedidos alterados sem a utilização das entidades (exemplo: importações e
+    alterações em lote), subtraindo os valores anteriores e somando os valores atuais informados (dicionários
+    contendo os atributos de 'ATRIBUTOS_RESUMO'). Deve ser chamada na mesma transação da alteração.
+    :param session: Session
+    :param anteriores: Iterable[dict]
+    :param atuais: Iterable[dict]
+    """
+    variacoes = {}
+
+    for valores in anteriores:
+        _acumular(variacoes, _valores_atuais(valores), -1)
+
+    for valores in atuais:
+        _acumular(variacoes, _valores_atuais(valores), 1)
+
+    aplicar_variacoes(session.connection(), variacoes)
+
+
+def registrar_importacao(session: Session, lote: dict) -> set:
+    """
+    Atualiza o resumo de pedidos com um lote de pedidos importados (inseridos ou atualizados sem a utilização das
+    entidades), subtraindo os valores anteriores dos pedidos já cadastrados. Deve ser chamada na mesma transação,
+    antes da inserção do lote. Retorna as chaves ('tipo' e 'numero') dos pedidos já cadastrados.
+    :param session: Session
+    :param lote: dict (valores dos pedidos, indexados por 'tipo' e 'numero')
+    :return: set
+    """
+    consulta = (select(Pedido.tipo, Pedido.numero, *[getattr(Pedido, atributo) for atributo in ATRIBUTOS_RESUMO])
+                .where(tuple_(Pedido.tipo, Pedido.numero).in_(list(lote)))
+                .with_for_update())
+
+    anteriores = [dict(linha._mapping) for linha in session.execute(consulta)]
+
+    registrar_substituicoes(session, anteriores, lote.values())
+
+    return {(anterior['tipo'], anterior['numero']) for anterior in anteriores}
+
+
+def _mes(coluna, dialeto: str):
+    """
+    Retorna a expressão SQL do primeiro dia do mês da data informada.
+    :param coluna: ColumnElement
+    :param dialeto: str
+    :return: ColumnElement
+    """
+    if dialeto == 'sqlite':
+        return func.date(coluna, 'start of month')
+
+    return cast(func.date_trunc('month', coluna), Date)
+
+
+def _totais_pedidos(dialeto: str) -> list:
+    """
+    Retorna as expressões SQL dos totais do resumo calculados diretamente a partir da tabela de pedidos. O prazo do
+    financeiro é a diferença (em dias) entre as datas de retorno e de envio, calculada no SQLite através da função
+    'julianday'.
+    :param dialeto: str
+    :return: list
+    """
+    if dialeto == 'sqlite':
+        dias = cast(func.julianday(Pedido.data_retorno_financeiro) - func.julianday(Pedido.data_envio_financeiro),
+                    Integer)
+    else:
+        dias = Pedido.data_retorno_financeiro - Pedido.data_envio_financeiro
+
+    retornado = and_(Pedido.data_envio_financeiro.isnot(None), Pedido.data_retorno_financeiro.isnot(None))
+
+    return [
+        func.count().label('quantidade'),
+        func.count(Pedido.data_envio_financeiro).label('enviados_financeiro'),
+        func.coalesce(func.sum(cast(retornado, Integer)), 0).label('retornados_financeiro'),
+        func.coalesce(func.sum(dias), 0).label('dias_financeiro'),
+    ]
+
+
+def atualizar_resumo(conexao) -> int:
+    """
+    Recalcula todo o resumo de pedidos a partir da tabela de pedidos, em um único comando (INSERT ... SELECT com
+    GROUP BY). Retorna a quantidade de registros do resumo.
+    :param conexao: Connection
+    :return: int
+    """
+    dialeto = conexao.dialect.name
+    chaves = [_mes(Pedido.data_chegada, dialeto), Pedido.tipo, Pedido.secretaria_solicitante,
+              func.coalesce(Pedido.situacao_autorizacao, '')]
+
+    tabela = PedidoResumo.__table__
+    conexao.execute(tabela.delete())
+    conexao.execute(tabela.insert().from_select(list(CHAVES_RESUMO + TOTAIS_RESUMO),
+                                                select(*chaves, *_totais_pedidos(dialeto)).group_by(*chaves)))
+
+    return conexao.execute(select(func.count()).select_from(tabela)).scalar()
+
+
+def _dimensoes(entidade, coluna_data, dimensoes: list, dialeto: str) -> list:
+    """
+    Retorna as expressões SQL das dimensões informadas, na entidade informada (resumo ou pedidos). O ano e o mês são
+    extraídos da data informada, no formato 'YYYY' e 'YYYY-MM'. A situação da autorização não informada é agrupada
+    como vazia.
+    :param entidade: PedidoResumo | Pedido
+    :param coluna_data: ColumnElement
+    :param dimensoes: list
+    :param dialeto: str
+    :return: list
+    """
+    colunas = []
+
+    for nome in dimensoes:
+        if nome in ('ano', 'mes'):
+            if dialeto == 'sqlite':
+                coluna = func.strftime('%Y' if nome == 'ano' else '%Y-%m', coluna_data)
+            else:
+                coluna = func.to_char(coluna_data, 'YYYY' if nome == 'ano' else 'YYYY-MM')
+        elif nome == 'situacao_autorizacao':
+            coluna = func.coalesce(entidade.situacao_autorizacao, '')
+        else:
+            coluna = getattr(entidade, nome)
+
+        colunas.append(coluna.label(nome))
+
+    return colunas
+
+
+def _periodos(inicio, fim) -> (tuple, list):
+    """
+    Divide o período da data de chegada entre os meses completos, buscados no resumo, e os dias dos meses
+    incompletos do início e do fim do período, buscados diretamente na tabela de pedidos.
+    :param inicio: date | None
+    :param fim: date | None
+    :return: (tuple, list) (período dos meses completos e períodos dos dias restantes; None indica sem limite)
+    """
+    primeiro_mes = inicio
+    if inicio is not None and inicio.day != 1:
+        primeiro_mes = (inicio.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+    # Primeiro dia do mês seguinte ao último mês completo (exclusivo).
+    fim_meses = (fim + timedelta(days=1)).replace(day=1) if fim is not None else None
+
+    if primeiro_mes is not None and fim_meses is not None and primeiro_mes >= fim_meses:
+        return None, [(inicio, fim)]
+
+    restantes = []
+    if primeiro_mes != inicio:
+        restantes.append((inicio, primeiro_mes - timedelta(days=1)))
+    if fim is not None and fim_meses <= fim:
+        restantes.append((fim_meses, fim))
+
+    return (primeiro_mes, fim_meses), restantes
+
+
+def consultar_estatisticas(inicio, fim, dimensoes: list) -> dict:
+    """
+    Retorna as estatísticas dos pedidos com data de chegada entre 'inicio' e 'fim' (opcionais): os totais gerais e
+    os totais agrupados pelas dimensões informadas. Os meses completos do período são buscados no resumo de pedidos,
+    e apenas os dias dos meses incompletos são agregados a partir da tabela de pedidos.
+    :param inicio: date | None
+    :param fim: date | None
+    :param dimensoes: list
+    :return: dict
+    """
+    dialeto = db.engine.dialect.name
+    consultas = []
+
+    meses, restantes = _periodos(inicio, fim)
+
+    if meses is not None:
+        condicoes = []
+        if meses[0] is not None:
+            condicoes.append(PedidoResumo.mes >= meses[0])
+        if meses[1] is not None:
+            condicoes.append(PedidoResumo.mes < meses[1])
+
+        colunas = _dimensoes(PedidoResumo, PedidoResumo.mes, dimensoes, dialeto)
+        totais = [func.sum(getattr(PedidoResumo, total)).label(total) for total in TOTAIS_RESUMO]
+        consultas.append(select(*colunas, *totais).where(*condicoes).group_by(*colunas))
+
+    for primeiro_dia, ultimo_dia in restantes:
+        colunas = _dimensoes(Pedido, Pedido.data_chegada, dimensoes, dialeto)
+        consultas.append(select(*colunas, *_totais_pedidos(dialeto))
+                         .where(Pedido.data_chegada.between(primeiro_dia, ultimo_dia)).group_by(*colunas))
+
+    # Soma os totais de cada grupo das consultas.
+    grupos = {}
+    for consulta in consultas:
+        for linha in db.session.execute(consulta):
+            chave = tuple(linha._mapping[nome] for nome in dimensoes)
+            atuais = grupos.get(chave, (0, 0, 0, 0))
+            grupos[chave] = tuple(atual + (linha._mapping[total] or 0) for atual, total in zip(atuais, TOTAIS_RESUMO))
+
+    geral = tuple(sum(totais) for totais in zip(*grupos.values())) if grupos else (0, 0, 0, 0)
+
+    resultado = []
+    for chave in sorted(grupos):
+        grupo = dict(zip(dimensoes, chave))
+        if 'situacao_autorizacao' in grupo:
+            grupo['situacao_autorizacao'] = grupo['situacao_autorizacao'] or None
+        grupo.update(_totais(grupos[chave]))
+        resultado.append(grupo)
+
+    return {
+        'total': _totais(geral),
+        'grupos': resultado if dimensoes else [],
+    }
+
+
+def _totais(totais: tuple) -> dict:
+    """
+    Retorna os totais de um grupo das estatísticas, com o prazo médio do financeiro (em dias).
+    :param totais: tuple
+    :return: dict
+    """
+    quantidade, enviados, retornados, dias = totais
+
+    return {
+        'quantidade': quantidade,
+        'enviados_financeiro': enviados,
+        'retornados_financeiro': retornados,
+        'prazo_medio_financeiro': round(dias / retornados, 1) if retornados else None,
+    }
+
+
+@event.listens_for(Session, 'before_flush')
+def _antes_flush(session: Session, contexto, instancias):
+    """
+    Antes de cada flush, calcula as variações do resumo causadas pelos pedidos criados, alterados e excluídos, a
+    partir dos valores anteriores e atuais de cada pedido. As variações são aplicadas após o flush.
+    :param session: Session
+    :param contexto: UOWTransaction
+    :param instancias: None
+    """
+    variacoes = session.info.setdefault('resumo_pedidos', {})
+
+    for pedido in session.new:
+        if isinstance(pedido, Pedido):
+            _acumular(variacoes, _valores_atuais(pedido), 1)
+
+    for pedido in session.deleted:
+        if isinstance(pedido, Pedido):
+            _acumular(variacoes, _valores_anteriores(pedido), -1)
+
+    for pedido in session.dirty:
+        if not isinstance(pedido, Pedido) or not session.is_modified(pedido):
+            continue
+
+        anteriores, atuais = _valores_anteriores(pedido), _valores_atuais(pedido)
+        if anteriores != atuais:
+            _acumular(variacoes, anteriores, -1)
+            _acumular(variacoes, atuais, 1)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apos_flush(session: Session, contexto):
+    """
+    Após cada flush, aplica ao resumo, na mesma transação, as variações calculadas antes do flush.
+    :param session: Session
+    :param contexto: UOWTransaction
+    """
+    variacoes = session.info.pop('resumo_pedidos', None)
+    if variacoes:
+        aplicar_variacoes(session.connection(), variacoes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _apos_rollback(session: Session):
+    """
+    Após o rollback, descarta as variações do resumo ainda não aplicadas.
+    :param session: Session
+    """
+    session.info.pop('resumo_pedidos', None)
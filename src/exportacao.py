@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from src.consultas import consulta_pedidos
+from src.database import Pedido, db
+
+# Formatos de arquivo disponíveis na exportação de pedidos, e os seus respectivos tipos de mídia.
+FORMATOS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Colunas exportadas, na mesma ordem dos atributos serializados do pedido.
+COLUNAS = ('id', 'numero', 'tipo', 'data_chegada', 'secretaria_solicitante', 'projeto', 'descricao',
+           'data_envio_financeiro', 'data_retorno_financeiro', 'situacao_autorizacao', 'observacoes')
+
+# Quantidade de linhas acumuladas antes de cada envio de dados ao cliente.
+LINHAS_POR_PARTE = 500
+
+# Caracteres que não podem ser representados em um documento XML.
+CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def ler_pedidos(filtros: dict, lote: int):
+    """
+    Busca os pedidos que correspondem aos filtros informados, retornando (em um gerador) as linhas da consulta como
+    tuplas. A consulta utiliza um cursor no servidor, e as linhas não são convertidas em entidades, mantendo o
+    consumo de memória constante.
+    :param filtros: dict
+    :param lote: int
+    :return: Generator[tuple]
+    """
+    consulta = consulta_pedidos(COLUNAS, filtros).order_by(Pedido.id)
+
+    resultado = db.session.execute(consulta.execution_options(stream_results=True, max_row_buffer=lote))
+    for parte in resultado.partitions(lote):
+        for linha in parte:
+            yield tuple(linha)
+
+
+def _formatar(valor):
+    """
+    Converte um valor de uma coluna para o formato de texto exportado (datas no formato 'YYYY-MM-DD').
+    :param valor: Any
+    :return: Any
+    """
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+
+    return valor
+
+
+def gerar_csv(linhas):
+    """
+    Gera (em partes) o conteúdo do arquivo CSV contendo as linhas informadas.
+    :param linhas: Iterable[tuple]
+    :return: Generator[bytes]
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS)
+
+    for indice, linha in enumerate(linhas, start=1):
+        escritor.writerow([_formatar(valor) for valor in linha])
+
+        if indice % LINHAS_POR_PARTE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+
+def gerar_ndjson(linhas):
+    """
+    Gera (em partes) o conteúdo do arquivo NDJSON contendo as linhas informadas, um pedido por linha.
+    :param linhas: Iterable[tuple]
+    :return: Generator[bytes]
+    """
+    parte = []
+
+    for linha in linhas:
+        parte.append(json.dumps(dict(zip(COLUNAS, map(_formatar, linha))), ensure_ascii=False))
+
+        if len(parte) == LINHAS_POR_PARTE:
+            yield ('\n'.join(parte) + '\n').encode()
+            parte = []
+
+    if parte:
+        yield ('\n'.join(parte) + '\n').encode()
+
+
+class _BufferZip(io.RawIOBase):
+    """ Buffer não posicionável em que o arquivo ZIP é escrito, permitindo enviar o arquivo ao cliente em partes. """
+
+    def __init__(self):
+        super().__init__()
+        self.partes = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def esvaziar(self) -> bytes:
+        """
+        Retorna e remove do buffer os dados escritos até o momento.
+        :return: bytes
+        """
+        dados = b''.join(self.partes)
+        self.partes = []
+        return dados
+
+
+def _celula_xlsx(valor) -> str:
+    """
+    Retorna o XML de uma célula da planilha contendo o valor informado.
+    :param valor: Any
+    :return: str
+    """
+    if valor is None:
+        return '<c/>'
+
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return '<c><v>{}</v></c>'.format(valor)
+
+    texto = CARACTERES_INVALIDOS_XML.sub('', str(_formatar(valor)))
+    return '<c t="inlineStr"><is><t xml:space="preserve">{}</t></is></c>'.format(escape(texto))
+
+
+def _linha_xlsx(valores) -> str:
+    """
+    Retorna o XML de uma linha da planilha contendo os valores informados.
+    :param valores: Iterable
+    :return: str
+    """
+    return '<row>{}</row>'.format(''.join(_celula_xlsx(valor) for valor in valores))
+
+
+def gerar_xlsx(linhas):
+    """
+    Gera (em partes) o conteúdo do arquivo XLSX contendo as linhas informadas. A planilha é escrita diretamente no
+    arquivo ZIP à medida em que as linhas são lidas, sem que todo o arquivo seja mantido na memória.
+    :param linhas: Iterable[tuple]
+    :return: Generator[bytes]
+    """
+    buffer = _BufferZip()
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+        arquivo.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ))
+        arquivo.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'
+        ))
+        arquivo.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Pedidos" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        arquivo.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+            '</Relationships>'
+        ))
+        yield buffer.esvaziar()
+
+        with arquivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _linha_xlsx(COLUNAS)
+            ).encode())
+
+            for indice, linha in enumerate(linhas, start=1):
+                planilha.write(_linha_xlsx(linha).encode())
+
+                if indice % LINHAS_POR_PARTE == 0:
+                    yield buffer.esvaziar()
+
+            planilha.write(b'</sheetData></worksheet>')
+
+    yield buffer.esvaziar()
+
+
+# Funções geradoras do conteúdo de cada formato de arquivo.
+GERADORES = {
+    'csv': gerar_csv,
+    'ndjson': gerar_ndjson,
+    'xlsx': gerar_xlsx,
+}
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, request, Response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from src.constants.http_status_codes import (HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT,
+                                             HTTP_422_UNPROCESSABLE_ENTITY)
+from src.database import RespostaIdempotente, db
+
+# Cabeçalho da chave de idempotência informada pelo cliente, e cabeçalho adicionado às respostas repetidas.
+CABECALHO_CHAVE = 'Idempotency-Key'
+CABECALHO_REPETIDA = 'Idempotent-Replayed'
+
+# Tamanho máximo da chave de idempotência.
+TAMANHO_MAXIMO_CHAVE = 255
+
+# Cabeçalhos armazenados junto com a resposta (os demais, como os de compressão e de métricas, são gerados novamente).
+CABECALHOS_ARMAZENADOS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Location')
+
+# Tempo (em segundos) após o qual uma requisição ainda em execução é considerada interrompida (superior ao tempo
+# máximo de uma requisição no Gunicorn), e a chave pode ser utilizada novamente.
+TEMPO_RESERVA = 120
+
+_tabela = RespostaIdempotente.__table__
+
+
+def _impressao() -> str:
+    """
+    Retorna a impressão digital (hash SHA-256) da requisição atual: método, caminho, parâmetros e corpo. Uma chave
+    de idempotência só pode ser repetida com a mesma requisição.
+    :return: str
+    """
+    conteudo = hashlib.sha256()
+    for parte in (request.method.encode(), request.path.encode(), request.query_string, request.get_data()):
+        conteudo.update(hashlib.sha256(parte).digest())
+
+    return conteudo.hexdigest()
+
+
+def _reservar(chave: str, usuario_id: int, impressao: str):
+    """
+    Reserva a chave de idempotência para a requisição atual, em uma transação própria. Caso a chave já tenha sido
+    utilizada (ou esteja em uso), retorna o registro existente.
+    :param chave: str
+    :param usuario_id: int
+    :param impressao: str
+    :return: Row | None
+    """
+    agora = datetime.now()
+    try:
+        db.session.execute(_tabela.insert().values(chave=chave, usuario_id=usuario_id, requisicao=impressao,
+                                                   criado_em=agora, expira_em=agora + timedelta(seconds=TEMPO_RESERVA)))
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+
+    registro = db.session.execute(
+        select(_tabela).where(_tabela.c.chave == chave, _tabela.c.usuario_id == usuario_id)).first()
+    db.session.rollback()
+
+    # Caso a chave tenha sido liberada ou removida entre a inserção e a consulta, tenta reservá-la novamente.
+    return registro if registro is not None else _reservar(chave, usuario_id, impressao)
+
+
+def _liberar_expirada(registro):
+    """
+    Remove o registro expirado da chave informada (resposta expirada ou requisição interrompida), caso ele não tenha
+    sido substituído por outra requisição.
+    :param registro: Row
+    """
+    db.session.execute(_tabela.delete().where(_tabela.c.chave == registro.chave,
+                                              _tabela.c.usuario_id == registro.usuario_id,
+                                              _tabela.c.expira_em == registro.expira_em))
+    db.session.commit()
+
+
+def _resposta_armazenada(registro) -> Response:
+    """
+    Retorna a resposta armazenada no registro informado, com o cabeçalho 'Idempotent-Replayed'.
+    :param registro: Row
+    :return: Response
+    """
+    response = Response(registro.corpo, status=registro.status)
+    response.headers.clear()
+    response.headers.extend(json.loads(registro.cabecalhos))
+    response.headers[CABECALHO_REPETIDA] = 'true'
+
+    return response
+
+
+def _armazenar(chave: str, usuario_id: int, response: Response):
+    """
+    Armazena a resposta da requisição concluída, a qual passa a ser retornada pelas repetições da requisição com a
+    mesma chave durante 'IDEMPOTENCIA_TTL' segundos. As respostas com erro do servidor (status 5xx) não são
+    armazenadas: a chave é liberada, permitindo que a requisição seja repetida.
+    :param chave: str
+    :param usuario_id: int
+    :param response: Response
+    """
+    condicao = (_tabela.c.chave == chave, _tabela.c.usuario_id == usuario_id)
+
+    if response.status_code >= 500 or response.is_streamed:
+        db.session.execute(_tabela.delete().where(*condicao))
+    else:
+        cabecalhos = [(nome, valor) for nome, valor in response.headers if nome in CABECALHOS_ARMAZENADOS]
+        db.session.execute(_tabela.update().where(*condicao).values(
+            status=response.status_code,
+            cabecalhos=json.dumps(cabecalhos),
+            corpo=response.get_data(),
+            expira_em=datetime.now() + timedelta(seconds=current_app.config['IDEMPOTENCIA_TTL']),
+        ))
+
+    db.session.commit()
+
+
+def idempotente(funcao):
+    """
+    Decorador que torna idempotente uma rota de escrita quando o cliente informa o cabeçalho 'Idempotency-Key': a
+    primeira requisição com a chave é executada e a sua resposta é armazenada; as repetições da mesma requisição
+    (mesmo usuário, chave, método, URI e corpo) retornam a resposta armazenada, sem executar a rota novamente.
+    Enquanto a primeira requisição está em execução, as repetições aguardam a sua conclusão por até
+    'IDEMPOTENCIA_ESPERA_MAXIMA' segundos. Deve ser aplicado após 'jwt_required'.
+    :param funcao: Callable
+    :return: Callable
+    """
+
+    @wraps(funcao)
+    def decorador(*args, **kwargs):
+        chave = request.headers.get(CABECALHO_CHAVE, None)
+        if chave is None:
+            return funcao(*args, **kwargs)
+
+        # Caso a chave seja inválida, retorna uma resposta JSON com status 400 (Requisição Inválida).
+        if not chave or len(chave) > TAMANHO_MAXIMO_CHAVE:
+            return jsonify({
+                'error': 'Chave de idempotência inválida.',
+            }), HTTP_400_BAD_REQUEST
+
+        usuario_id = get_jwt_identity()
+        impressao = _impressao()
+        fim = time.monotonic() + current_app.config['IDEMPOTENCIA_ESPERA_MAXIMA']
+        intervalo = 0.01
+
+        while True:
+            registro = _reservar(chave, usuario_id, impressao)
+            if registro is None:
+                break
+
+            if registro.expira_em <= datetime.now():
+                _liberar_expirada(registro)
+                continue
+
+            # Caso a chave tenha sido utilizada em outra requisição, retorna uma resposta JSON com status 422
+            # (Entidade Não Processável).
+            if registro.requisicao != impressao:
+                return jsonify({
+                    'error': 'A chave de idempotência já foi utilizada em outra requisição.',
+                }), HTTP_422_UNPROCESSABLE_ENTITY
+
+            if registro.status is not None:
+                return _resposta_armazenada(registro)
+
+            # Caso a primeira requisição não seja concluída durante a espera, retorna uma resposta JSON com status
+            # 409 (Conflito), com o cabeçalho 'Retry-After'.
+            if time.monotonic() >= fim:
+                response = jsonify({
+                    'error': 'Uma requisição com a mesma chave de idempotência está em execução.',
+                })
+                response.headers['Retry-After'] = '1'
+                return response, HTTP_409_CONFLICT
+
+            time.sleep(intervalo)
+            intervalo = min(intervalo * 2, 0.25)
+
+        # Executa a rota. Caso ocorra uma exceção, a chave é liberada, permitindo que a requisição seja repetida.
+        try:
+            response = current_app.make_response(funcao(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            db.session.execute(_tabela.delete().where(_tabela.c.chave == chave, _tabela.c.usuario_id == usuario_id))
+            db.session.commit()
+            raise
+
+        db.session.rollback()
+        _armazenar(chave, usuario_id, response)
+
+        return response
+
+    return decorador
+
+
+def remover_respostas() -> int:
+    """
+    Remove as respostas (e as requisições interrompidas) expiradas. Retorna a quantidade de registros removidos.
+    :return: int
+    """
+    resultado = db.session.execute(_tabela.delete().where(_tabela.c.expira_em < datetime.now()))
+    db.session.commit()
+
+    return resultado.rowcount
@@ -0,0 +1,231 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.alteracoes import registrar_alteracoes
+from src.consultas import converter_data
+from src.database import Pedido, PedidoArquivado, db
+from src.estatisticas import registrar_importacao
+from src.versionamento import registrar_alteracao
+
+# Formatos de arquivo aceitos na importação de pedidos.
+FORMATOS = ('csv', 'ndjson')
+
+# Atributos obrigatórios e opcionais de um pedido importado.
+ATRIBUTOS_OBRIGATORIOS = ('numero', 'tipo', 'data_chegada', 'secretaria_solicitante', 'projeto', 'descricao')
+ATRIBUTOS_OPCIONAIS = ('data_envio_financeiro', 'data_retorno_financeiro', 'situacao_autorizacao', 'observacoes')
+
+# Quantidade máxima de erros detalhados no relatório da importação.
+MAXIMO_ERROS = 1000
+
+
+def ler_linhas(arquivo, formato: str):
+    """
+    Lê as linhas de um arquivo CSV ou NDJSON aberto em modo texto, retornando (em um gerador) o número da linha e os
+    dados da linha, ou o erro de leitura da linha. O arquivo é lido aos poucos, sem ser carregado inteiro na memória.
+    :param arquivo: TextIO
+    :param formato: str
+    :return: Generator[(int, dict | None, str | None)]
+    """
+    if formato == 'csv':
+        # A linha 1 do arquivo CSV é o cabeçalho, portanto os dados começam na linha 2.
+        for numero_linha, dados in enumerate(csv.DictReader(arquivo), start=2):
+            yield numero_linha, dados, None
+        return
+
+    for numero_linha, linha in enumerate(arquivo, start=1):
+        # Ignora as linhas em branco.
+        if not linha.strip():
+            continue
+
+        try:
+            dados = json.loads(linha)
+        except ValueError:
+            yield numero_linha, None, 'JSON inválido.'
+            continue
+
+        if not isinstance(dados, dict):
+            yield numero_linha, None, 'A linha deve conter um objeto JSON.'
+            continue
+
+        yield numero_linha, dados, None
+
+
+def validar_linha(dados: dict) -> dict:
+    """
+    Valida os dados de uma linha importada e os converte nos valores das colunas do pedido. Dispara um ValueError,
+    contendo a mensagem de erro, caso algum dado seja inválido.
+    :param dados: dict
+    :return: dict
+    """
+
+    # Desconsidera valores vazios, tratando-os como não informados (comum em arquivos CSV).
+    dados = {chave: valor for chave, valor in dados.items() if valor not in (None, '')}
+
+    # Verifica se todos os atributos obrigatórios foram informados.
+    faltantes = [atributo for atributo in ATRIBUTOS_OBRIGATORIOS if atributo not in dados]
+    if faltantes:
+        raise ValueError('Atributos obrigatórios não informados: {}.'.format(', '.join(faltantes)))
+
+    valores = {atributo: dados.get(atributo, None) for atributo in ATRIBUTOS_OBRIGATORIOS + ATRIBUTOS_OPCIONAIS}
+
+    try:
+        valores['numero'] = int(valores['numero'])
+    except (TypeError, ValueError):
+        raise ValueError('Número inválido.')
+
+    if valores['tipo'] not in ('SE', 'RM'):
+        raise ValueError('Tipo inválido.')
+
+    for atributo in ('data_chegada', 'data_envio_financeiro', 'data_retorno_financeiro'):
+        if valores[atributo] is not None:
+            try:
+                valores[atributo] = converter_data(str(valores[atributo]))
+            except ValueError:
+                raise ValueError('Data inválida: {}.'.format(atributo))
+
+    return valores
+
+
+def _inserir_lote(lote: dict) -> set:
+    """
+    Insere um lote de pedidos no banco de dados em um único comando (executemany). Os pedidos já cadastrados, com o
+    mesmo 'tipo' e 'numero', são atualizados (upsert). Os pedidos já arquivados não são inseridos (ver 'arquivo.py'),
+    e as suas chaves são retornadas.
+    :param lote: dict
+    :return: set
+    """
+    dialeto = db.engine.dialect.name
+
+    # Remove do lote os pedidos já arquivados, que continuam sendo retornados pela busca do pedido.
+    arquivados = {(linha.tipo, linha.numero) for linha in db.session.execute(
+        select(PedidoArquivado.tipo, PedidoArquivado.numero)
+        .where(tuple_(PedidoArquivado.tipo, PedidoArquivado.numero).in_(list(lote))))}
+    lote = {chave: valores for chave, valores in lote.items() if chave not in arquivados}
+    if not lote:
+        db.session.rollback()
+        return arquivados
+
+    # Utiliza o comando de inserção do dialeto do banco de dados, o qual permite tratar o conflito no índice único
+    # de 'tipo' e 'numero'.
+    if dialeto == 'postgresql':
+        comando = postgresql.insert(Pedido.__table__)
+    elif dialeto == 'sqlite':
+        comando = sqlite.insert(Pedido.__table__)
+    else:
+        raise RuntimeError('Importação não suportada para o banco de dados {}.'.format(dialeto))
+
+    comando = comando.on_conflict_do_update(
+        index_elements=['tipo', 'numero'],
+        set_=dict(
+            {atributo: comando.excluded[atributo] for atributo in ATRIBUTOS_OBRIGATORIOS + ATRIBUTOS_OPCIONAIS
+             if atributo not in ('tipo', 'numero')},
+            atualizado_em=datetime.now(),
+            versao=Pedido.__table__.c.versao + 1,
+        ),
+    )
+
+    # Atualiza o resumo de pedidos com os valores do lote, descontando os valores anteriores dos pedidos já
+    # cadastrados.
+    existentes = registrar_importacao(db.session, lote)
+
+    db.session.execute(comando, list(lote.values()))
+
+    # Incrementa a versão da tabela de pedidos e registra as alterações no log na mesma transação, pois a inserção
+    # não utiliza as entidades.
+    registrar_alteracao(db.session, 'pedidos')
+    registrar_alteracoes(db.session, [(tipo, numero, 'atualizado' if (tipo, numero) in existentes else 'criado')
+                                      for tipo, numero in lote])
+    db.session.commit()
+
+    return arquivados
+
+
+def importar_pedidos(linhas, tamanho_lote: int) -> dict:
+    """
+    Valida e importa os pedidos contidos nas linhas informadas, inserindo-os em lotes. Retorna o relatório da
+    importação, contendo a quantidade de pedidos importados, a quantidade de linhas substituídas por uma ocorrência
+    posterior do mesmo pedido no lote, os erros de cada linha e a vazão (linhas por segundo).
+    :param linhas: Iterable[(int, dict | None, str | None)]
+    :param tamanho_lote: int
+    :return: dict
+    """
+    inicio = time.perf_counter()
+    total = 0
+    importados = 0
+    duplicados = 0
+    total_erros = 0
+    erros = []
+
+    # Lote atual, indexado por 'tipo' e 'numero', e linha de cada pedido do lote. Caso o mesmo pedido apareça mais de
+    # uma vez no lote, prevalece a última ocorrência.
+    lote = {}
+    linhas_lote = {}
+    arquivados = []
+
+    for numero_linha, dados, erro in linhas:
+        total += 1
+
+        if erro is None:
+            try:
+                valores = validar_linha(dados)
+            except ValueError as exc:
+                erro = str(exc)
+
+        if erro is not None:
+            total_erros += 1
+            if len(erros) < MAXIMO_ERROS:
+                erros.append({'linha': numero_linha, 'error': erro})
+            continue
+
+        chave = (valores['tipo'], valores['numero'])
+        if chave in lote:
+            duplicados += 1
+        lote[chave] = valores
+        linhas_lote[chave] = numero_linha
+
+        # Os pedidos importados são contados por lote inserido, pois as ocorrências repetidas de um pedido no mesmo
+        # lote resultam em um único pedido.
+        if len(lote) >= tamanho_lote:
+            rejeitados = _inserir_lote(lote)
+            importados += len(lote) - len(rejeitados)
+            arquivados += [linhas_lote[chave] for chave in rejeitados]
+            lote, linhas_lote = {}, {}
+
+    if lote:
+        rejeitados = _inserir_lote(lote)
+        importados += len(lote) - len(rejeitados)
+        arquivados += [linhas_lote[chave] for chave in rejeitados]
+
+    # Os pedidos já arquivados não são importados, e são indicados nos erros.
+    for numero_linha in sorted(arquivados):
+        total_erros += 1
+        if len(erros) < MAXIMO_ERROS:
+            erros.append({'linha': numero_linha, 'error': 'Pedido já cadastrado (arquivado).'})
+
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'total': total,
+        'importados': importados,
+        'duplicados': duplicados,
+        'total_erros': total_erros,
+        'erros': erros,
+        'tamanho_lote': tamanho_lote,
+        'duracao': round(duracao, 3),
+        'linhas_por_segundo': round(total / duracao, 1) if duracao > 0 else None,
+    }
+
+
+def abrir_texto(stream) -> io.TextIOWrapper:
+    """
+    Abre um stream binário (corpo da requisição ou arquivo) em modo texto, com a codificação UTF-8.
+    :param stream: BinaryIO
+    :return: TextIOWrapper
+    """
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
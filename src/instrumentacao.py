@@ -0,0 +1,237 @@
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, request, Response
+from flask.logging import create_logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Logger das métricas das requisições e das consultas lentas.
+logger = logging.getLogger('src.instrumentacao')
+
+# Prefixo do comando que retorna o plano de execução de uma consulta, em cada banco de dados.
+PREFIXOS_EXPLAIN = {
+    'postgresql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'mysql': 'EXPLAIN ',
+}
+
+
+def _registrar(evento: str, nivel: int = logging.INFO, **dados):
+    """
+    Registra no log uma linha estruturada (JSON) contendo o evento e os dados informados.
+    :param evento: str
+    :param nivel: int
+    """
+    logger.log(nivel, json.dumps(dict(evento=evento, **dados), ensure_ascii=False, default=str))
+
+
+def metricas_atuais():
+    """
+    Retorna as métricas da requisição atual, ou None caso a requisição não tenha sido selecionada pela amostragem (ou
+    não exista uma requisição).
+    :return: dict | None
+    """
+    if not has_app_context():
+        return None
+
+    return g.get('metricas', None)
+
+
+@contextmanager
+def cronometro(nome: str):
+    """
+    Gerenciador de contexto que soma o tempo de execução do bloco à métrica informada da requisição atual. Blocos
+    aninhados da mesma métrica são contabilizados apenas uma vez.
+    :param nome: str
+    """
+    metricas = metricas_atuais()
+
+    if metricas is None or nome in metricas['ativos']:
+        yield
+        return
+
+    metricas['ativos'].add(nome)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas[nome] += time.perf_counter() - inicio
+        metricas['ativos'].discard(nome)
+
+
+def _plano_execucao(conexao, instrucao: str, parametros) -> str:
+    """
+    Retorna o plano de execução da instrução informada, executando o comando EXPLAIN diretamente na conexão do
+    driver (sem disparar novamente os eventos do SQLAlchemy), em um savepoint da transação atual.
+    :param conexao: Connection
+    :param instrucao: str
+    :param parametros: tuple | dict
+    :return: str
+    """
+    prefixo = PREFIXOS_EXPLAIN.get(conexao.dialect.name, None)
+    if prefixo is None or not instrucao.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+
+    try:
+        cursor = conexao.connection.cursor()
+        try:
+            # O comando é executado em um savepoint, desfeito caso o comando falhe: no PostgreSQL, um erro invalida
+            # a transação inteira, e as demais instruções da requisição falhariam.
+            cursor.execute('SAVEPOINT plano_execucao')
+            try:
+                cursor.execute(prefixo + instrucao, parametros)
+                return '\n'.join(str(linha[-1]) for linha in cursor.fetchall())
+            except Exception:
+                cursor.execute('ROLLBACK TO SAVEPOINT plano_execucao')
+                raise
+            finally:
+                cursor.execute('RELEASE SAVEPOINT plano_execucao')
+        finally:
+            cursor.close()
+    except Exception as erro:
+        return 'Falha ao obter o plano de execução: {}'.format(erro)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    """
+    Antes de cada instrução SQL, registra o horário de início de sua execução.
+    """
+    conexao.info.setdefault('inicio_consultas', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _apos_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    """
+    Após cada instrução SQL, soma a sua duração às métricas da requisição atual e, caso ultrapasse o limite
+    configurado, registra a instrução e o seu plano de execução no log.
+    """
+    duracao = time.perf_counter() - conexao.info['inicio_consultas'].pop()
+
+    if not has_app_context():
+        return
+
+    metricas = g.get('metricas', None)
+    if metricas is not None:
+        metricas['sql_consultas'] += 1
+        metricas['sql'] += duracao
+
+    configuracao = current_app.extensions.get('instrumentacao', None)
+    if configuracao is None or duracao < configuracao['consulta_lenta']:
+        return
+
+    _registrar(
+        'consulta_lenta',
+        logging.WARNING,
+        duracao_ms=round(duracao * 1000, 2),
+        instrucao=instrucao,
+        plano=_plano_execucao(conexao, instrucao, parametros) if configuracao['explain'] and not executemany else None,
+    )
+
+
+def _antes_requisicao():
+    """
+    Antes de cada requisição selecionada pela amostragem, inicia as métricas da requisição.
+    """
+    if random.random() >= current_app.extensions['instrumentacao']['amostragem']:
+        return
+
+    g.metricas = {
+        'inicio': time.perf_counter(),
+        'sql_consultas': 0,
+        'sql': 0.0,
+        'serializacao': 0.0,
+        'compressao': 0.0,
+        'ativos': set(),
+    }
+
+
+def _apos_requisicao(response: Response) -> Response:
+    """
+    Após cada requisição selecionada pela amostragem, adiciona as métricas ao cabeçalho 'Server-Timing' da resposta
+    e as registra no log. Nas respostas enviadas em partes (streaming), o tempo de envio não é contabilizado.
+    :param response: Response
+    :return: Response
+    """
+    metricas = g.pop('metricas', None)
+    if metricas is None:
+        return response
+
+    total = time.perf_counter() - metricas['inicio']
+
+    response.headers.add('Server-Timing', 'sql;dur={:.2f};desc="{} consultas"'.format(
+        metricas['sql'] * 1000, metricas['sql_consultas']))
+    response.headers.add('Server-Timing', 'serializacao;dur={:.2f}'.format(metricas['serializacao'] * 1000))
+    response.headers.add('Server-Timing', 'compressao;dur={:.2f}'.format(metricas['compressao'] * 1000))
+    response.headers.add('Server-Timing', 'total;dur={:.2f}'.format(total * 1000))
+
+    _registrar(
+        'requisicao',
+        metodo=request.method,
+        rota=request.url_rule.rule if request.url_rule is not None else request.path,
+        status=response.status_code,
+        sql_consultas=metricas['sql_consultas'],
+        sql_ms=round(metricas['sql'] * 1000, 2),
+        serializacao_ms=round(metricas['serializacao'] * 1000, 2),
+        compressao_ms=round(metricas['compressao'] * 1000, 2),
+        total_ms=round(total * 1000, 2),
+    )
+
+    return response
+
+
+def _instrumentar_json(app):
+    """
+    Contabiliza o tempo de serialização das respostas geradas através de 'jsonify'.
+    :param app: Flask
+    """
+    provedor = getattr(app, 'json', None)
+
+    # Flask 2.2 ou superior: a serialização é feita pelo provedor JSON da aplicação.
+    if provedor is not None and hasattr(provedor, 'dumps'):
+        dumps = provedor.dumps
+
+        def dumps_instrumentado(obj, **kwargs):
+            with cronometro('serializacao'):
+                return dumps(obj, **kwargs)
+
+        provedor.dumps = dumps_instrumentado
+        return
+
+    # Versões anteriores do Flask: a serialização é feita pela classe 'json_encoder' da aplicação.
+    class CodificadorInstrumentado(app.json_encoder):
+        def encode(self, o) -> str:
+            with cronometro('serializacao'):
+                return super().encode(o)
+
+    app.json_encoder = CodificadorInstrumentado
+
+
+def init_app(app):
+    """
+    Inicializa a instrumentação das requisições: quantidade e tempo das consultas SQL, tempo de serialização e tempo
+    total, retornados no cabeçalho 'Server-Timing' e registrados no log de uma fração 'INSTRUMENTACAO_AMOSTRAGEM'
+    das requisições. As consultas com duração superior a 'CONSULTA_LENTA_MS' são registradas no log, com o seu plano
+    de execução caso 'CONSULTA_LENTA_EXPLAIN' esteja habilitado.
+    :param app: Flask
+    """
+    app.extensions['instrumentacao'] = {
+        'amostragem': app.config['INSTRUMENTACAO_AMOSTRAGEM'],
+        'consulta_lenta': app.config['CONSULTA_LENTA_MS'] / 1000,
+        'explain': app.config['CONSULTA_LENTA_EXPLAIN'],
+    }
+
+    # As linhas de log são registradas no nível INFO e propagadas ao logger da aplicação ('src'), cujo manipulador
+    # padrão é adicionado pelo Flask ao criar o logger, caso nenhum manipulador tenha sido configurado.
+    create_logger(app)
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+
+    _instrumentar_json(app)
+
+    app.before_request(_antes_requisicao)
+    app.after_request(_apos_requisicao)
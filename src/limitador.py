@@ -0,0 +1,310 @@
+import hashlib
+import math
+import threading
+import time
+
+from flask import current_app, jsonify, request
+
+from src.constants.http_status_codes import HTTP_429_TOO_MANY_REQUESTS
+
+# Biblioteca opcional de comunicação com o Redis, necessária apenas para o limitador compartilhado entre processos.
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Erros do armazenamento dos contadores, que não impedem as tentativas de login (o limitador é desativado enquanto o
+# armazenamento estiver indisponível).
+ERROS_ARMAZENAMENTO = (redis.RedisError,) if redis is not None else ()
+
+# Quantidade de operações entre as limpezas das janelas expiradas do limitador em memória.
+OPERACOES_POR_LIMPEZA = 1000
+
+
+class ContadoresMemoria:
+    """ Contadores de tentativas em memória (por processo), em janelas fixas de 'janela' segundos. Para cada chave,
+    são mantidas as contagens da janela atual e da anterior. """
+
+    def __init__(self, janela: int):
+        self.janela = janela
+        self.itens = {}
+        self.operacoes = 0
+        self.trava = threading.Lock()
+
+    def _janela_atual(self) -> (int, float):
+        agora = time.time()
+        return int(agora // self.janela), agora % self.janela
+
+    def _contagens(self, chave: str, indice: int) -> list:
+        """
+        Retorna as contagens [anterior, atual] da chave na janela informada, deslocando as janelas expiradas.
+        :param chave: str
+        :param indice: int
+        :return: list
+        """
+        item = self.itens.get(chave, None)
+
+        if item is None or item[0] < indice - 1:
+            return [0, 0]
+        if item[0] == indice - 1:
+            return [item[2], 0]
+
+        return [item[1], item[2]]
+
+    def _limpar_expirados(self, indice: int):
+        self.operacoes += 1
+        if self.operacoes % OPERACOES_POR_LIMPEZA == 0:
+            for chave in [chave for chave, item in self.itens.items() if item[0] < indice - 1]:
+                del self.itens[chave]
+
+    def registrar(self, chave: str) -> (int, int, float):
+        """
+        Soma uma tentativa à chave informada e retorna as contagens da janela anterior e da atual, e o tempo decorrido
+        (em segundos) da janela atual.
+        :param chave: str
+        :return: (int, int, float)
+        """
+        indice, decorrido = self._janela_atual()
+
+        with self.trava:
+            anterior, atual = self._contagens(chave, indice)
+            self.itens[chave] = (indice, anterior, atual + 1)
+            self._limpar_expirados(indice)
+
+        return anterior, atual + 1, decorrido
+
+    def consultar(self, chave: str) -> (int, int, float):
+        """
+        Retorna as contagens da janela anterior e da atual, e o tempo decorrido da janela atual, sem somar uma
+        tentativa.
+        :param chave: str
+        :return: (int, int, float)
+        """
+        indice, decorrido = self._janela_atual()
+
+        with self.trava:
+            anterior, atual = self._contagens(chave, indice)
+
+        return anterior, atual, decorrido
+
+    def limpar(self, chave: str):
+        """
+        Remove as tentativas da chave informada.
+        :param chave: str
+        """
+        with self.trava:
+            self.itens.pop(chave, None)
+
+
+class ContadoresRedis:
+    """ Contadores de tentativas compartilhados entre processos, armazenados em um servidor compatível com o
+    protocolo do Redis, em janelas fixas de 'janela' segundos (uma chave por janela, com expiração). """
+
+    def __init__(self, url: str, janela: int, prefixo: str = 'controle-de-pedidos:limitador:'):
+        if redis is None:
+            raise RuntimeError('A biblioteca "redis" é necessária para utilizar o limitador Redis.')
+
+        self.cliente = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.janela = janela
+        self.prefixo = prefixo
+
+    def _chaves(self, chave: str) -> (str, str, float):
+        agora = time.time()
+        indice = int(agora // self.janela)
+        return ('{}{}:{}'.format(self.prefixo, chave, indice - 1), '{}{}:{}'.format(self.prefixo, chave, indice),
+                agora % self.janela)
+
+    def registrar(self, chave: str) -> (int, int, float):
+        anterior, atual, decorrido = self._chaves(chave)
+
+        pipeline = self.cliente.pipeline()
+        pipeline.get(anterior)
+        pipeline.incr(atual)
+        pipeline.expire(atual, 2 * self.janela)
+        contagem_anterior, contagem_atual, _ = pipeline.execute()
+
+        return int(contagem_anterior or 0), int(contagem_atual), decorrido
+
+    def consultar(self, chave: str) -> (int, int, float):
+        anterior, atual, decorrido = self._chaves(chave)
+        contagem_anterior, contagem_atual = self.cliente.mget(anterior, atual)
+
+        return int(contagem_anterior or 0), int(contagem_atual or 0), decorrido
+
+    def limpar(self, chave: str):
+        self.cliente.delete(*self._chaves(chave)[:2])
+
+
+class Limitador:
+    """ Limitador de tentativas de login por janela deslizante (aproximada pela soma da janela atual com a fração
+    restante da janela anterior), por endereço IP e por email. """
+
+    def __init__(self, contadores, janela: int, limite_ip: int, limite_email: int):
+        self.contadores = contadores
+        self.janela = janela
+        self.limite_ip = limite_ip
+        self.limite_email = limite_email
+        self.trava = threading.Lock()
+        self.estatisticas_atuais = {'permitidas': 0, 'bloqueadas_ip': 0, 'bloqueadas_email': 0, 'falhas': 0,
+                                    'erros': 0}
+
+    def _contar(self, contador: str):
+        with self.trava:
+            self.estatisticas_atuais[contador] += 1
+
+    def _espera(self, anterior: int, atual: int, decorrido: float, limite: int) -> int:
+        """
+        Retorna o tempo (em segundos) até que a contagem estimada da janela deslizante fique abaixo do limite, ou 0
+        caso ela já esteja abaixo.
+        :param anterior: int
+        :param atual: int
+        :param decorrido: float
+        :param limite: int
+        :return: int
+        """
+        if anterior * (1 - decorrido / self.janela) + atual < limite:
+            return 0
+
+        # Caso a janela atual já tenha atingido o limite, é necessário aguardar o seu término e o decaimento de sua
+        # contagem na janela seguinte.
+        if atual >= limite:
+            return math.ceil(self.janela - decorrido + self.janela * (1 - limite / atual)) or 1
+
+        # Caso contrário, aguarda o decaimento da contagem da janela anterior.
+        return math.ceil(self.janela * (1 - (limite - atual) / anterior) - decorrido) or 1
+
+    def verificar(self, ip: str, email: str) -> int:
+        """
+        Registra uma tentativa de login do endereço IP e verifica os limites do IP e do email (cujas tentativas são
+        registradas apenas quando falham, através de 'registrar_falha'). Retorna o tempo de espera (em segundos)
+        caso algum limite tenha sido atingido, ou 0 caso a tentativa seja permitida. Caso o armazenamento dos
+        contadores esteja indisponível, a tentativa é permitida.
+        :param ip: str
+        :param email: str
+        :return: int
+        """
+        try:
+            espera = self._espera(*self.contadores.registrar('ip:' + ip), self.limite_ip + 1)
+            if espera:
+                self._contar('bloqueadas_ip')
+                return espera
+
+            espera = self._espera(*self.contadores.consultar(_chave_email(email)), self.limite_email)
+            if espera:
+                self._contar('bloqueadas_email')
+                return espera
+        except ERROS_ARMAZENAMENTO:
+            self._contar('erros')
+
+        self._contar('permitidas')
+        return 0
+
+    def registrar_falha(self, email: str):
+        """
+        Registra uma tentativa de login mal sucedida do email informado.
+        :param email: str
+        """
+        self._contar('falhas')
+        self._executar(self.contadores.registrar, _chave_email(email))
+
+    def limpar(self, email: str):
+        """
+        Remove as tentativas mal sucedidas do email informado, após um login bem sucedido.
+        :param email: str
+        """
+        self._executar(self.contadores.limpar, _chave_email(email))
+
+    def _executar(self, funcao, chave: str):
+        try:
+            funcao(chave)
+        except ERROS_ARMAZENAMENTO:
+            self._contar('erros')
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna os contadores do limitador (tentativas permitidas, bloqueadas, mal sucedidas e erros do
+        armazenamento).
+        :return: dict
+        """
+        with self.trava:
+            return dict(self.estatisticas_atuais)
+
+
+def _chave_email(email: str) -> str:
+    """
+    Retorna a chave dos contadores do email informado (o email não é armazenado diretamente).
+    :param email: str
+    :return: str
+    """
+    return 'email:' + hashlib.sha1(str(email).strip().lower().encode()).hexdigest()
+
+
+def limitador_atual():
+    """
+    Retorna o limitador de tentativas de login da aplicação atual, ou None caso ele esteja desabilitado.
+    :return: Limitador | None
+    """
+    return current_app.extensions.get('limitador', None)
+
+
+def limitar_login(email: str):
+    """
+    Verifica os limites de tentativas de login do endereço IP da requisição e do email informado. Caso algum limite
+    tenha sido atingido, retorna uma resposta JSON com status 429 (Muitas Requisições) e o cabeçalho 'Retry-After';
+    caso contrário, retorna None.
+    :param email: str
+    :return: (Response, int, dict) | None
+    """
+    limitador = limitador_atual()
+    if limitador is None:
+        return None
+
+    espera = limitador.verificar(request.remote_addr or '', email)
+    if not espera:
+        return None
+
+    return jsonify({
+        'error': 'Muitas tentativas de login. Tente novamente mais tarde.',
+    }), HTTP_429_TOO_MANY_REQUESTS, {'Retry-After': str(espera)}
+
+
+def registrar_falha_login(email: str):
+    """
+    Registra uma tentativa de login mal sucedida do email informado, caso o limitador esteja habilitado.
+    :param email: str
+    """
+    limitador = limitador_atual()
+    if limitador is not None:
+        limitador.registrar_falha(email)
+
+
+def limpar_falhas_login(email: str):
+    """
+    Remove as tentativas de login mal sucedidas do email informado, caso o limitador esteja habilitado.
+    :param email: str
+    """
+    limitador = limitador_atual()
+    if limitador is not None:
+        limitador.limpar(email)
+
+
+def init_app(app):
+    """
+    Cria o limitador de tentativas de login conforme a configuração 'LIMITADOR_BACKEND' ('memoria', 'redis' ou
+    'nenhum'): no máximo 'LIMITADOR_LOGIN_IP' tentativas por endereço IP e 'LIMITADOR_LOGIN_EMAIL' tentativas mal
+    sucedidas por email, a cada 'LIMITADOR_JANELA' segundos.
+    :param app: Flask
+    """
+    backend = app.config['LIMITADOR_BACKEND']
+    janela = app.config['LIMITADOR_JANELA']
+
+    if backend == 'memoria':
+        contadores = ContadoresMemoria(janela)
+    elif backend == 'redis':
+        contadores = ContadoresRedis(app.config['REDIS_URL'], janela)
+    else:
+        app.extensions['limitador'] = None
+        return
+
+    app.extensions['limitador'] = Limitador(contadores, janela, app.config['LIMITADOR_LOGIN_IP'],
+                                            app.config['LIMITADOR_LOGIN_EMAIL'])
@@ -0,0 +1,214 @@
+from sqlalchemy import select, tuple_
+
+from src.alteracoes import registrar_alteracoes
+from src.consultas import condicoes_filtros, converter_data, extrair_filtros
+from src.database import Pedido, db, etag_pedido
+from src.estatisticas import ATRIBUTOS_RESUMO, registrar_substituicoes
+from src.versionamento import registrar_alteracao
+
+# Atributos que podem ser alterados em lote, e atributos que não podem ser vazios.
+ATRIBUTOS_ALTERAVEIS = ('data_chegada', 'secretaria_solicitante', 'projeto', 'descricao', 'data_envio_financeiro',
+                        'data_retorno_financeiro', 'situacao_autorizacao', 'observacoes')
+ATRIBUTOS_OBRIGATORIOS = ('data_chegada', 'secretaria_solicitante', 'projeto', 'descricao')
+ATRIBUTOS_DATA = ('data_chegada', 'data_envio_financeiro', 'data_retorno_financeiro')
+
+
+def extrair_alteracoes(dados) -> dict:
+    """
+    Retorna as alterações a serem aplicadas aos pedidos (objeto 'alteracoes' do corpo da requisição), com as datas
+    convertidas. Assim como na alteração de um único pedido, as datas vazias são mantidas. Dispara um ValueError caso
+    alguma alteração seja inválida.
+    :param dados: dict
+    :return: dict
+    """
+    if not isinstance(dados, dict):
+        raise ValueError('Alterações inválidas.')
+
+    alteracoes = {}
+
+    for atributo, valor in dados.items():
+        if atributo not in ATRIBUTOS_ALTERAVEIS:
+            raise ValueError('Atributo inválido: {}.'.format(atributo))
+
+        if atributo in ATRIBUTOS_DATA:
+            try:
+                valor = converter_data(valor) if valor else None
+            except (TypeError, ValueError):
+                raise ValueError('Data inválida: {}.'.format(atributo))
+            if valor is None:
+                continue
+        elif valor is None and atributo in ATRIBUTOS_OBRIGATORIOS:
+            raise ValueError('Atributo obrigatório: {}.'.format(atributo))
+
+        alteracoes[atributo] = valor
+
+    if not alteracoes:
+        raise ValueError('Nenhuma alteração informada.')
+
+    return alteracoes
+
+
+def extrair_selecao(dados: dict) -> (list, dict):
+    """
+    Retorna a seleção dos pedidos da operação em lote, a partir do corpo da requisição: a lista 'pedidos' (objetos
+    com 'tipo', 'numero' e, opcionalmente, a 'versao' esperada de cada pedido) ou o objeto 'filtro' (com a mesma
+    sintaxe dos parâmetros da busca de pedidos). Apenas um dos dois deve ser informado. Dispara um ValueError caso a
+    seleção seja inválida.
+    :param dados: dict
+    :return: (list | None, dict | None) (chaves (tipo, numero, versao) e filtros)
+    """
+    if not isinstance(dados, dict):
+        raise ValueError('Informe a lista de pedidos ou o filtro.')
+
+    pedidos, filtro = dados.get('pedidos', None), dados.get('filtro', None)
+
+    if (pedidos is None) == (filtro is None):
+        raise ValueError('Informe a lista de pedidos ou o filtro.')
+
+    if filtro is not None:
+        if not isinstance(filtro, dict) or not filtro:
+            raise ValueError('Filtro inválido.')
+
+        # Os valores do filtro são convertidos para texto, assim como os parâmetros da busca de pedidos.
+        filtros = extrair_filtros({
+            chave: ','.join(map(str, valor)) if isinstance(valor, list) else '' if valor is None else str(valor)
+            for chave, valor in filtro.items()
+        })
+        return None, filtros
+
+    if not isinstance(pedidos, list) or not pedidos:
+        raise ValueError('Lista de pedidos inválida.')
+
+    chaves = {}
+    for pedido in pedidos:
+        try:
+            chave = (str(pedido['tipo']), int(pedido['numero']))
+            versao = int(pedido['versao']) if pedido.get('versao', None) is not None else None
+        except (TypeError, KeyError, ValueError, AttributeError):
+            raise ValueError('Pedido inválido: {}.'.format(pedido))
+        chaves[chave] = versao
+
+    return [chave + (versao,) for chave, versao in chaves.items()], None
+
+
+def _selecionar(chaves: list, filtros: dict, limite: int) -> (list, list):
+    """
+    Busca e bloqueia (SELECT ... FOR UPDATE) os pedidos selecionados, retornando as linhas dos pedidos que serão
+    alterados e os resultados dos pedidos que não serão alterados (não encontrados ou com versão diferente da
+    esperada). Dispara um ValueError caso a quantidade de pedidos exceda o limite.
+    :param chaves: list | None
+    :param filtros: dict | None
+    :param limite: int
+    :return: (list, list)
+    """
+    nomes = dict.fromkeys(('id', 'tipo', 'numero', 'versao', 'criado_em') + ATRIBUTOS_ALTERAVEIS + ATRIBUTOS_RESUMO)
+    consulta = (select(*[getattr(Pedido, nome) for nome in nomes])
+                .order_by(Pedido.tipo, Pedido.numero)
+                .with_for_update())
+
+    if chaves is not None:
+        if len(chaves) > limite:
+            raise ValueError('A operação excede o limite de {} pedidos.'.format(limite))
+
+        # Apenas os pedidos informados são bloqueados: a busca utiliza a chave composta (tipo e número).
+        linhas = {(linha.tipo, linha.numero): linha for linha in db.session.execute(consulta.where(
+            tuple_(Pedido.tipo, Pedido.numero).in_([(tipo, numero) for tipo, numero, _ in chaves])))}
+
+        selecionadas, ignorados = [], []
+        for tipo, numero, versao in chaves:
+            linha = linhas.get((tipo, numero), None)
+            if linha is None:
+                ignorados.append({'tipo': tipo, 'numero': numero, 'status': 'nao_encontrado'})
+            elif versao is not None and versao != linha.versao:
+                ignorados.append({'tipo': tipo, 'numero': numero, 'status': 'conflito', 'versao': linha.versao})
+            else:
+                selecionadas.append(linha)
+
+        return selecionadas, ignorados
+
+    linhas = db.session.execute(consulta.where(*condicoes_filtros(filtros)).limit(limite + 1)).all()
+    if len(linhas) > limite:
+        raise ValueError('A operação excede o limite de {} pedidos.'.format(limite))
+
+    return linhas, []
+
+
+def alterar_pedidos(chaves: list, filtros: dict, alteracoes: dict, limite: int) -> list:
+    """
+    Aplica as alterações aos pedidos selecionados (ver 'extrair_selecao') em um único comando UPDATE, na mesma
+    transação da atualização do resumo e da versão da tabela de pedidos. A versão de cada pedido é incrementada.
+    Retorna o resultado de cada pedido ('atualizado', 'nao_encontrado' ou 'conflito').
+    :param chaves: list | None
+    :param filtros: dict | None
+    :param alteracoes: dict
+    :param limite: int
+    :return: list
+    """
+    linhas, ignorados = _selecionar(chaves, filtros, limite)
+
+    if linhas:
+        db.session.execute(
+            Pedido.__table__.update()
+            .where(Pedido.__table__.c.id.in_([linha.id for linha in linhas]))
+            .values(dict(alteracoes, versao=Pedido.__table__.c.versao + 1))
+        )
+
+        anteriores = [dict(linha._mapping) for linha in linhas]
+        registrar_substituicoes(db.session, anteriores, [dict(valores, **alteracoes) for valores in anteriores])
+        registrar_alteracao(db.session, 'pedidos')
+        registrar_alteracoes(db.session, [(linha.tipo, linha.numero, 'atualizado') for linha in linhas])
+
+    db.session.commit()
+
+    return _ordenar(chaves, ignorados + [{
+        'tipo': linha.tipo,
+        'numero': linha.numero,
+        'status': 'atualizado',
+        'versao': linha.versao + 1,
+        'etag': etag_pedido(linha.tipo, linha.numero, linha.versao + 1, linha.criado_em),
+    } for linha in linhas])
+
+
+def excluir_pedidos(chaves: list, filtros: dict, limite: int) -> list:
+    """
+    Exclui os pedidos selecionados (ver 'extrair_selecao') em um único comando DELETE, na mesma transação da
+    atualização do resumo e da versão da tabela de pedidos. Retorna o resultado de cada pedido ('excluido',
+    'nao_encontrado' ou 'conflito').
+    :param chaves: list | None
+    :param filtros: dict | None
+    :param limite: int
+    :return: list
+    """
+    linhas, ignorados = _selecionar(chaves, filtros, limite)
+
+    if linhas:
+        db.session.execute(
+            Pedido.__table__.delete().where(Pedido.__table__.c.id.in_([linha.id for linha in linhas]))
+        )
+
+        registrar_substituicoes(db.session, [dict(linha._mapping) for linha in linhas], [])
+        registrar_alteracao(db.session, 'pedidos')
+        registrar_alteracoes(db.session, [(linha.tipo, linha.numero, 'excluido') for linha in linhas])
+
+    db.session.commit()
+
+    return _ordenar(chaves, ignorados + [{
+        'tipo': linha.tipo,
+        'numero': linha.numero,
+        'status': 'excluido',
+    } for linha in linhas])
+
+
+def _ordenar(chaves: list, resultados: list) -> list:
+    """
+    Ordena os resultados na ordem dos pedidos informados na requisição ou, na seleção por filtro, por 'tipo' e
+    'numero'.
+    :param chaves: list | None
+    :param resultados: list
+    :return: list
+    """
+    if chaves is None:
+        return sorted(resultados, key=lambda resultado: (resultado['tipo'], resultado['numero']))
+
+    posicoes = {(tipo, numero): posicao for posicao, (tipo, numero, _) in enumerate(chaves)}
+    return sorted(resultados, key=lambda resultado: posicoes[(resultado['tipo'], resultado['numero'])])
@@ -0,0 +1,365 @@
+import atexit
+import gc
+import json
+import os
+import resource
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Blueprint, current_app, g, request, Response
+
+from src.cache import cache_atual
+from src.constants.http_status_codes import HTTP_200_OK, HTTP_401_UNAUTHORIZED
+from src.database import db
+from src.limitador import limitador_atual
+
+# Criação do Blueprint da rota de métricas (fora do prefixo '/api', no formato de exposição do Prometheus).
+metricas_bp = Blueprint('metricas', __name__)
+
+# Limites (em segundos) dos intervalos do histograma de duração das requisições.
+INTERVALOS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Intervalo (em segundos) entre as gravações das métricas de cada processo em seu arquivo.
+INTERVALO_GRAVACAO = 5
+
+# Nome do arquivo que acumula as métricas dos processos encerrados.
+ARQUIVO_ACUMULADO = 'acumulado.json'
+
+
+class Registro:
+    """ Métricas das requisições atendidas pelo processo atual: quantidade de requisições por rota, método e status, e
+    histograma de duração por rota e método. """
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.requisicoes = {}
+        self.duracoes = {}
+        self.processo_gravacao = None
+
+    def registrar(self, rota: str, metodo: str, status: int, duracao: float):
+        """
+        Registra uma requisição atendida.
+        :param rota: str
+        :param metodo: str
+        :param status: int
+        :param duracao: float
+        """
+        indice = bisect_left(INTERVALOS_DURACAO, duracao)
+
+        with self.trava:
+            chave = (rota, metodo, str(status))
+            self.requisicoes[chave] = self.requisicoes.get(chave, 0) + 1
+
+            histograma = self.duracoes.get((rota, metodo), None)
+            if histograma is None:
+                histograma = self.duracoes[(rota, metodo)] = [[0] * (len(INTERVALOS_DURACAO) + 1), 0.0]
+            histograma[0][indice] += 1
+            histograma[1] += duracao
+
+    def exportar(self) -> dict:
+        """
+        Retorna as métricas do processo em um dicionário serializável em JSON.
+        :return: dict
+        """
+        with self.trava:
+            return {
+                'requisicoes': [list(chave) + [total] for chave, total in self.requisicoes.items()],
+                'duracoes': [list(chave) + [list(contagens), soma]
+                             for chave, (contagens, soma) in self.duracoes.items()],
+            }
+
+
+# Métricas do processo atual.
+registro = Registro()
+
+
+def _metricas_processo() -> dict:
+    """
+    Retorna as métricas instantâneas do processo atual: memória, coletor de lixo, pool de conexões, cache e limitador
+    de tentativas de login.
+    :return: dict
+    """
+    metricas = {
+        'rss_maximo_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'gc_objetos': list(gc.get_count()),
+        'gc_coletas': [geracao['collections'] for geracao in gc.get_stats()],
+    }
+
+    # Memória residente atual (disponível apenas no Linux).
+    try:
+        with open('/proc/self/statm') as arquivo:
+            metricas['rss_bytes'] = int(arquivo.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        pass
+
+    # Conexões do pool do banco de dados (pools sem limite de conexões, como o do SQLite, não são informados).
+    pool = db.engine.pool
+    if hasattr(pool, 'checkedout') and hasattr(pool, 'overflow'):
+        metricas['pool'] = {
+            'tamanho': pool.size(),
+            'em_uso': pool.checkedout(),
+            'disponiveis': pool.checkedin(),
+            'excedentes': max(pool.overflow(), 0),
+        }
+
+    cache = cache_atual()
+    if cache is not None:
+        metricas['cache'] = {chave: valor for chave, valor in cache.estatisticas().items()
+                             if isinstance(valor, int) and not isinstance(valor, bool)}
+
+    limitador = limitador_atual()
+    if limitador is not None:
+        metricas['limitador'] = limitador.estatisticas()
+
+    return metricas
+
+
+def _gravar(diretorio: str, dados: dict, nome: str):
+    """
+    Grava as métricas no arquivo informado, de forma atômica (através de um arquivo temporário).
+    :param diretorio: str
+    :param dados: dict
+    :param nome: str
+    """
+    caminho = os.path.join(diretorio, nome)
+    temporario = '{}.{}.tmp'.format(caminho, threading.get_ident())
+
+    with open(temporario, 'w') as arquivo:
+        json.dump(dados, arquivo)
+    os.replace(temporario, caminho)
+
+
+def gravar_processo(diretorio: str):
+    """
+    Grava as métricas do processo atual em seu arquivo no diretório compartilhado entre os processos.
+    :param diretorio: str
+    """
+    dados = registro.exportar()
+    dados['processo'] = _metricas_processo()
+    _gravar(diretorio, dados, '{}.json'.format(os.getpid()))
+
+
+def _ler(caminho: str) -> dict:
+    try:
+        with open(caminho) as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _processo_ativo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _somar(destino: dict, dados: dict):
+    """
+    Soma as métricas das requisições de um processo às métricas acumuladas.
+    :param destino: dict
+    :param dados: dict
+    """
+    for *chave, total in dados.get('requisicoes', []):
+        destino['requisicoes'][tuple(chave)] = destino['requisicoes'].get(tuple(chave), 0) + total
+
+    for rota, metodo, contagens, soma in dados.get('duracoes', []):
+        atual = destino['duracoes'].setdefault((rota, metodo), [[0] * len(contagens), 0.0])
+        atual[0] = [a + b for a, b in zip(atual[0], contagens)]
+        atual[1] += soma
+
+
+def consolidar_processo(diretorio: str, pid: int):
+    """
+    Soma as métricas das requisições de um processo encerrado ao arquivo acumulado e remove o arquivo do processo,
+    mantendo os contadores crescentes após a reinicialização dos workers. Executado pelo processo principal do
+    Gunicorn (gancho 'child_exit').
+    :param diretorio: str
+    :param pid: int
+    """
+    caminho = os.path.join(diretorio, '{}.json'.format(pid))
+    dados = _ler(caminho)
+    if dados is None:
+        return
+
+    acumulado = {'requisicoes': {}, 'duracoes': {}}
+    _somar(acumulado, _ler(os.path.join(diretorio, ARQUIVO_ACUMULADO)) or {})
+    _somar(acumulado, dados)
+
+    _gravar(diretorio, {
+        'requisicoes': [list(chave) + [total] for chave, total in acumulado['requisicoes'].items()],
+        'duracoes': [list(chave) + valores for chave, valores in acumulado['duracoes'].items()],
+    }, ARQUIVO_ACUMULADO)
+    os.remove(caminho)
+
+
+def _rotulos(**rotulos) -> str:
+    return '{' + ','.join('{}="{}"'.format(nome, str(valor).replace('\\', '\\\\').replace('"', '\\"'))
+                          for nome, valor in rotulos.items()) + '}'
+
+
+def exposicao(diretorio: str = None) -> str:
+    """
+    Retorna as métricas no formato de exposição de texto do Prometheus. Caso seja informado o diretório
+    compartilhado, as métricas de todos os processos são agregadas; caso contrário, apenas as do processo atual.
+    :param diretorio: str
+    :return: str
+    """
+    processos = {}
+    agregado = {'requisicoes': {}, 'duracoes': {}}
+
+    if diretorio is not None:
+        gravar_processo(diretorio)
+
+        for nome in os.listdir(diretorio):
+            if not nome.endswith('.json'):
+                continue
+
+            dados = _ler(os.path.join(diretorio, nome))
+            if dados is None:
+                continue
+
+            _somar(agregado, dados)
+
+            # As métricas instantâneas são exibidas apenas para os processos ativos.
+            pid = nome[:-len('.json')]
+            if 'processo' in dados and pid.isdigit() and _processo_ativo(int(pid)):
+                processos[pid] = dados['processo']
+    else:
+        _somar(agregado, registro.exportar())
+        processos[str(os.getpid())] = _metricas_processo()
+
+    linhas = [
+        '# HELP http_requisicoes_total Quantidade de requisições atendidas, por rota, método e status.',
+        '# TYPE http_requisicoes_total counter',
+    ]
+    for (rota, metodo, status), total in sorted(agregado['requisicoes'].items()):
+        linhas.append('http_requisicoes_total{} {}'.format(_rotulos(rota=rota, metodo=metodo, status=status), total))
+
+    linhas += [
+        '# HELP http_requisicao_duracao_segundos Duração das requisições, por rota e método.',
+        '# TYPE http_requisicao_duracao_segundos histogram',
+    ]
+    for (rota, metodo), (contagens, soma) in sorted(agregado['duracoes'].items()):
+        acumulado = 0
+        for limite, contagem in zip(INTERVALOS_DURACAO + ('+Inf',), contagens):
+            acumulado += contagem
+            linhas.append('http_requisicao_duracao_segundos_bucket{} {}'.format(
+                _rotulos(rota=rota, metodo=metodo, le=limite), acumulado))
+        linhas.append('http_requisicao_duracao_segundos_sum{} {}'.format(_rotulos(rota=rota, metodo=metodo), soma))
+        linhas.append('http_requisicao_duracao_segundos_count{} {}'.format(
+            _rotulos(rota=rota, metodo=metodo), acumulado))
+
+    # Métricas instantâneas de cada processo.
+    metricas_processo = (
+        ('processo_rss_bytes', 'gauge', 'Memória residente do processo.', lambda m: [({}, m.get('rss_bytes'))]),
+        ('processo_rss_maximo_bytes', 'gauge', 'Pico de memória residente do processo.',
+         lambda m: [({}, m['rss_maximo_bytes'])]),
+        ('processo_gc_objetos', 'gauge', 'Objetos rastreados pelo coletor de lixo, por geração.',
+         lambda m: [({'geracao': i}, valor) for i, valor in enumerate(m['gc_objetos'])]),
+        ('processo_gc_coletas_total', 'counter', 'Execuções do coletor de lixo, por geração.',
+         lambda m: [({'geracao': i}, valor) for i, valor in enumerate(m['gc_coletas'])]),
+        ('db_pool_conexoes', 'gauge', 'Conexões do pool do banco de dados, por estado.',
+         lambda m: [({'estado': estado}, valor) for estado, valor in m.get('pool', {}).items()]),
+        ('cache_operacoes_total', 'counter', 'Operações do cache de consultas, por resultado.',
+         lambda m: [({'resultado': resultado}, valor) for resultado, valor in m.get('cache', {}).items()
+                    if resultado not in ('itens', 'bytes', 'bytes_maximo')]),
+        ('cache_ocupacao', 'gauge', 'Ocupação do cache de consultas (itens e bytes).',
+         lambda m: [({'unidade': unidade}, m['cache'][unidade]) for unidade in ('itens', 'bytes')
+                    if unidade in m.get('cache', {})]),
+        ('limitador_login_tentativas_total', 'counter',
+         'Tentativas de login verificadas pelo limitador, por resultado.',
+         lambda m: [({'resultado': resultado}, valor) for resultado, valor in m.get('limitador', {}).items()]),
+    )
+
+    for nome, tipo, descricao, valores in metricas_processo:
+        linhas += ['# HELP {} {}'.format(nome, descricao), '# TYPE {} {}'.format(nome, tipo)]
+        for pid, metricas in sorted(processos.items()):
+            for rotulos, valor in valores(metricas):
+                if valor is not None:
+                    linhas.append('{}{} {}'.format(nome, _rotulos(pid=pid, **rotulos), valor))
+
+    return '\n'.join(linhas) + '\n'
+
+
+def _antes_requisicao():
+    g.inicio_requisicao = time.perf_counter()
+
+
+def _apos_requisicao(response: Response) -> Response:
+    """
+    Após cada requisição, registra a sua rota, status e duração.
+    :param response: Response
+    :return: Response
+    """
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is None:
+        return response
+
+    rota = request.url_rule.endpoint if request.url_rule is not None else 'nao_encontrada'
+    registro.registrar(rota, request.method, response.status_code, time.perf_counter() - inicio)
+
+    # Na primeira requisição de cada processo (após a criação do worker), inicia a gravação periódica das métricas.
+    diretorio = current_app.config['METRICAS_DIRETORIO']
+    if diretorio and registro.processo_gravacao != os.getpid():
+        registro.processo_gravacao = os.getpid()
+        threading.Thread(target=_gravar_periodicamente, args=(current_app._get_current_object(), diretorio),
+                         daemon=True).start()
+
+    return response
+
+
+def _gravar_periodicamente(app, diretorio: str):
+    """
+    Grava as métricas do processo atual a cada 'INTERVALO_GRAVACAO' segundos (executada em uma thread).
+    :param app: Flask
+    :param diretorio: str
+    """
+    while True:
+        time.sleep(INTERVALO_GRAVACAO)
+        with app.app_context():
+            gravar_processo(diretorio)
+
+
+def init_app(app):
+    """
+    Inicializa a coleta das métricas das requisições. Caso 'METRICAS_DIRETORIO' esteja configurado, cada processo
+    grava as suas métricas nesse diretório, e a rota '/metrics' agrega as métricas de todos os processos.
+    :param app: Flask
+    """
+    diretorio = app.config['METRICAS_DIRETORIO']
+
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+
+        # Ao encerrar o processo, grava as métricas ainda não gravadas.
+        def gravar_ao_encerrar():
+            if registro.requisicoes:
+                with app.app_context():
+                    gravar_processo(diretorio)
+
+        atexit.register(gravar_ao_encerrar)
+
+    app.before_request(_antes_requisicao)
+    app.after_request(_apos_requisicao)
+
+
+@metricas_bp.get('/metrics')
+def metrics() -> (Response, int):
+    """
+    Retorna as métricas da aplicação no formato de exposição de texto do Prometheus. Caso 'METRICAS_TOKEN' esteja
+    configurado, o token deve ser informado no cabeçalho Authorization.
+    Método da Requisição: GET.
+    Cabeçalhos (headers) Opcionais: Authorization ('Bearer <METRICAS_TOKEN>').
+    :return: (Response, int)
+    """
+    token = current_app.config['METRICAS_TOKEN']
+    if token and request.headers.get('Authorization', '') != 'Bearer ' + token:
+        return Response('Token inválido.\n', mimetype='text/plain'), HTTP_401_UNAUTHORIZED
+
+    return Response(exposicao(current_app.config['METRICAS_DIRETORIO'] or None),
+                    mimetype='text/plain; version=0.0.4'), HTTP_200_OK
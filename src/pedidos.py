@@ -1,73 +1,123 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from flask import Blueprint, request, jsonify, Response
-from flask_jwt_extended import jwt_required
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
+from flask_jwt_extended import (create_access_token, get_jwt, get_jwt_identity, get_jwt_request_location,
+                                jwt_required)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
 from src.constants.http_status_codes import (HTTP_409_CONFLICT, HTTP_201_CREATED, HTTP_200_OK, HTTP_404_NOT_FOUND,
-                                             HTTP_204_NO_CONTENT)
-from src.database import Pedido, db
+                                             HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED,
+                                             HTTP_410_GONE, HTTP_412_PRECONDITION_FAILED,
+                                             HTTP_503_SERVICE_UNAVAILABLE)
+from src.alteracoes import consultar_alteracoes, eventos
+from src.condicionais import (definir_validadores, etag_consulta, nao_modificado, parametros_normalizados,
+                              precondicao_falhou, resposta_nao_modificada)
+from src.consultas import (armazenar_busca, busca_em_cache, converter_data, extrair_busca, extrair_filtros,
+                           mensagem_filtro_invalido, resposta_pagina)
+from src.database import Pedido, PedidoArquivado, db
+from src.estatisticas import DIMENSOES, consultar_estatisticas
+from src.exportacao import FORMATOS as FORMATOS_EXPORTACAO, GERADORES as GERADORES_EXPORTACAO, ler_pedidos
+from src.idempotencia import idempotente
+from src.importacao import FORMATOS as FORMATOS_IMPORTACAO, abrir_texto, importar_pedidos, ler_linhas
+from src.lotes import alterar_pedidos, excluir_pedidos, extrair_alteracoes, extrair_selecao
+from src.serializacao import dumps, resposta_json
+from src.versionamento import versao_tabela
 
 # Criação do Blueprint das rotas de gerenciamento de pedidos.
 pedidos_bp = Blueprint('pedidos', __name__, url_prefix='/api/pedidos')
 
 
+def _data(valor: str):
+    """
+    Converte uma data no formato 'YYYY-MM-DD' para o tipo date, ou retorna None caso não seja informada.
+    :param valor: str
+    :return: date | None
+    """
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+
+
+def novo_pedido(dados: dict) -> Pedido:
+    """
+    Cria a entidade de um novo pedido a partir das variáveis obrigatórias e opcionais informadas (corpo JSON da
+    requisição).
+    :param dados: dict
+    :return: Pedido
+    """
+    return Pedido(
+        numero=dados.get('numero', None),
+        tipo=dados.get('tipo', None),
+        data_chegada=datetime.strptime(dados.get('data_chegada', None), '%Y-%m-%d').date(),
+        secretaria_solicitante=dados.get('secretaria_solicitante', None),
+        projeto=dados.get('projeto', None),
+        descricao=dados.get('descricao', None),
+        data_envio_financeiro=_data(dados.get('data_envio_financeiro', None)),
+        data_retorno_financeiro=_data(dados.get('data_retorno_financeiro', None)),
+        situacao_autorizacao=dados.get('situacao_autorizacao', None),
+        observacoes=dados.get('observacoes', None),
+    )
+
+
+def atualizar_pedido(pedido: Pedido, dados: dict):
+    """
+    Atualiza os atributos do pedido com as variáveis informadas (corpo JSON da requisição). Os atributos não
+    informados, assim como as datas vazias, são mantidos.
+    :param pedido: Pedido
+    :param dados: dict
+    """
+    pedido.secretaria_solicitante = dados.get('secretaria_solicitante', pedido.secretaria_solicitante)
+    pedido.projeto = dados.get('projeto', pedido.projeto)
+    pedido.descricao = dados.get('descricao', pedido.descricao)
+    pedido.situacao_autorizacao = dados.get('situacao_autorizacao', pedido.situacao_autorizacao)
+    pedido.observacoes = dados.get('observacoes', pedido.observacoes)
+    pedido.data_chegada = _data(dados.get('data_chegada', None)) or pedido.data_chegada
+    pedido.data_envio_financeiro = _data(dados.get('data_envio_financeiro', None)) or pedido.data_envio_financeiro
+    pedido.data_retorno_financeiro = (_data(dados.get('data_retorno_financeiro', None))
+                                      or pedido.data_retorno_financeiro)
+
+
 @pedidos_bp.post('')
 @jwt_required()
+@idempotente
 def create() -> (Response, int):
     """
     Cria um novo pedido.
     Método da Requisição: POST.
+    Cabeçalhos (headers) Opcionais: Idempotency-Key (chave de idempotência da requisição).
     Variáveis Obrigatórias (JSON): 'numero', 'tipo', 'data_chegada', 'secretaria_solicitante', 'projeto' e 'descricao'.
     Variáveis Opcionais (JSON): 'data_envio_financeiro', 'data_retorno_financeiro', 'situacao_autorizacao' e
     'observacoes'.
     :return: (Response, int)
     """
 
-    # Busca as variáveis obrigatórias e opcionais no corpo da requisição.
-    numero = request.json.get('numero', None)
-    tipo = request.json.get('tipo', None)
-    data_chegada = request.json.get('data_chegada', None)
-    secretaria_solicitante = request.json.get('secretaria_solicitante', None)
-    projeto = request.json.get('projeto', None)
-    descricao = request.json.get('descricao', None)
-    data_envio_financeiro = request.json.get('data_envio_financeiro', None)
-    data_retorno_financeiro = request.json.get('data_retorno_financeiro', None)
-    situacao_autorizacao = request.json.get('situacao_autorizacao', None)
-    observacoes = request.json.get('observacoes', None)
+    # Cria a entidade do novo pedido, a partir das variáveis obrigatórias e opcionais do corpo da requisição.
+    pedido = novo_pedido(request.json)
 
-    # Busca um pedido no banco de dados com o numero e tipo informado e, caso ele já exista, retorna uma resposta JSON
-    # com status 409 (Conflito) contendo a mensagem do erro.
-    if Pedido.query.filter_by(numero=numero, tipo=tipo).first():
+    # Caso já exista um pedido arquivado com o numero e tipo informado, retorna uma resposta JSON com status 409
+    # (Conflito), pois o pedido arquivado continua sendo retornado pela busca do pedido.
+    if db.session.get(PedidoArquivado, (pedido.tipo, pedido.numero)) is not None:
         return jsonify({
-            'error': 'Pedido já cadastrado.',
+            'error': 'Pedido já cadastrado (arquivado).',
         }), HTTP_409_CONFLICT
 
-    # Cria a entidade do novo pedido.
-    pedido = Pedido(
-        numero=numero,
-        tipo=tipo,
-        data_chegada=datetime.strptime(data_chegada, '%Y-%m-%d').date(),
-        secretaria_solicitante=secretaria_solicitante,
-        projeto=projeto,
-        descricao=descricao,
-        data_envio_financeiro=datetime.strptime(
-            data_envio_financeiro, '%Y-%m-%d').date() if data_envio_financeiro else None,
-        data_retorno_financeiro=datetime.strptime(
-            data_retorno_financeiro, '%Y-%m-%d').date() if data_retorno_financeiro else None,
-        situacao_autorizacao=situacao_autorizacao,
-        observacoes=observacoes,
-    )
-
     # Adiciona o novo pedido à transação atual.
     db.session.add(pedido)
 
-    # Efetua o commit da transação atual.
-    db.session.commit()
+    # Efetua o commit da transação atual. Caso já exista um pedido com o numero e tipo informado, o índice único da
+    # tabela rejeita a inserção e é retornada uma resposta JSON com status 409 (Conflito) contendo a mensagem do erro.
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Pedido já cadastrado.',
+        }), HTTP_409_CONFLICT
 
     # Caso a criação seja bem sucedida, retorna uma resposta JSON com status 201 (Criado), contendo o novo pedido.
-    return jsonify({
+    response = jsonify({
         'pedido': pedido.to_dict(),
-    }), HTTP_201_CREATED
+    })
+    return definir_validadores(response, pedido.etag, pedido.ultima_modificacao), HTTP_201_CREATED
 
 
 @pedidos_bp.get('')
@@ -79,56 +129,373 @@ def read_all() -> (Response, int):
     Método da Requisição: GET.
     Variáveis Opcionais (Params): 'id', 'numero', 'tipo', 'data_chegada', 'secretaria_solicitante', 'projeto',
     'descricao', 'data_envio_financeiro', 'data_retorno_financeiro', 'situacao_autorizacao' e 'observacoes'.
+    Variáveis de Paginação (Params): 'limit' (quantidade de pedidos por página), 'cursor' (cursor retornado em
+    'next_cursor' pela página anterior) e 'ordem' ('data_chegada' ou 'numero').
+    Variáveis de Streaming (Params): 'stream' ('json' ou 'ndjson'), que retorna os pedidos em partes, sem carregar
+    todo o resultado na memória.
+    Variáveis de Campos (Params): 'fields' (campos retornados, separados por vírgula).
     :return: (Response, int)
     """
 
-    # Busca as variáveis opcionais nos parâmetros da requisição, e a transforma em um dicionário.
-    query: dict = request.args.to_dict()
-
-    # Caso tenha sido informado o parâmetro data_chegada, o altera no dicionário, convertendo para o formato de data.
-    # Caso o valor esteja informado e seja vazio, será adicionado à query o valor null.
-    if query.get('data_chegada', None) is not None:
-        if query['data_chegada'] == '':
-            query['data_chegada'] = None
-        else:
-            query['data_chegada'] = datetime.strptime(query['data_chegada'], '%Y-%m-%d').date()
-
-    # Caso tenha sido informado o parâmetro data_envio_financeiro, o altera no dicionário, convertendo para o formato de
-    # data. Caso o valor esteja informado e seja vazio, será adicionado à query o valor null.
-    if query.get('data_envio_financeiro', None) is not None:
-        if query['data_envio_financeiro'] == '':
-            query['data_envio_financeiro'] = None
-        else:
-            query['data_envio_financeiro'] = datetime.strptime(query['data_envio_financeiro'], '%Y-%m-%d').date()
-
-    # Caso tenha sido informado o parâmetro data_retorno_financeiro, o altera no dicionário, convertendo para o formato
-    # de data. Caso o valor esteja informado e seja vazio, será adicionado à query o valor null.
-    if query.get('data_retorno_financeiro', None) is not None:
-        if query['data_retorno_financeiro'] == '':
-            query['data_retorno_financeiro'] = None
-        else:
-            query['data_retorno_financeiro'] = datetime.strptime(query['data_retorno_financeiro'], '%Y-%m-%d').date()
-
-    # Busca todos os pedidos contidos no banco de dados, utilizando como filtro os parâmetros informados (dicionário
-    # 'query').
-    pedidos = Pedido.query.filter_by(**query).all()
-
-    # Cria uma lista que conterá os pedidos encontrados, serializados.
-    data = []
-
-    # Faz um loop nos pedidos encontrados no banco de dados, e para cada um deles, os insere serializados na lista
-    # criada anteriormente.
-    for pedido in pedidos:
-        data.append(pedido.to_dict())
-
-    # Caso a busca seja bem sucedida, retorna uma resposta JSON com status 200 (OK), contendo os pedidos encontrados e
-    # os filtros utilizados na busca.
+    # Valida os parâmetros da busca (filtros, campos, ordenação, streaming, limite e cursor) e monta a consulta das
+    # colunas dos pedidos no banco de dados. As linhas são serializadas diretamente, sem a criação das entidades.
+    try:
+        busca = extrair_busca(request.args.to_dict(), current_app.config['PEDIDOS_LIMITE_MAXIMO'])
+    except ValueError as exc:
+        return jsonify({
+            'error': str(exc),
+        }), HTTP_400_BAD_REQUEST
+
+    # Gera o identificador (ETag) do resultado a partir da versão da tabela de pedidos e dos parâmetros da busca. Caso
+    # o cliente já possua o resultado atual, retorna uma resposta com status 304 (Não Modificado), sem efetuar a busca.
+    versao = versao_tabela('pedidos')
+    etag = etag_consulta(versao.versao, parametros_normalizados())
+    if nao_modificado(etag, versao.atualizado_em):
+        return resposta_nao_modificada(etag, versao.atualizado_em)
+
+    if busca['stream'] is not None:
+        # Caso tenha sido solicitado o streaming, retorna os pedidos em partes à medida em que são lidos do banco de
+        # dados.
+        response = _stream_pedidos(busca['consulta'], busca['serializar'], busca['query'], busca['stream'])
+    elif busca['limit'] is None:
+        # Caso não tenha sido informado o limite, mantém o comportamento original, retornando todos os pedidos. O
+        # resultado serializado é mantido no cache.
+        corpo = busca_em_cache(versao.versao)
+        if corpo is None:
+            corpo = armazenar_busca(versao.versao, busca, db.session.execute(busca['consulta']).all())
+        response = Response(corpo, mimetype='application/json')
+    else:
+        # Retorna a página de pedidos, com o cursor da próxima página.
+        response = resposta_pagina(busca, db.session.execute(busca['consulta']).all())
+
+    return definir_validadores(response, etag, versao.atualizado_em), HTTP_200_OK
+
+
+def _stream_pedidos(consulta, serializar, query: dict, formato: str) -> Response:
+    """
+    Retorna uma resposta que envia os pedidos em partes, à medida em que são lidos do banco de dados através de um
+    cursor no servidor, mantendo o consumo de memória constante independentemente do tamanho do resultado. No
+    formato 'json' é enviado o mesmo objeto da busca completa, e no formato 'ndjson' é enviado um pedido por linha.
+    :param consulta: Select
+    :param serializar: Callable[[Row], dict]
+    :param query: dict
+    :param formato: str
+    :return: Response
+    """
+    lote = current_app.config['PEDIDOS_STREAM_LOTE']
+
+    def gerar():
+        resultado = db.session.execute(consulta.execution_options(stream_results=True, max_row_buffer=lote))
+
+        if formato == 'ndjson':
+            for linhas in resultado.partitions(lote):
+                yield b''.join(dumps(serializar(linha)) + b'\n' for linha in linhas)
+            return
+
+        yield b'{"query":' + dumps(query) + b',"pedidos":['
+        separador = b''
+        for linhas in resultado.partitions(lote):
+            yield separador + b','.join(dumps(serializar(linha)) for linha in linhas)
+            separador = b','
+        yield b']}\n'
+
+    mimetype = 'application/x-ndjson' if formato == 'ndjson' else 'application/json'
+    return Response(stream_with_context(gerar()), mimetype=mimetype)
+
+
+@pedidos_bp.patch('')
+@jwt_required()
+@idempotente
+def update_many() -> (Response, int):
+    """
+    Altera vários pedidos de uma só vez, em um único comando e em uma única transação. Os pedidos são selecionados
+    pela lista 'pedidos' ou pelo objeto 'filtro' (apenas um dos dois deve ser informado).
+    Método da Requisição: PATCH.
+    Cabeçalhos (headers) Opcionais: Idempotency-Key (chave de idempotência da requisição).
+    Variáveis Obrigatórias (JSON): 'alteracoes' (objeto com os atributos alterados: 'data_chegada',
+    'secretaria_solicitante', 'projeto', 'descricao', 'data_envio_financeiro', 'data_retorno_financeiro',
+    'situacao_autorizacao' e 'observacoes') e 'pedidos' (lista de objetos com 'tipo', 'numero' e, opcionalmente, a
+    'versao' esperada do pedido) ou 'filtro' (objeto com os mesmos filtros da busca de pedidos).
+    :return: (Response, int)
+    """
+
+    # Busca a seleção dos pedidos e as alterações no corpo da requisição. Caso sejam inválidas, retorna uma resposta
+    # JSON com status 400 (Requisição Inválida), contendo a mensagem de erro.
+    try:
+        chaves, filtros = extrair_selecao(request.json)
+        alteracoes = extrair_alteracoes(request.json.get('alteracoes', None))
+        resultados = alterar_pedidos(chaves, filtros, alteracoes, current_app.config['PEDIDOS_LIMITE_MAXIMO'])
+    except ValueError as exc:
+        return jsonify({
+            'error': str(exc),
+        }), HTTP_400_BAD_REQUEST
+
+    # Retorna uma resposta JSON com status 200 (OK), contendo o resultado de cada pedido.
+    return jsonify({
+        'resultados': resultados,
+        'atualizados': sum(resultado['status'] == 'atualizado' for resultado in resultados),
+    }), HTTP_200_OK
+
+
+@pedidos_bp.delete('')
+@jwt_required()
+@idempotente
+def delete_many() -> (Response, int):
+    """
+    Exclui vários pedidos de uma só vez, em um único comando e em uma única transação. Os pedidos são selecionados
+    pela lista 'pedidos' ou pelo objeto 'filtro' (apenas um dos dois deve ser informado).
+    Método da Requisição: DELETE.
+    Cabeçalhos (headers) Opcionais: Idempotency-Key (chave de idempotência da requisição).
+    Variáveis Obrigatórias (JSON): 'pedidos' (lista de objetos com 'tipo', 'numero' e, opcionalmente, a 'versao'
+    esperada do pedido) ou 'filtro' (objeto com os mesmos filtros da busca de pedidos).
+    :return: (Response, int)
+    """
+
+    # Busca a seleção dos pedidos no corpo da requisição. Caso seja inválida, retorna uma resposta JSON com status 400
+    # (Requisição Inválida), contendo a mensagem de erro.
+    try:
+        chaves, filtros = extrair_selecao(request.json)
+        resultados = excluir_pedidos(chaves, filtros, current_app.config['PEDIDOS_LIMITE_MAXIMO'])
+    except ValueError as exc:
+        return jsonify({
+            'error': str(exc),
+        }), HTTP_400_BAD_REQUEST
+
+    # Retorna uma resposta JSON com status 200 (OK), contendo o resultado de cada pedido.
     return jsonify({
-        'query': query,
-        'pedidos': data,
+        'resultados': resultados,
+        'excluidos': sum(resultado['status'] == 'excluido' for resultado in resultados),
+    }), HTTP_200_OK
+
+
+@pedidos_bp.post('/changes/token')
+@jwt_required()
+def changes_token() -> (Response, int):
+    """
+    Gera o token de acesso das alterações em tempo real, a ser informado pelo EventSource no parâmetro 'jwt' da rota
+    de alterações. O token é válido apenas nessa rota, por 'ALTERACOES_TOKEN_TTL' segundos, evitando que o token de
+    acesso do login (válido por 24 horas em todas as rotas) seja exposto na URL (logs de servidores e proxies).
+    Cabeçalhos (headers) Obrigatórios: Authorization (token de acesso)
+    Método da Requisição: POST.
+    :return: (Response, int)
+    """
+    validade = current_app.config['ALTERACOES_TOKEN_TTL']
+    access_token = create_access_token(identity=get_jwt_identity(), additional_claims={'escopo': 'alteracoes'},
+                                       expires_delta=timedelta(seconds=validade))
+
+    # Retorna uma resposta JSON com status 200 (OK), contendo o token de acesso e a sua validade (em segundos).
+    return jsonify({
+        'access_token': access_token,
+        'expires_in': validade,
+    }), HTTP_200_OK
+
+
+@pedidos_bp.get('/changes')
+@jwt_required(locations=['headers', 'query_string'])
+def changes() -> (Response, int):
+    """
+    Retorna as alterações de pedidos (criações, alterações e exclusões) efetuadas após a versão informada, com o
+    estado atual de cada pedido alterado. Caso a requisição aceite 'text/event-stream', as alterações são enviadas
+    continuamente (Server-Sent Events), a partir da versão informada ou do cabeçalho 'Last-Event-ID'. Como o
+    EventSource do navegador não envia cabeçalhos, pode ser informado no parâmetro 'jwt' o token de curta duração
+    gerado pela rota '[POST] /api/pedidos/changes/token' (o token de acesso do login não é aceito no parâmetro).
+    Método da Requisição: GET.
+    Variáveis Opcionais (Query String): 'since' (versão a partir da qual as alterações são retornadas; caso não seja
+    informada, é retornada apenas a versão atual).
+    :return: (Response, int)
+    """
+
+    # Caso o token informado na URL não seja o token das alterações, retorna uma resposta JSON com status 401 (Não
+    # Autorizado).
+    if get_jwt_request_location() == 'query_string' and get_jwt().get('escopo', None) != 'alteracoes':
+        return jsonify({
+            'error': 'O parâmetro "jwt" aceita apenas o token gerado em [POST] /api/pedidos/changes/token.',
+        }), HTTP_401_UNAUTHORIZED
+
+    # Busca a versão informada. Caso seja inválida, retorna uma resposta JSON com status 400 (Requisição Inválida),
+    # contendo a mensagem de erro.
+    try:
+        desde = request.args.get('since', None) or request.headers.get('Last-Event-ID', None)
+        desde = int(desde) if desde else None
+    except ValueError:
+        return jsonify({
+            'error': 'Versão inválida.',
+        }), HTTP_400_BAD_REQUEST
+
+    # Envia as alterações continuamente, caso a requisição aceite Server-Sent Events.
+    if request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream':
+        # Cada conexão ocupa uma thread do servidor enquanto está aberta. Caso o limite de conexões simultâneas do
+        # processo tenha sido atingido, retorna uma resposta JSON com status 503 (Serviço Indisponível), com o
+        # cabeçalho 'Retry-After', preservando as demais threads para as outras rotas.
+        distribuidor = current_app.extensions['alteracoes']
+        if not distribuidor.reservar():
+            response = jsonify({
+                'error': 'O limite de conexões simultâneas das alterações foi atingido.',
+            })
+            response.headers['Retry-After'] = str(int(current_app.config['ALTERACOES_INTERVALO']))
+            return response, HTTP_503_SERVICE_UNAVAILABLE
+
+        # A reserva é liberada quando o servidor encerra a resposta, mesmo que a conexão seja encerrada antes do
+        # início do envio.
+        response = Response(stream_with_context(eventos(desde)), mimetype='text/event-stream')
+        response.call_on_close(distribuidor.liberar)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response, HTTP_200_OK
+
+    # Caso a versão não tenha sido informada, retorna apenas a versão atual.
+    if desde is None:
+        return jsonify({
+            'versao': versao_tabela('pedidos').versao,
+            'alteracoes': [],
+        }), HTTP_200_OK
+
+    # Caso as alterações não estejam mais disponíveis no log ou excedam o limite, retorna uma resposta JSON com status
+    # 410 (Não Mais Disponível), e o cliente deve buscar novamente todos os pedidos.
+    resultado = consultar_alteracoes(desde, current_app.config['PEDIDOS_LIMITE_MAXIMO'])
+    if resultado is None:
+        return jsonify({
+            'error': 'As alterações desde a versão informada não estão disponíveis.',
+        }), HTTP_410_GONE
+
+    # Retorna uma resposta JSON com status 200 (OK), contendo a versão atual e as alterações.
+    versao, alteracoes = resultado
+    return resposta_json({
+        'versao': versao,
+        'alteracoes': alteracoes,
     }), HTTP_200_OK
 
 
+@pedidos_bp.get('/stats')
+@jwt_required()
+def stats() -> (Response, int):
+    """
+    Retorna as estatísticas dos pedidos: quantidade de pedidos, pedidos enviados e retornados do financeiro e prazo
+    médio do financeiro (em dias, entre o envio e o retorno), no total e agrupadas pelas dimensões informadas. As
+    estatísticas são calculadas a partir do resumo de pedidos, mantido a cada alteração dos pedidos, e não incluem os
+    pedidos arquivados (o arquivamento é registrado no resumo como uma exclusão), o que é indicado na resposta.
+    Método da Requisição: GET.
+    Variáveis Opcionais (Params): 'inicio' e 'fim' (período da data de chegada, no formato 'YYYY-MM-DD') e 'agrupar'
+    (dimensões separadas por vírgula: 'tipo', 'secretaria_solicitante', 'situacao_autorizacao', 'ano' e 'mes').
+    :return: (Response, int)
+    """
+
+    # Busca o período da data de chegada.
+    try:
+        inicio = converter_data(request.args.get('inicio', ''))
+        fim = converter_data(request.args.get('fim', ''))
+    except ValueError:
+        return jsonify({
+            'error': 'Data inválida.',
+        }), HTTP_400_BAD_REQUEST
+
+    # Busca as dimensões do agrupamento, as quais, caso não sejam informadas, resultam apenas nos totais gerais.
+    dimensoes = [dimensao for dimensao in request.args.get('agrupar', '').split(',') if dimensao]
+    if any(dimensao not in DIMENSOES for dimensao in dimensoes):
+        return jsonify({
+            'error': 'Dimensão inválida.',
+        }), HTTP_400_BAD_REQUEST
+
+    # Assim como na busca de pedidos, as estatísticas são identificadas pela versão da tabela de pedidos e pelos
+    # parâmetros. Caso o cliente já possua as estatísticas atuais, retorna uma resposta com status 304 (Não
+    # Modificado).
+    versao = versao_tabela('pedidos')
+    etag = etag_consulta(versao.versao, parametros_normalizados())
+    if nao_modificado(etag, versao.atualizado_em):
+        return resposta_nao_modificada(etag, versao.atualizado_em)
+
+    estatisticas = consultar_estatisticas(inicio, fim, list(dict.fromkeys(dimensoes)))
+
+    # Retorna uma resposta JSON com status 200 (OK), contendo as estatísticas, a indicação de que os pedidos
+    # arquivados não estão incluídos e os parâmetros utilizados.
+    response = resposta_json(dict(estatisticas, inclui_arquivados=False, query={
+        'inicio': inicio.isoformat() if inicio else None,
+        'fim': fim.isoformat() if fim else None,
+        'agrupar': dimensoes,
+    }))
+    return definir_validadores(response, etag, versao.atualizado_em), HTTP_200_OK
+
+
+@pedidos_bp.get('/export')
+@jwt_required()
+def export() -> (Response, int):
+    """
+    Exporta os pedidos contidos no banco de dados para um arquivo CSV, NDJSON ou XLSX. É possível filtrar os pedidos
+    da mesma forma que na busca de todos os pedidos. O arquivo é enviado em partes, à medida em que os pedidos são
+    lidos do banco de dados, e é comprimido caso o cliente aceite (ver 'compressao.py').
+    Método da Requisição: GET.
+    Variáveis Opcionais (Params): 'format' ('csv', 'ndjson' ou 'xlsx') e os mesmos filtros da busca de pedidos.
+    :return: (Response, int)
+    """
+
+    # Busca o formato do arquivo, que caso não seja informado, será CSV.
+    formato = request.args.get('format', 'csv')
+    if formato not in FORMATOS_EXPORTACAO:
+        return jsonify({
+            'error': 'Formato inválido.',
+        }), HTTP_400_BAD_REQUEST
+
+    # Busca os filtros nos parâmetros da requisição, da mesma forma que na busca de todos os pedidos.
+    parametros = request.args.to_dict()
+    parametros.pop('format', None)
+    try:
+        query = extrair_filtros(parametros)
+    except ValueError as exc:
+        return jsonify({
+            'error': mensagem_filtro_invalido(exc),
+        }), HTTP_400_BAD_REQUEST
+
+    # Gera o conteúdo do arquivo a partir dos pedidos lidos do banco de dados.
+    conteudo = GERADORES_EXPORTACAO[formato](ler_pedidos(query, current_app.config['PEDIDOS_STREAM_LOTE']))
+
+    response = Response(stream_with_context(conteudo), mimetype=FORMATOS_EXPORTACAO[formato])
+    response.headers['Content-Disposition'] = 'attachment; filename=pedidos.{}'.format(formato)
+
+    return response, HTTP_200_OK
+
+
+@pedidos_bp.post('/bulk')
+@jwt_required()
+def bulk() -> (Response, int):
+    """
+    Importa vários pedidos de uma só vez, a partir de um arquivo CSV ou NDJSON enviado no corpo da requisição. Os
+    pedidos são inseridos em lotes e os pedidos já cadastrados (mesmo 'tipo' e 'numero') são atualizados. Os pedidos
+    já arquivados não são importados, e são indicados nos erros do relatório.
+    Método da Requisição: POST.
+    Corpo da Requisição: arquivo CSV (Content-Type: text/csv) ou NDJSON (Content-Type: application/x-ndjson).
+    Variáveis Opcionais (Params): 'format' ('csv' ou 'ndjson', caso não seja possível identificá-lo pelo
+    Content-Type) e 'batch_size' (quantidade de pedidos inseridos por lote).
+    :return: (Response, int)
+    """
+
+    # Identifica o formato do arquivo, pelo parâmetro 'format' ou pelo Content-Type da requisição.
+    formato = request.args.get('format', None)
+    if formato is None:
+        formato = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+
+    if formato not in FORMATOS_IMPORTACAO:
+        return jsonify({
+            'error': 'Formato inválido.',
+        }), HTTP_400_BAD_REQUEST
+
+    # Busca o tamanho do lote, que caso não seja informado, será o tamanho configurado na aplicação.
+    try:
+        tamanho_lote = int(request.args.get('batch_size', current_app.config['PEDIDOS_IMPORTACAO_LOTE']))
+        if tamanho_lote < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({
+            'error': 'Tamanho do lote inválido.',
+        }), HTTP_400_BAD_REQUEST
+
+    # Lê o corpo da requisição aos poucos e importa os pedidos.
+    linhas = ler_linhas(abrir_texto(request.stream), formato)
+    relatorio = importar_pedidos(linhas, tamanho_lote)
+
+    # Retorna uma resposta JSON com status 200 (OK), contendo o relatório da importação.
+    return jsonify(relatorio), HTTP_200_OK
+
+
 @pedidos_bp.get('/<string:tipo>/<int:numero>')
 @jwt_required()
 def read_one(tipo: str, numero: int) -> (Response, int):
@@ -141,8 +508,9 @@ def read_one(tipo: str, numero: int) -> (Response, int):
     :return: (Response, int)
     """
 
-    # Busca um pedido no banco de dados com o tipo e numero informado na URI.
-    pedido = Pedido.query.filter_by(numero=numero, tipo=tipo).first()
+    # Busca um pedido no banco de dados com o tipo e numero informado na URI. Caso não exista, busca o pedido no
+    # arquivo (pedidos arquivados, apenas para consulta).
+    pedido = Pedido.query.filter_by(numero=numero, tipo=tipo).first() or db.session.get(PedidoArquivado, (tipo, numero))
 
     # Caso o pedido não exista, retorna uma resposta JSON com status 404 (Não Encontrado), contendo a mensagem de erro.
     if not pedido:
@@ -150,20 +518,29 @@ def read_one(tipo: str, numero: int) -> (Response, int):
             'error': 'Pedido não cadastrado.',
         }), HTTP_404_NOT_FOUND
 
+    # Caso o cliente já possua a versão atual do pedido, retorna uma resposta com status 304 (Não Modificado), sem
+    # serializar o pedido.
+    if nao_modificado(pedido.etag, pedido.ultima_modificacao):
+        return resposta_nao_modificada(pedido.etag, pedido.ultima_modificacao)
+
     # Caso o pedido exista, retorna uma resposta JSON com status 200 (OK), contendo o pedido encontrado.
-    return jsonify({
+    response = jsonify({
         'pedido': pedido.to_dict(),
-    }), HTTP_200_OK
+    })
+    return definir_validadores(response, pedido.etag, pedido.ultima_modificacao), HTTP_200_OK
 
 
 @pedidos_bp.put('/<string:tipo>/<int:numero>')
 @pedidos_bp.patch('/<string:tipo>/<int:numero>')
 @jwt_required()
+@idempotente
 def update(tipo: str, numero: int) -> (Response, int):
     """
     Atualiza um pedido existente no banco de dados, cujo 'tipo' e 'numero' é o informado na URI.
     Método da Requisição: PUT, PATCH.
     Variáveis Obrigatórias (URI): 'tipo', 'numero'.
+    Cabeçalhos (headers) Opcionais: If-Match (ETag da versão do pedido que está sendo alterada) e Idempotency-Key
+    (chave de idempotência da requisição).
     Variáveis Opcionais (Params): 'data_chegada', 'secretaria_solicitante', 'projeto', 'descricao',
     'data_envio_financeiro', 'data_retorno_financeiro', 'situacao_autorizacao' e 'observacoes'.
     :param tipo: str
@@ -180,41 +557,43 @@ def update(tipo: str, numero: int) -> (Response, int):
             'error': 'Pedido não cadastrado.',
         }), HTTP_404_NOT_FOUND
 
-    # Atualiza os atributos da entidade na transação atual.
-    pedido.secretaria_solicitante = request.json.get('secretaria_solicitante', pedido.secretaria_solicitante)
-    pedido.projeto = request.json.get('projeto', pedido.projeto)
-    pedido.descricao = request.json.get('descricao', pedido.descricao)
-    pedido.situacao_autorizacao = request.json.get('situacao_autorizacao', pedido.situacao_autorizacao)
-    pedido.observacoes = request.json.get('observacoes', pedido.observacoes)
-
-    data_chegada = request.json.get('data_chegada', None)
-    pedido.data_chegada = datetime.strptime(
-        data_chegada, '%Y-%m-%d').date() if data_chegada else pedido.data_chegada
-
-    data_envio_financeiro = request.json.get('data_envio_financeiro', None)
-    pedido.data_envio_financeiro = datetime.strptime(
-        data_envio_financeiro, '%Y-%m-%d').date() if data_envio_financeiro else pedido.data_envio_financeiro
-
-    data_retorno_financeiro = request.json.get('data_retorno_financeiro', None)
-    pedido.data_retorno_financeiro = datetime.strptime(
-        data_retorno_financeiro, '%Y-%m-%d').date() if data_retorno_financeiro else pedido.data_retorno_financeiro
+    # Caso o cliente tenha informado a versão do pedido que deseja alterar (cabeçalho 'If-Match') e ela não seja a
+    # versão atual, retorna uma resposta JSON com status 412 (Pré-condição Falhou), contendo a mensagem de erro.
+    if precondicao_falhou(pedido.etag):
+        return jsonify({
+            'error': 'O pedido foi alterado por outro usuário.',
+        }), HTTP_412_PRECONDITION_FAILED
 
-    # Efetua o commit da transação atual.
-    db.session.commit()
+    # Atualiza os atributos da entidade na transação atual.
+    atualizar_pedido(pedido, request.json)
+
+    # Efetua o commit da transação atual. Caso o pedido tenha sido alterado por outra transação desde que foi lido,
+    # retorna uma resposta JSON com status 412 (Pré-condição Falhou), contendo a mensagem de erro.
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({
+            'error': 'O pedido foi alterado por outro usuário.',
+        }), HTTP_412_PRECONDITION_FAILED
 
     # Caso a atualização seja bem sucedida, retorna uma resposta JSON com status 200 (OK), contendo o pedido encontrado.
-    return jsonify({
+    response = jsonify({
         'pedido': pedido.to_dict(),
-    }), HTTP_200_OK
+    })
+    return definir_validadores(response, pedido.etag, pedido.ultima_modificacao), HTTP_200_OK
 
 
 @pedidos_bp.delete('/<string:tipo>/<int:numero>')
 @jwt_required()
+@idempotente
 def delete(tipo: str, numero: int) -> (Response, int):
     """
     Exclui um pedido existente no banco de dados, cujo 'tipo' e 'numero' é o informado na URI.
     Método da Requisição: DELETE.
     Variáveis Obrigatórias (URI): 'tipo', 'numero'.
+    Cabeçalhos (headers) Opcionais: If-Match (ETag da versão do pedido que está sendo excluída) e Idempotency-Key
+    (chave de idempotência da requisição).
     :param tipo: str
     :param numero: int
     :return: (Response, int)
@@ -229,11 +608,25 @@ def delete(tipo: str, numero: int) -> (Response, int):
             'error': 'Pedido não cadastrado.',
         }), HTTP_404_NOT_FOUND
 
+    # Caso o cliente tenha informado a versão do pedido que deseja alterar (cabeçalho 'If-Match') e ela não seja a
+    # versão atual, retorna uma resposta JSON com status 412 (Pré-condição Falhou), contendo a mensagem de erro.
+    if precondicao_falhou(pedido.etag):
+        return jsonify({
+            'error': 'O pedido foi alterado por outro usuário.',
+        }), HTTP_412_PRECONDITION_FAILED
+
     # Exclui o pedido na transação atual.
     db.session.delete(pedido)
 
-    # Efetua o commit da transação atual.
-    db.session.commit()
+    # Efetua o commit da transação atual. Caso o pedido tenha sido alterado por outra transação desde que foi lido,
+    # retorna uma resposta JSON com status 412 (Pré-condição Falhou), contendo a mensagem de erro.
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({
+            'error': 'O pedido foi alterado por outro usuário.',
+        }), HTTP_412_PRECONDITION_FAILED
 
     # Caso a exclusão seja bem sucedida, retorna uma resposta JSON com status 204 (Sem Conteúdo).
     return jsonify({}), HTTP_204_NO_CONTENT
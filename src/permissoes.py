@@ -0,0 +1,218 @@
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, jsonify, request, Response
+from flask_jwt_extended import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.constants.http_status_codes import HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
+from src.database import Usuario
+
+# Rotas em que são aceitos os tokens de acesso de cada escopo (claim 'escopo'). Os tokens sem escopo (gerados no login)
+# são aceitos em todas as rotas.
+ESCOPOS = {
+    'alteracoes': ('pedidos.changes',),
+}
+
+
+class UsuarioAutenticado:
+    """ Dados do usuário autenticado, desvinculados da sessão do banco de dados, que podem ser mantidos em cache e
+    compartilhados entre requisições. """
+
+    __slots__ = ('id', 'nome', 'email', 'admin')
+
+    def __init__(self, usuario: Usuario):
+        self.id = usuario.id
+        self.nome = usuario.nome
+        self.email = usuario.email
+        self.admin = bool(usuario.admin)
+
+    def to_dict(self) -> dict:
+        """
+        Retorna um dicionário contendo o usuário serializado, no mesmo formato de 'Usuario.to_dict'.
+        :return: dict
+        """
+        return dict(
+            id=self.id,
+            nome=self.nome,
+            email=self.email,
+            admin=self.admin,
+        )
+
+
+class CacheUsuarios:
+    """ Cache em memória (por processo) dos usuários autenticados, indexados pelo id, com tempo de expiração (TTL). """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.itens = {}
+        self.trava = threading.Lock()
+
+    def obter(self, id: int):
+        """
+        Retorna o usuário armazenado com o id informado, ou None caso não exista ou tenha expirado.
+        :param id: int
+        :return: UsuarioAutenticado | None
+        """
+        with self.trava:
+            item = self.itens.get(id, None)
+
+            if item is None or item[1] < time.monotonic():
+                self.itens.pop(id, None)
+                return None
+
+            return item[0]
+
+    def definir(self, usuario: UsuarioAutenticado):
+        """
+        Armazena o usuário informado.
+        :param usuario: UsuarioAutenticado
+        """
+        if self.ttl <= 0:
+            return
+
+        with self.trava:
+            self.itens[usuario.id] = (usuario, time.monotonic() + self.ttl)
+
+    def invalidar(self, ids):
+        """
+        Remove do cache os usuários com os ids informados.
+        :param ids: Iterable[int]
+        """
+        with self.trava:
+            for id in ids:
+                self.itens.pop(id, None)
+
+
+def init_app(app, jwt):
+    """
+    Registra no gerenciador de autenticação a busca do usuário autenticado a partir do token de acesso. O usuário é
+    mantido em cache por 'USUARIOS_CACHE_TTL' segundos, evitando uma consulta ao banco de dados a cada requisição.
+    :param app: Flask
+    :param jwt: JWTManager
+    """
+    app.extensions['usuarios_cache'] = CacheUsuarios(app.config['USUARIOS_CACHE_TTL'])
+
+    @jwt.user_lookup_loader
+    def carregar_usuario(cabecalho: dict, dados: dict):
+        # Busca o usuário no cache e, caso não esteja presente, no banco de dados.
+        cache = current_app.extensions['usuarios_cache']
+        id = dados[current_app.config['JWT_IDENTITY_CLAIM']]
+
+        # Nas rotas assíncronas, o usuário é buscado previamente através do engine assíncrono (ver
+        # 'assincrono.carregar_usuario'), sem bloquear o event loop com uma consulta síncrona.
+        precarregados = g.get('usuarios_precarregados', {})
+        if id in precarregados:
+            return precarregados[id]
+
+        usuario = cache.obter(id)
+        if usuario is None:
+            entidade = Usuario.query.get(id)
+            if entidade is None:
+                return None
+
+            usuario = UsuarioAutenticado(entidade)
+            cache.definir(usuario)
+
+        return usuario
+
+    @jwt.token_verification_loader
+    def verificar_escopo(cabecalho: dict, dados: dict) -> bool:
+        # Os tokens com escopo (exemplo: o token de curta duração das alterações em tempo real) são aceitos apenas nas
+        # rotas do escopo, e não podem ser utilizados para gerar outros tokens.
+        escopo = dados.get('escopo', None)
+        return escopo is None or request.endpoint in ESCOPOS.get(escopo, ())
+
+    @jwt.token_verification_failed_loader
+    def escopo_invalido(cabecalho: dict, dados: dict) -> (Response, int):
+        # Caso o escopo do token não corresponda à rota, retorna uma resposta JSON com status 401 (Não Autorizado).
+        return jsonify({
+            'error': 'Token de acesso inválido para esta rota.',
+        }), HTTP_401_UNAUTHORIZED
+
+    @jwt.user_lookup_error_loader
+    def usuario_nao_encontrado(cabecalho: dict, dados: dict) -> (Response, int):
+        # Caso o usuário do token tenha sido excluído, retorna uma resposta JSON com status 401 (Não Autorizado).
+        return jsonify({
+            'error': 'Usuario não cadastrado.',
+        }), HTTP_401_UNAUTHORIZED
+
+
+def _sem_permissao() -> (Response, int):
+    """
+    Retorna uma resposta JSON com status 403 (Proibido) contendo a mensagem de erro.
+    :return: (Response, int)
+    """
+    return jsonify({
+        'error': 'Você não possui permissão.',
+    }), HTTP_403_FORBIDDEN
+
+
+def admin_required(funcao):
+    """
+    Decorador que permite o acesso à rota apenas aos administradores. Deve ser aplicado após 'jwt_required'.
+    :param funcao: Callable
+    :return: Callable
+    """
+
+    @wraps(funcao)
+    def decorador(*args, **kwargs):
+        if not current_user.admin:
+            return _sem_permissao()
+
+        return funcao(*args, **kwargs)
+
+    return decorador
+
+
+def admin_ou_proprio(funcao):
+    """
+    Decorador que permite o acesso à rota apenas aos administradores ou ao próprio usuário cujo 'id' foi informado na
+    URI. Deve ser aplicado após 'jwt_required'.
+    :param funcao: Callable
+    :return: Callable
+    """
+
+    @wraps(funcao)
+    def decorador(*args, **kwargs):
+        if not current_user.admin and current_user.id != kwargs.get('id'):
+            return _sem_permissao()
+
+        return funcao(*args, **kwargs)
+
+    return decorador
+
+
+@event.listens_for(Session, 'after_flush')
+def _apos_flush(session: Session, contexto):
+    """
+    Após cada flush, registra os ids dos usuários alterados ou excluídos, que serão removidos do cache após o commit.
+    :param session: Session
+    :param contexto: UOWTransaction
+    """
+    for entidade in list(session.dirty) + list(session.deleted):
+        if isinstance(entidade, Usuario):
+            session.info.setdefault('usuarios_alterados', set()).add(entidade.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apos_commit(session: Session):
+    """
+    Após o commit, remove do cache os usuários alterados ou excluídos na transação.
+    :param session: Session
+    """
+    ids = session.info.pop('usuarios_alterados', None)
+
+    if ids and has_app_context():
+        current_app.extensions['usuarios_cache'].invalidar(ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _apos_rollback(session: Session):
+    """
+    Após o rollback, descarta os usuários registrados na transação.
+    :param session: Session
+    """
+    session.info.pop('usuarios_alterados', None)
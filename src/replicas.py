@@ -0,0 +1,199 @@
+import threading
+import time
+from datetime import datetime
+
+from flask import has_app_context, has_request_context, current_app, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import DateTime, Integer, String, column, create_engine, orm, select, table
+from sqlalchemy.sql.dml import UpdateBase
+
+# Métodos das requisições cujas consultas podem ser executadas nas réplicas.
+METODOS_LEITURA = ('GET', 'HEAD')
+
+# Tabela de versões (ver 'database.py'), utilizada na medição do atraso das réplicas.
+_tabelas_versoes = table('tabelas_versoes', column('tabela', String), column('versao', Integer),
+                         column('atualizado_em', DateTime))
+
+
+class Replica:
+    """ Réplica de leitura do banco de dados, com o atraso medido na última verificação. """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.atraso = None
+        self.erro = None
+
+    @property
+    def disponivel(self) -> bool:
+        return self.atraso is not None
+
+    def to_dict(self) -> dict:
+        """
+        Retorna um dicionário contendo a réplica serializada (sem as credenciais do endereço).
+        :return: dict
+        """
+        return dict(
+            url=self.engine.url.render_as_string(hide_password=True),
+            disponivel=self.disponivel,
+            atraso=round(self.atraso, 3) if self.atraso is not None else None,
+            erro=self.erro,
+        )
+
+
+class Replicas:
+    """ Réplicas de leitura do banco de dados, utilizadas em rodízio (round-robin) pelas requisições de leitura. A
+    cada 'intervalo' segundos, o atraso de cada réplica é medido e as réplicas com atraso superior a 'atraso_maximo'
+    (ou indisponíveis) deixam de ser utilizadas até a próxima verificação. """
+
+    def __init__(self, urls: list, opcoes: dict, atraso_maximo: float, intervalo: float):
+        self.replicas = [Replica(create_engine(url, **opcoes)) for url in urls]
+        self.atraso_maximo = atraso_maximo
+        self.intervalo = intervalo
+        self.verificado_em = None
+        self.indice = 0
+        self.trava = threading.Lock()
+        self.trava_verificacao = threading.Lock()
+
+    def escolher(self, primario):
+        """
+        Retorna o engine da próxima réplica disponível, ou None caso nenhuma réplica esteja disponível.
+        :param primario: Engine
+        :return: Engine | None
+        """
+        if self.verificado_em is None or time.monotonic() - self.verificado_em > self.intervalo:
+            self.verificar(primario, bloquear=self.verificado_em is None)
+
+        disponiveis = [replica for replica in self.replicas if replica.disponivel]
+        if not disponiveis:
+            return None
+
+        with self.trava:
+            self.indice += 1
+            return disponiveis[self.indice % len(disponiveis)].engine
+
+    def verificar(self, primario, bloquear: bool = True):
+        """
+        Mede o atraso de cada réplica em relação ao banco principal, através da tabela de versões: caso a réplica
+        possua as mesmas versões do banco principal, o atraso é zero; caso contrário, o atraso é o tempo decorrido
+        desde a última alteração recebida pela réplica (um limite superior do atraso real). Caso outra thread já
+        esteja verificando as réplicas e 'bloquear' seja False, mantém o resultado da verificação anterior.
+        :param primario: Engine
+        :param bloquear: bool
+        """
+        if not self.trava_verificacao.acquire(blocking=bloquear):
+            return
+
+        try:
+            consulta = select(_tabelas_versoes.c.tabela, _tabelas_versoes.c.versao, _tabelas_versoes.c.atualizado_em)
+
+            # Caso o banco principal esteja indisponível, mantém o resultado da verificação anterior.
+            try:
+                with primario.connect() as conexao:
+                    versoes = {linha.tabela: linha.versao for linha in conexao.execute(consulta)}
+            except Exception:
+                return
+
+            for replica in self.replicas:
+                try:
+                    with replica.engine.connect() as conexao:
+                        linhas = conexao.execute(consulta).all()
+                except Exception as exc:
+                    replica.atraso, replica.erro = None, str(exc).split('\n', 1)[0]
+                    continue
+
+                if all(versoes.get(linha.tabela, None) == linha.versao for linha in linhas):
+                    atraso = 0.0
+                else:
+                    ultima = max((linha.atualizado_em for linha in linhas), default=None)
+                    atraso = (datetime.now() - ultima).total_seconds() if ultima is not None else float('inf')
+
+                replica.erro = None
+                replica.atraso = atraso if atraso <= self.atraso_maximo else None
+                if replica.atraso is None:
+                    replica.erro = 'Atraso de {:.1f}s.'.format(atraso)
+
+            self.verificado_em = time.monotonic()
+        finally:
+            self.trava_verificacao.release()
+
+
+class SessaoRoteada(SignallingSession):
+    """ Sessão do banco de dados que executa as consultas das requisições de leitura (GET e HEAD) em uma das réplicas
+    (a mesma durante toda a sessão). As escritas, as consultas com bloqueio (FOR UPDATE) e todas as consultas
+    posteriores à primeira escrita da sessão são executadas no banco principal, portanto a sessão lê as próprias
+    alterações. As demais requisições e os comandos da CLI utilizam apenas o banco principal. """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primario = super().get_bind(mapper, clause)
+
+        if self.info.get('primario', False):
+            return primario
+
+        # Após a primeira escrita (ou bloqueio), a sessão passa a utilizar o banco principal.
+        if self._flushing or isinstance(clause, UpdateBase) or getattr(clause, '_for_update_arg', None) is not None:
+            self.info['primario'] = True
+            return primario
+
+        replica = self.info.get('replica', None)
+        if replica is None:
+            replica = self.info['replica'] = _escolher_replica(primario)
+
+        return replica or primario
+
+
+def _escolher_replica(primario):
+    """
+    Retorna o engine da réplica utilizada pela sessão atual, ou False caso a sessão deva utilizar o banco principal
+    (fora de uma requisição de leitura, sem réplicas configuradas ou sem réplicas disponíveis).
+    :param primario: Engine
+    :return: Engine | bool
+    """
+    if not has_request_context() or request.method not in METODOS_LEITURA:
+        return False
+
+    replicas = replicas_atuais()
+    if replicas is None:
+        return False
+
+    return replicas.escolher(primario) or False
+
+
+def replicas_atuais():
+    """
+    Retorna as réplicas da aplicação atual, ou None caso nenhuma réplica esteja configurada.
+    :return: Replicas | None
+    """
+    return current_app.extensions.get('replicas', None) if has_app_context() else None
+
+
+def descartar_conexoes(app):
+    """
+    Descarta as conexões dos pools das réplicas (ver 'post_fork' em 'gunicorn.conf.py').
+    :param app: Flask
+    """
+    replicas = app.extensions.get('replicas', None)
+
+    for replica in replicas.replicas if replicas is not None else ():
+        replica.engine.dispose()
+
+
+class BancoDeDados(SQLAlchemy):
+    """ Gerenciador do banco de dados (Flask-SQLAlchemy) cujas sessões utilizam as réplicas de leitura (ver
+    'SessaoRoteada'). """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=SessaoRoteada, db=self, **options)
+
+
+def init_app(app):
+    """
+    Cria as réplicas de leitura configuradas em 'DATABASE_REPLICA_URLS', com as mesmas opções do engine do banco
+    principal.
+    :param app: Flask
+    """
+    urls = app.config['DATABASE_REPLICA_URLS']
+
+    app.extensions['replicas'] = Replicas(
+        urls, app.config['SQLALCHEMY_ENGINE_OPTIONS'], app.config['REPLICAS_ATRASO_MAXIMO'],
+        app.config['REPLICAS_INTERVALO'],
+    ) if urls else None
@@ -0,0 +1,180 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app, jsonify
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from src.constants.http_status_codes import HTTP_503_SERVICE_UNAVAILABLE
+
+# Quantidade de tarefas aguardando na fila do pool, por processo do pool.
+TAREFAS_POR_PROCESSO = 2
+
+
+def _prefixo_metodo(metodo: str) -> str:
+    """
+    Retorna o prefixo dos hashes gerados com o método informado (exemplo: 'pbkdf2:sha256:260000'), sem calcular um
+    hash. No PBKDF2, caso o número de iterações não seja informado, é utilizado o padrão do Werkzeug.
+    :param metodo: str
+    :return: str
+    """
+    partes = metodo.split(':')
+    if partes[0] == 'pbkdf2' and len(partes) == 2:
+        partes.append(str(DEFAULT_PBKDF2_ITERATIONS))
+
+    return ':'.join(partes)
+
+
+class SenhasOcupadas(Exception):
+    """ Exceção lançada quando o pool de processos de senhas permanece ocupado além do tempo máximo de espera. """
+
+
+class ServicoSenhas:
+    """ Serviço de geração e verificação dos hashes das senhas. As funções de derivação de chave (KDF), que consomem
+    CPU propositalmente, são executadas em um pool de processos limitado, sem ocupar as threads que atendem às
+    requisições. Com 'processos' igual a 0, os hashes são calculados na própria thread da requisição. """
+
+    def __init__(self, metodo: str, processos: int, espera_maxima: float):
+        self.metodo = metodo
+        self.processos = processos
+        self.espera_maxima = espera_maxima
+        self.prefixo = _prefixo_metodo(metodo)
+        self.pool = None
+        self.pid = None
+        self.trava = threading.Lock()
+        self.vagas = threading.BoundedSemaphore(max(1, processos * (1 + TAREFAS_POR_PROCESSO)))
+
+    def _obter_pool(self) -> ProcessPoolExecutor:
+        """
+        Retorna o pool de processos, criando-o no primeiro uso de cada processo (os processos do Gunicorn são criados
+        após a inicialização da aplicação, e o pool não pode ser compartilhado entre eles).
+        :return: ProcessPoolExecutor
+        """
+        with self.trava:
+            if self.pool is None or self.pid != os.getpid():
+                # O 'forkserver' cria os processos a partir de um processo auxiliar sem threads, evitando copiar o
+                # estado (travas, conexões) das threads dos processos do Gunicorn.
+                metodos = multiprocessing.get_all_start_methods()
+                contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+                self.pool = ProcessPoolExecutor(max_workers=self.processos, mp_context=contexto)
+                self.pid = os.getpid()
+
+            return self.pool
+
+    def _executar(self, funcao, *args):
+        """
+        Executa a função informada no pool de processos (ou na thread atual, caso o pool esteja desabilitado),
+        aguardando no máximo 'espera_maxima' segundos por uma vaga na fila do pool.
+        :param funcao: Callable
+        :return: Any
+        """
+        if self.processos <= 0:
+            return funcao(*args)
+
+        if not self.vagas.acquire(timeout=self.espera_maxima):
+            raise SenhasOcupadas()
+
+        try:
+            pool = self._obter_pool()
+            try:
+                return pool.submit(funcao, *args).result()
+            except BrokenProcessPool:
+                # Caso um processo do pool tenha sido encerrado (exemplo: falta de memória), o pool é recriado na
+                # próxima chamada e o hash é calculado na thread atual.
+                with self.trava:
+                    if self.pool is pool:
+                        self.pool = None
+                return funcao(*args)
+        finally:
+            self.vagas.release()
+
+    def gerar(self, senha: str) -> str:
+        """
+        Retorna o hash da senha informada, utilizando o método e os parâmetros de custo configurados.
+        :param senha: str
+        :return: str
+        """
+        return self._executar(generate_password_hash, senha, self.metodo)
+
+    def verificar(self, hash_senha: str, senha: str) -> bool:
+        """
+        Verifica se a senha informada corresponde ao hash.
+        :param hash_senha: str
+        :param senha: str
+        :return: bool
+        """
+        return self._executar(check_password_hash, hash_senha, senha)
+
+    def precisa_atualizar(self, hash_senha: str) -> bool:
+        """
+        Verifica se o hash informado foi gerado com um método ou parâmetros de custo diferentes dos configurados,
+        comparando o seu prefixo com o prefixo do método configurado (ver '_prefixo_metodo'), sem calcular um hash.
+        :param hash_senha: str
+        :return: bool
+        """
+        return hash_senha.split('$', 1)[0] != self.prefixo
+
+
+def _servico() -> ServicoSenhas:
+    """
+    Retorna o serviço de senhas da aplicação atual.
+    :return: ServicoSenhas
+    """
+    return current_app.extensions['senhas']
+
+
+def gerar_hash(senha: str) -> str:
+    """
+    Retorna o hash da senha informada (ver 'ServicoSenhas.gerar').
+    :param senha: str
+    :return: str
+    """
+    return _servico().gerar(senha)
+
+
+def verificar_senha(hash_senha: str, senha: str) -> bool:
+    """
+    Verifica se a senha informada corresponde ao hash (ver 'ServicoSenhas.verificar').
+    :param hash_senha: str
+    :param senha: str
+    :return: bool
+    """
+    return _servico().verificar(hash_senha, senha)
+
+
+def precisa_atualizar(hash_senha: str) -> bool:
+    """
+    Verifica se o hash informado deve ser gerado novamente (ver 'ServicoSenhas.precisa_atualizar').
+    :param hash_senha: str
+    :return: bool
+    """
+    return _servico().precisa_atualizar(hash_senha)
+
+
+def _senhas_ocupadas(erro: SenhasOcupadas):
+    """
+    Retorna uma resposta JSON com status 503 (Serviço Indisponível) quando o pool de processos de senhas está
+    sobrecarregado, indicando ao cliente que tente novamente em seguida.
+    :param erro: SenhasOcupadas
+    :return: (Response, int, dict)
+    """
+    return jsonify({
+        'error': 'Serviço temporariamente indisponível, tente novamente.',
+    }), HTTP_503_SERVICE_UNAVAILABLE, {'Retry-After': '1'}
+
+
+def init_app(app):
+    """
+    Inicializa o serviço de senhas: método de hash e parâmetros de custo 'SENHAS_METODO', quantidade de processos do
+    pool 'SENHAS_PROCESSOS' e tempo máximo de espera por uma vaga no pool 'SENHAS_ESPERA_MAXIMA' (em segundos).
+    :param app: Flask
+    """
+    app.extensions['senhas'] = ServicoSenhas(
+        app.config['SENHAS_METODO'],
+        app.config['SENHAS_PROCESSOS'],
+        app.config['SENHAS_ESPERA_MAXIMA'],
+    )
+
+    app.register_error_handler(SenhasOcupadas, _senhas_ocupadas)
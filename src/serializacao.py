@@ -0,0 +1,128 @@
+import json
+from datetime import date
+
+from flask import Response
+
+from src.instrumentacao import cronometro
+
+# Biblioteca opcional de serialização JSON (orjson), consideravelmente mais rápida que a biblioteca padrão. Caso não
+# esteja instalada, é utilizada a biblioteca padrão.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Colunas do pedido serializadas, na mesma ordem do método 'Pedido.to_dict'.
+CAMPOS_PEDIDO = ('id', 'numero', 'tipo', 'data_chegada', 'secretaria_solicitante', 'projeto', 'descricao',
+                 'data_envio_financeiro', 'data_retorno_financeiro', 'situacao_autorizacao', 'observacoes')
+
+# Colunas do pedido que armazenam datas, as quais são serializadas no formato 'YYYY-MM-DD'.
+CAMPOS_DATA = ('data_chegada', 'data_envio_financeiro', 'data_retorno_financeiro')
+
+
+def _padrao(valor):
+    """
+    Serializa os valores que não são suportados nativamente pelo JSON (datas).
+    :param valor: Any
+    :return: str
+    """
+    if isinstance(valor, date):
+        return valor.isoformat()
+
+    raise TypeError('Objeto do tipo {} não é serializável em JSON.'.format(type(valor).__name__))
+
+
+def dumps(dados) -> bytes:
+    """
+    Serializa os dados informados em JSON, utilizando a biblioteca orjson caso esteja instalada.
+    :param dados: Any
+    :return: bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(dados, default=_padrao)
+
+    return json.dumps(dados, default=_padrao, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def resposta_json(dados) -> Response:
+    """
+    Retorna uma resposta JSON contendo os dados informados, serializados através de 'dumps'.
+    :param dados: Any
+    :return: Response
+    """
+    with cronometro('serializacao'):
+        corpo = dumps(dados)
+
+    return Response(corpo, mimetype='application/json')
+
+
+def extrair_campos(valor: str = None) -> tuple:
+    """
+    Retorna os campos do pedido solicitados no parâmetro 'fields' (separados por vírgula). Caso o parâmetro não seja
+    informado, retorna todos os campos. Dispara um ValueError caso algum campo seja inválido.
+    :param valor: str
+    :return: tuple
+    """
+    if not valor:
+        return CAMPOS_PEDIDO
+
+    campos = tuple(campo.strip() for campo in valor.split(',') if campo.strip())
+    invalidos = [campo for campo in campos if campo not in CAMPOS_PEDIDO]
+    if invalidos or not campos:
+        raise ValueError('Campos inválidos: {}.'.format(', '.join(invalidos)))
+
+    return campos
+
+
+def serializador_pedidos(campos: tuple):
+    """
+    Retorna uma função que serializa uma linha de uma consulta de colunas (ao invés de uma entidade) em um
+    dicionário contendo os campos informados. As primeiras colunas da linha devem corresponder aos campos, na mesma
+    ordem. As conversões necessárias são definidas uma única vez, evitando verificações a cada linha.
+    :param campos: tuple
+    :return: Callable[[Row], dict]
+    """
+    datas = [indice for indice, campo in enumerate(campos) if campo in CAMPOS_DATA]
+
+    # Caso não haja datas, os valores da linha são utilizados diretamente.
+    if not datas:
+        return lambda linha: dict(zip(campos, linha))
+
+    def serializar(linha) -> dict:
+        valores = list(linha[:len(campos)])
+        for indice in datas:
+            if valores[indice] is not None:
+                valores[indice] = valores[indice].isoformat()
+        return dict(zip(campos, valores))
+
+    return serializar
+
+
+def init_app(app):
+    """
+    Configura a serialização JSON da aplicação Flask para utilizar a biblioteca orjson, caso esteja instalada e caso a
+    versão do Flask permita a substituição do provedor JSON (Flask 2.2 ou superior).
+    :param app: Flask
+    """
+    if orjson is None:
+        return
+
+    try:
+        from flask.json.provider import DefaultJSONProvider
+    except ImportError:
+        return
+
+    class ProvedorOrjson(DefaultJSONProvider):
+        """ Provedor JSON que utiliza a biblioteca orjson na serialização das respostas. """
+
+        def dumps(self, obj, **kwargs) -> str:
+            # Caso sejam informadas opções de serialização, ou o objeto possua algum tipo não suportado pelo orjson,
+            # utiliza o provedor padrão do Flask.
+            if kwargs:
+                return super().dumps(obj, **kwargs)
+            try:
+                return dumps(obj).decode()
+            except TypeError:
+                return super().dumps(obj)
+
+    app.json = ProvedorOrjson(app)
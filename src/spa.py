@@ -1,20 +1,251 @@
-from flask import Blueprint, render_template
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import random
+import re
+import sys
+from functools import lru_cache
+from logging.handlers import MemoryHandler
+
+from flask import Blueprint, current_app, jsonify, request, Response, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+from src.constants.http_status_codes import HTTP_404_NOT_FOUND, HTTP_405_METHOD_NOT_ALLOWED
+
+# Biblioteca opcional de compressão Brotli, utilizada apenas na geração dos arquivos pré-comprimidos ('.br').
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # Criação do Blueprint das rotas da SPA (Single Page Application).
 spa_bp = Blueprint('spa', __name__)
 
+# Arquivos cujo nome contém o hash do seu conteúdo (gerado pelo compilador do Vue, exemplo: 'app.28470ebd.js'). Como o
+# nome muda a cada alteração do conteúdo, esses arquivos podem ser mantidos em cache pelos navegadores indefinidamente.
+PADRAO_HASH = re.compile(r'\.[0-9a-f]{8,}\.[a-z0-9]+$')
+
+# Codificações dos arquivos pré-comprimidos, na ordem de preferência, e as respectivas extensões.
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+# Extensões dos arquivos estáticos que são pré-comprimidos (os demais formatos, como imagens e fontes WOFF, já são
+# comprimidos).
+EXTENSOES_COMPRIMIVEIS = ('.html', '.js', '.css', '.map', '.json', '.svg', '.txt', '.ico', '.ttf', '.eot')
+
+# Tempo (em segundos) em que os arquivos com hash são mantidos em cache (um ano).
+CACHE_IMUTAVEL = 365 * 24 * 60 * 60
+
+# Logger das rotas acessadas na SPA. As linhas são acumuladas em memória e gravadas em lotes, sem bloquear cada
+# requisição com uma escrita no console.
+logger = logging.getLogger('src.spa')
+logger.setLevel(logging.INFO)
+logger.propagate = False
+logger.addHandler(MemoryHandler(200, flushLevel=logging.ERROR, target=logging.StreamHandler(sys.stderr)))
+
+# Página da SPA (index.html) mantida em memória, com as suas versões comprimidas.
+_indice = {}
+
+
+def comprimir_arquivos(diretorios) -> int:
+    """
+    Gera as versões pré-comprimidas (gzip e, caso a biblioteca brotli esteja instalada, Brotli) dos arquivos estáticos
+    contidos nos diretórios informados. Os arquivos comprimidos que estão atualizados são mantidos. Retorna a
+    quantidade de arquivos gerados.
+    :param diretorios: Iterable[str]
+    :return: int
+    """
+    gerados = 0
+
+    for diretorio in diretorios:
+        for raiz, _, arquivos in os.walk(diretorio):
+            for nome in arquivos:
+                if not nome.endswith(EXTENSOES_COMPRIMIVEIS):
+                    continue
+
+                caminho = os.path.join(raiz, nome)
+                with open(caminho, 'rb') as arquivo:
+                    conteudo = arquivo.read()
+
+                variantes = {'.gz': lambda: gzip.compress(conteudo, 9, mtime=0)}
+                if brotli is not None:
+                    variantes['.br'] = lambda: brotli.compress(conteudo, quality=11)
+
+                for extensao, comprimir in variantes.items():
+                    destino = caminho + extensao
+                    if os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(caminho):
+                        continue
+
+                    # Mantém apenas as versões comprimidas que são menores que o arquivo original.
+                    comprimido = comprimir()
+                    if len(comprimido) >= len(conteudo):
+                        continue
+
+                    with open(destino, 'wb') as arquivo:
+                        arquivo.write(comprimido)
+                    gerados += 1
+
+    return gerados
+
+
+@lru_cache(maxsize=4096)
+def _variantes(caminho: str) -> tuple:
+    """
+    Retorna as codificações dos arquivos pré-comprimidos existentes para o arquivo informado. O resultado é mantido
+    em cache, evitando acessos ao sistema de arquivos a cada requisição.
+    :param caminho: str
+    :return: tuple
+    """
+    return tuple((codificacao, extensao) for codificacao, extensao in CODIFICACOES
+                 if os.path.isfile(caminho + extensao))
+
+
+def _codificacao_aceita(codificacoes) -> tuple:
+    """
+    Retorna a primeira codificação (e a sua extensão) aceita pelo cliente no cabeçalho Accept-Encoding, ou
+    (None, '') caso nenhuma seja aceita.
+    :param codificacoes: Iterable[tuple]
+    :return: tuple
+    """
+    for codificacao, extensao in codificacoes:
+        if request.accept_encodings[codificacao]:
+            return codificacao, extensao
+
+    return None, ''
+
+
+def _carregar_indice(state):
+    """
+    Carrega em memória a página da SPA (index.html) e as suas versões comprimidas, ao registrar o Blueprint.
+    :param state: BlueprintSetupState
+    """
+    app = state.app
+    caminho = os.path.join(app.root_path, app.template_folder, 'vue', 'index.html')
+
+    try:
+        with open(caminho, 'rb') as arquivo:
+            corpo = arquivo.read()
+    except OSError:
+        corpo = b''
+
+    _indice.update({
+        None: corpo,
+        'gzip': gzip.compress(corpo, 9, mtime=0),
+        'etag': hashlib.sha1(corpo).hexdigest(),
+    })
+    if brotli is not None:
+        _indice['br'] = brotli.compress(corpo, quality=11)
+
+
+spa_bp.record_once(_carregar_indice)
+
+
+def _registrar_acesso(path: str):
+    """
+    Registra no log o caminho acessado, para uma fração 'SPA_LOG_AMOSTRAGEM' das requisições.
+    :param path: str
+    """
+    if random.random() < current_app.config['SPA_LOG_AMOSTRAGEM']:
+        logger.info('Path: %s', path)
+
+
+def _erro_api(mensagem: str, status: int):
+    """
+    Retorna uma resposta JSON de erro para as rotas da API, ou None para as demais rotas (mantendo a página de erro
+    padrão).
+    :param mensagem: str
+    :param status: int
+    :return: (Response, int) | None
+    """
+    if request.path != '/api' and not request.path.startswith('/api/'):
+        return None
+
+    return jsonify({
+        'error': mensagem,
+    }), status
+
+
+@spa_bp.app_errorhandler(404)
+def nao_encontrado(erro):
+    return _erro_api('Rota não encontrada.', HTTP_404_NOT_FOUND) or erro
+
+
+@spa_bp.app_errorhandler(405)
+def metodo_nao_permitido(erro):
+    return _erro_api('Método não permitido.', HTTP_405_METHOD_NOT_ALLOWED) or erro
+
+
+@spa_bp.get('/static/<path:arquivo>')
+def static(arquivo: str) -> Response:
+    """
+    Envia um arquivo estático. Caso o cliente aceite, é enviada a versão pré-comprimida do arquivo (Brotli ou gzip),
+    gerada pelo comando 'flask compress_static'. Os arquivos cujo nome contém o hash do conteúdo são enviados com
+    cache imutável; os demais devem ser revalidados pelo navegador a cada uso.
+    Método da Requisição: GET.
+    :param arquivo: str
+    :return: Response
+    """
+    caminho = safe_join(os.path.join(current_app.root_path, 'static'), arquivo)
+    if caminho is None or not os.path.isfile(caminho):
+        raise NotFound()
+
+    codificacao, extensao = _codificacao_aceita(_variantes(caminho))
+    imutavel = PADRAO_HASH.search(arquivo) is not None
+
+    response = send_file(caminho + extensao, mimetype=mimetypes.guess_type(caminho)[0] or 'application/octet-stream',
+                         conditional=True, max_age=CACHE_IMUTAVEL if imutavel else 0)
+
+    if codificacao is not None:
+        response.headers['Content-Encoding'] = codificacao
+    if _variantes(caminho):
+        response.vary.add('Accept-Encoding')
+
+    if imutavel:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+
+    return response
+
+
+@spa_bp.get('/favicon.ico')
+def favicon() -> Response:
+    """
+    Envia o ícone da aplicação.
+    Método da Requisição: GET.
+    :return: Response
+    """
+    return send_file(os.path.join(current_app.root_path, current_app.template_folder, 'vue', 'favicon.ico'),
+                     max_age=24 * 60 * 60)
+
 
 @spa_bp.route('/', defaults={'path': ''})
 @spa_bp.route('/<path:path>')
-def spa(path) -> str:
+def spa(path) -> Response:
     """
-    Renderiza a SPA.
+    Retorna a página da SPA, mantida em memória (e comprimida, caso o cliente aceite). Os caminhos da API que não
+    correspondem a nenhuma rota retornam uma resposta JSON com status 404 (Não Encontrado).
     :param path:
-    :return: str
+    :return: Response
     """
 
-    # Efetua o log no console, das rotas acessadas
-    print("Path: {}".format(path))
+    # Caso o caminho pertença à API, retorna uma resposta JSON com status 404 (Não Encontrado), através de
+    # 'nao_encontrado'.
+    if path == 'api' or path.startswith('api/'):
+        raise NotFound()
+
+    # Efetua o log (por amostragem) das rotas acessadas.
+    _registrar_acesso(path)
+
+    # Retorna a página da SPA, que deve ser revalidada pelo navegador a cada acesso (através do ETag).
+    codificacao, _ = _codificacao_aceita(codificacao for codificacao in CODIFICACOES if codificacao[0] in _indice)
+    response = Response(_indice[codificacao], mimetype='text/html')
+    response.set_etag(_indice['etag'] + ('-' + codificacao if codificacao else ''))
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True
+    if codificacao is not None:
+        response.headers['Content-Encoding'] = codificacao
 
-    # Renderiza a página da SPA.
-    return render_template("vue/index.html")
+    return response.make_conditional(request)
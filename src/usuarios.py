@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify, Response
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash
+from flask_jwt_extended import jwt_required
 
 from src.constants.http_status_codes import (HTTP_409_CONFLICT, HTTP_201_CREATED, HTTP_200_OK, HTTP_404_NOT_FOUND,
-                                             HTTP_204_NO_CONTENT, HTTP_403_FORBIDDEN)
+                                             HTTP_204_NO_CONTENT)
 from src.database import Usuario, db
+from src.idempotencia import idempotente
+from src.permissoes import admin_required, admin_ou_proprio
+from src.senhas import gerar_hash
 
 # Criação do Blueprint das rotas de gerenciamento de usuários.
 usuarios_bp = Blueprint('usuarios', __name__, url_prefix='/api/usuarios')
@@ -12,24 +14,18 @@ usuarios_bp = Blueprint('usuarios', __name__, url_prefix='/api/usuarios')
 
 @usuarios_bp.post('')
 @jwt_required()
+@admin_required
+@idempotente
 def create() -> (Response, int):
     """
     Cria um novo usuário.
     Método da Requisição: POST.
+    Cabeçalhos (headers) Opcionais: Idempotency-Key (chave de idempotência da requisição).
     Variáveis Obrigatórias (JSON): 'nome', 'email' e 'senha'.
     Variáveis Opcionais (JSON): 'admin'.
     :return: (Response, int)
     """
 
-    # Busca o requisitante e verifica se ele é um administrador. Caso não seja, retorna uma resposta JSON com status
-    # 403 (Proibido) contendo a mensagem de erro.
-    sender_id = get_jwt_identity()
-    sender = Usuario.query.get(sender_id)
-    if not sender or not sender.admin:
-        return jsonify({
-            'error': 'Você não possui permissão.',
-        }), HTTP_403_FORBIDDEN
-
     # Busca as variáveis obrigatórias e opcionais no corpo da requisição.
     nome = request.json.get('nome', None)
     email = request.json.get('email', None)
@@ -47,7 +43,7 @@ def create() -> (Response, int):
     usuario = Usuario(
         nome=nome,
         email=email,
-        senha=generate_password_hash(senha),
+        senha=gerar_hash(senha),
         admin=admin,
     )
 
@@ -65,6 +61,7 @@ def create() -> (Response, int):
 
 @usuarios_bp.get('')
 @jwt_required()
+@admin_required
 def read_all() -> (Response, int):
     """
     Busca todos os usuários contidos no banco de dados. É possível filtrar os usuários informando os atributos e
@@ -74,15 +71,6 @@ def read_all() -> (Response, int):
     :return: (Response, int)
     """
 
-    # Busca o requisitante e verifica se ele é um administrador. Caso não seja, retorna uma resposta JSON com status
-    # 403 (Proibido) contendo a mensagem de erro.
-    sender_id = get_jwt_identity()
-    sender = Usuario.query.get(sender_id)
-    if not sender or not sender.admin:
-        return jsonify({
-            'error': 'Você não possui permissão.',
-        }), HTTP_403_FORBIDDEN
-
     # Busca as variáveis opcionais nos parâmetros da requisição, e a transforma em um dicionário.
     query = request.args.to_dict()
 
@@ -112,6 +100,7 @@ def read_all() -> (Response, int):
 
 @usuarios_bp.get('/<int:id>')
 @jwt_required()
+@admin_ou_proprio
 def read_one(id: int) -> (Response, int):
     """
     Busca um usuário existente no banco de dados, com o respectivo 'id' informado.
@@ -121,15 +110,6 @@ def read_one(id: int) -> (Response, int):
     :return: (Response, int)
     """
 
-    # Busca o requisitante e verifica se ele é um administrador ou se ele está requisitando seu próprio id. Caso não
-    # seja, retorna uma resposta JSON com status 403 (Proibido) contendo a mensagem de erro.
-    sender_id = get_jwt_identity()
-    sender = Usuario.query.get(sender_id)
-    if (not sender or not sender.admin) and (sender_id != id):
-        return jsonify({
-            'error': 'Você não possui permissão.',
-        }), HTTP_403_FORBIDDEN
-
     # Busca um usuário no banco de dados com o id informado na URI.
     usuario = Usuario.query.get(id)
 
@@ -148,25 +128,19 @@ def read_one(id: int) -> (Response, int):
 @usuarios_bp.put('/<int:id>')
 @usuarios_bp.patch('/<int:id>')
 @jwt_required()
+@admin_ou_proprio
+@idempotente
 def update(id: int) -> (Response, int):
     """
     Atualiza um usuário existente no banco de dados, cujo 'id' é o informado na URI.
     Método da Requisição: PUT, PATCH.
+    Cabeçalhos (headers) Opcionais: Idempotency-Key (chave de idempotência da requisição).
     Variáveis Obrigatórias (URI): 'id'.
     Variáveis Opcionais (Params): 'nome', 'email', 'senha', 'admin'.
     :param id: int
     :return: (Response, int)
     """
 
-    # Busca o requisitante e verifica se ele é um administrador ou se ele está requisitando seu próprio id. Caso não
-    # seja, retorna uma resposta JSON com status 403 (Proibido) contendo a mensagem de erro.
-    sender_id = get_jwt_identity()
-    sender = Usuario.query.get(sender_id)
-    if (not sender or not sender.admin) and (sender_id != id):
-        return jsonify({
-            'error': 'Você não possui permissão.',
-        }), HTTP_403_FORBIDDEN
-
     # Busca um usuário no banco de dados com o id informado na URI.
     usuario = Usuario.query.get(id)
 
@@ -179,9 +153,12 @@ def update(id: int) -> (Response, int):
     # Atualiza os atributos da entidade na transação atual.
     usuario.nome = request.json.get('nome', usuario.nome)
     usuario.email = request.json.get('email', usuario.email)
-    usuario.senha = generate_password_hash(request.json.get('senha', usuario.senha))
     usuario.admin = request.json.get('admin', usuario.admin)
 
+    # Gera o hash da senha apenas caso uma nova senha tenha sido informada.
+    if request.json.get('senha', None) is not None:
+        usuario.senha = gerar_hash(request.json['senha'])
+
     # Efetua o commit da transação atual.
     db.session.commit()
 
@@ -194,24 +171,18 @@ def update(id: int) -> (Response, int):
 
 @usuarios_bp.delete('/<int:id>')
 @jwt_required()
+@admin_ou_proprio
+@idempotente
 def delete(id: int) -> (Response, int):
     """
     Exclui um usuário existente no banco de dados, cujo 'id' é o informado na URI.
     Método da Requisição: DELETE.
+    Cabeçalhos (headers) Opcionais: Idempotency-Key (chave de idempotência da requisição).
     Variáveis Obrigatórias (URI): 'id'.
     :param id: int
     :return: (Response, int)
     """
 
-    # Busca o requisitante e verifica se ele é um administrador ou se ele está requisitando seu próprio id. Caso não
-    # seja, retorna uma resposta JSON com status 403 (Proibido) contendo a mensagem de erro.
-    sender_id = get_jwt_identity()
-    sender = Usuario.query.get(sender_id)
-    if (not sender or not sender.admin) and (sender_id != id):
-        return jsonify({
-            'error': 'Você não possui permissão.',
-        }), HTTP_403_FORBIDDEN
-
     # Busca um usuário no banco de dados com o id informado na URI.
     usuario = Usuario.query.get(id)
 
@@ -0,0 +1,101 @@
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.database import Pedido, TabelaVersao, db
+
+# Entidades cujas alterações incrementam a versão de sua tabela.
+ENTIDADES_VERSIONADAS = {
+    Pedido: 'pedidos',
+}
+
+# Funções executadas após o commit de uma transação que alterou uma tabela versionada, indexadas pelo nome da tabela.
+_callbacks = {}
+
+
+def ao_alterar(tabela: str):
+    """
+    Decorador que registra uma função (sem parâmetros) a ser executada após o commit de cada transação que alterou a
+    tabela informada.
+    :param tabela: str
+    :return: Callable
+    """
+
+    def decorador(funcao):
+        _callbacks.setdefault(tabela, []).append(funcao)
+        return funcao
+
+    return decorador
+
+
+def registrar_alteracao(session: Session, tabela: str):
+    """
+    Incrementa a versão da tabela informada na transação atual da sessão, e agenda a execução das funções
+    registradas em 'ao_alterar' para após o commit. Deve ser chamada pelas operações que alteram a tabela sem
+    utilizar as entidades (exemplo: inserções em lote).
+    :param session: Session
+    :param tabela: str
+    """
+    conexao = session.connection()
+    conexao.execute(
+        TabelaVersao.__table__.update()
+        .where(TabelaVersao.__table__.c.tabela == tabela)
+        .values(versao=TabelaVersao.__table__.c.versao + 1, atualizado_em=datetime.now())
+    )
+    session.info.setdefault('tabelas_alteradas', set()).add(tabela)
+
+
+def versao_tabela(tabela: str) -> TabelaVersao:
+    """
+    Retorna a versão atual da tabela informada.
+    :param tabela: str
+    :return: TabelaVersao
+    """
+    return db.session.get(TabelaVersao, tabela)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apos_flush(session: Session, contexto):
+    """
+    Após cada flush, incrementa a versão das tabelas cujas entidades foram criadas, alteradas ou excluídas.
+    :param session: Session
+    :param contexto: UOWTransaction
+    """
+    tabelas = set()
+
+    for entidade in chain(session.new, session.dirty, session.deleted):
+        tabela = ENTIDADES_VERSIONADAS.get(type(entidade), None)
+        if tabela is None or tabela in tabelas:
+            continue
+
+        if entidade in session.dirty and not session.is_modified(entidade):
+            continue
+
+        tabelas.add(tabela)
+
+    for tabela in tabelas:
+        registrar_alteracao(session, tabela)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apos_commit(session: Session):
+    """
+    Após o commit, executa as funções registradas para as tabelas que foram alteradas na transação.
+    :param session: Session
+    """
+    tabelas = session.info.pop('tabelas_alteradas', set())
+
+    for tabela in tabelas:
+        for funcao in _callbacks.get(tabela, []):
+            funcao()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _apos_rollback(session: Session):
+    """
+    Após o rollback, descarta as alterações registradas na transação.
+    :param session: Session
+    """
+    session.info.pop('tabelas_alteradas', None)
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from src import create_app
+from src.database import db
+
+PEDIDO = {
+    'numero': 1,
+    'tipo': 'SE',
+    'data_chegada': '2021-03-01',
+    'secretaria_solicitante': 'SAUDE',
+    'projeto': 'Projeto',
+    'descricao': 'Notebook',
+}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    Cria a aplicação com um banco de dados vazio: o banco de dados informado em 'TESTES_DATABASE_URL' (exemplo: um
+    banco de dados PostgreSQL, cujas tabelas são recriadas a cada teste) ou, caso não seja informado, um banco de
+    dados SQLite temporário.
+    """
+    database_url = os.environ.get('TESTES_DATABASE_URL', 'sqlite:///' + str(tmp_path / 'teste.db'))
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    monkeypatch.setenv('SECRET_KEY', 'teste')
+    monkeypatch.setenv('JWT_SECRET_KEY', 'teste')
+    monkeypatch.setenv('SENHAS_PROCESSOS', '0')
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+    assert app.test_cli_runner().invoke(args=['init_database']).exit_code == 0
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def tempo_maximo(monkeypatch):
+    """
+    Limita o tempo das consultas no PostgreSQL, para que uma consulta bloqueada falhe em vez de aguardar. Deve ser
+    informada antes da aplicação.
+    """
+    monkeypatch.setenv('DB_STATEMENT_TIMEOUT', '2000')
+
+
+@pytest.fixture
+def cliente(app):
+    """
+    Retorna o cliente de testes da aplicação, autenticado com o usuário administrador.
+    """
+    cliente = app.test_client()
+    token = cliente.post('/api/auth/login', json={'email': 'admin@admin.dev', 'senha': 'admin'}).get_json()
+    cliente.environ_base['HTTP_AUTHORIZATION'] = 'Bearer ' + token['access_token']
+
+    return cliente
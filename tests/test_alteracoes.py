@@ -0,0 +1,48 @@
+import pytest
+
+from tests.conftest import PEDIDO
+
+
+@pytest.fixture
+def uma_conexao(monkeypatch):
+    """
+    Limita as alterações em tempo real a uma conexão simultânea por processo. Deve ser informada antes da aplicação.
+    """
+    monkeypatch.setenv('ALTERACOES_CONEXOES_MAXIMAS', '1')
+
+
+def test_conexoes_acima_do_limite_sao_recusadas(uma_conexao, cliente):
+    """
+    Acima do limite de conexões simultâneas, a conexão é recusada com status 503 e o cabeçalho 'Retry-After', e a
+    reserva é liberada ao encerrar a conexão aberta.
+    """
+    cabecalhos = {'Accept': 'text/event-stream'}
+
+    aberta = cliente.get('/api/pedidos/changes', headers=cabecalhos, buffered=False)
+    assert aberta.status_code == 200
+
+    recusada = cliente.get('/api/pedidos/changes', headers=cabecalhos)
+    assert recusada.status_code == 503
+    assert recusada.headers['Retry-After'] == '15'
+
+    # As demais rotas continuam disponíveis.
+    assert cliente.get('/api/pedidos/changes').status_code == 200
+
+    aberta.close()
+    nova = cliente.get('/api/pedidos/changes', headers=cabecalhos, buffered=False)
+    assert nova.status_code == 200
+    nova.close()
+
+
+def test_alteracoes_desde_a_versao_informada(cliente):
+    """
+    A busca das alterações retorna o estado atual de cada pedido alterado após a versão informada (no PostgreSQL, o
+    tipo do log é comparado com o enum 'tipos' do pedido).
+    """
+    versao = cliente.get('/api/pedidos/changes').get_json()['versao']
+    assert cliente.post('/api/pedidos', json=PEDIDO).status_code == 201
+
+    response = cliente.get('/api/pedidos/changes?since={}'.format(versao))
+    assert response.status_code == 200
+    assert [(alteracao['operacao'], alteracao['pedido']['descricao'])
+            for alteracao in response.get_json()['alteracoes']] == [('criado', 'Notebook')]
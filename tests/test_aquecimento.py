@@ -0,0 +1,12 @@
+from src.aquecimento import aquecer
+
+
+def test_aquecimento_executa_consultas(app):
+    """
+    O aquecimento executa as consultas das rotas mais utilizadas sem erros (no PostgreSQL, a chave consultada deve
+    possuir um tipo válido do enum 'tipos'), e a aplicação continua utilizável após o aquecimento.
+    """
+    aquecer(app)
+
+    cliente = app.test_client()
+    assert cliente.post('/api/auth/login', json={'email': 'admin@admin.dev', 'senha': 'admin'}).status_code == 200
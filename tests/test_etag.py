@@ -0,0 +1,45 @@
+from tests.conftest import PEDIDO
+
+
+def test_pedido_cadastrado_novamente_nao_repete_etag(cliente):
+    """
+    Um pedido excluído e cadastrado novamente com o mesmo tipo e número (e portanto com a mesma versão) não pode
+    repetir o ETag do pedido anterior, que ainda pode estar no cache dos clientes.
+    """
+    anterior = cliente.post('/api/pedidos', json=PEDIDO).headers['ETag']
+    assert cliente.get('/api/pedidos/SE/1', headers={'If-None-Match': anterior}).status_code == 304
+
+    assert cliente.delete('/api/pedidos/SE/1').status_code == 204
+    atual = cliente.post('/api/pedidos', json=dict(PEDIDO, descricao='Impressora')).headers['ETag']
+    assert atual != anterior
+
+    response = cliente.get('/api/pedidos/SE/1', headers={'If-None-Match': anterior})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == atual
+    assert response.get_json()['pedido']['descricao'] == 'Impressora'
+
+    response = cliente.put('/api/pedidos/SE/1', json=dict(PEDIDO, descricao='Monitor'), headers={'If-Match': anterior})
+    assert response.status_code == 412
+
+
+def test_resposta_comprimida_possui_etag_da_codificacao(cliente):
+    """
+    A resposta comprimida é uma representação diferente do recurso, portanto o seu ETag recebe o sufixo da
+    codificação, o qual é desconsiderado na validação das requisições condicionais.
+    """
+    for numero in range(1, 31):
+        assert cliente.post('/api/pedidos', json=dict(PEDIDO, numero=numero)).status_code == 201
+
+    original = cliente.get('/api/pedidos').headers['ETag']
+    response = cliente.get('/api/pedidos', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] == original[:-1] + '-gzip"'
+
+    comprimido = response.headers['ETag']
+    assert cliente.get('/api/pedidos', headers={'If-None-Match': comprimido}).status_code == 304
+    assert cliente.get('/api/pedidos', headers={'If-None-Match': original}).status_code == 304
+
+    pedido = cliente.get('/api/pedidos/SE/1').headers['ETag']
+    response = cliente.put('/api/pedidos/SE/1', json=dict(PEDIDO, descricao='Monitor'),
+                           headers={'If-Match': pedido[:-1] + '-br"'})
+    assert response.status_code == 200
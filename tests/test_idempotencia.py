@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from src.database import RespostaIdempotente, Usuario, db
+from src.idempotencia import _impressao
+from tests.conftest import PEDIDO
+
+CHAVE = {'Idempotency-Key': 'chave-1'}
+
+
+def _reservar(app, status=None, corpo=None):
+    """
+    Registra a chave 'chave-1' do usuário administrador para o cadastro de PEDIDO, como se a primeira requisição
+    estivesse em execução em outro processo (sem status) ou concluída.
+    """
+    with app.test_request_context('/api/pedidos', method='POST', json=PEDIDO):
+        impressao = _impressao()
+
+    with app.app_context():
+        usuario = Usuario.query.filter_by(email='admin@admin.dev').one()
+        agora = datetime.now()
+        db.session.add(RespostaIdempotente(chave='chave-1', usuario_id=usuario.id, requisicao=impressao,
+                                           status=status, corpo=corpo, criado_em=agora,
+                                           expira_em=agora + timedelta(seconds=60)))
+        db.session.commit()
+
+
+def test_repeticao_retorna_resposta_armazenada(cliente):
+    """
+    A repetição da requisição com a mesma chave retorna a resposta armazenada, sem cadastrar o pedido novamente.
+    """
+    primeira = cliente.post('/api/pedidos', json=PEDIDO, headers=CHAVE)
+    assert primeira.status_code == 201
+    assert 'Idempotent-Replayed' not in primeira.headers
+
+    repetida = cliente.post('/api/pedidos', json=PEDIDO, headers=CHAVE)
+    assert repetida.status_code == 201
+    assert repetida.headers['Idempotent-Replayed'] == 'true'
+    assert repetida.headers['ETag'] == primeira.headers['ETag']
+    assert repetida.get_json() == primeira.get_json()
+
+    assert len(cliente.get('/api/pedidos').get_json()['pedidos']) == 1
+
+
+def test_chave_utilizada_em_outra_requisicao(cliente):
+    """
+    A chave utilizada em uma requisição não pode ser utilizada com outro corpo: é retornado o status 422.
+    """
+    assert cliente.post('/api/pedidos', json=PEDIDO, headers=CHAVE).status_code == 201
+
+    response = cliente.post('/api/pedidos', json=dict(PEDIDO, numero=2), headers=CHAVE)
+    assert response.status_code == 422
+    assert cliente.get('/api/pedidos/SE/2').status_code == 404
+
+
+def test_requisicao_em_execucao(monkeypatch, app, cliente):
+    """
+    Enquanto a primeira requisição está em execução, a repetição aguarda a sua conclusão até a espera máxima, e
+    então retorna o status 409 com o cabeçalho 'Retry-After'.
+    """
+    monkeypatch.setitem(app.config, 'IDEMPOTENCIA_ESPERA_MAXIMA', 0.2)
+    _reservar(app)
+
+    response = cliente.post('/api/pedidos', json=PEDIDO, headers=CHAVE)
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+    assert cliente.get('/api/pedidos/SE/1').status_code == 404
+
+
+def test_requisicao_concluida_durante_a_espera(app, cliente):
+    """
+    Caso a primeira requisição seja concluída durante a espera, a repetição retorna a resposta armazenada.
+    """
+    _reservar(app)
+
+    def concluir():
+        time.sleep(0.3)
+        with app.app_context():
+            registro = RespostaIdempotente.query.filter_by(chave='chave-1').one()
+            registro.status = 201
+            registro.cabecalhos = json.dumps([('Content-Type', 'application/json')])
+            registro.corpo = b'{"pedido": {"numero": 1}}'
+            db.session.commit()
+
+    concluidora = threading.Thread(target=concluir)
+    concluidora.start()
+    try:
+        response = cliente.post('/api/pedidos', json=PEDIDO, headers=CHAVE)
+    finally:
+        concluidora.join()
+
+    assert response.status_code == 201
+    assert response.headers['Idempotent-Replayed'] == 'true'
+    assert response.get_json() == {'pedido': {'numero': 1}}
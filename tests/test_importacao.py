@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from src.database import db
+from tests.conftest import PEDIDO
+
+
+def _importar(cliente, *pedidos):
+    """
+    Importa os pedidos informados em um arquivo NDJSON, retornando a resposta da importação.
+    """
+    return cliente.post('/api/pedidos/bulk', data='\n'.join(json.dumps(pedido) for pedido in pedidos),
+                        headers={'Content-Type': 'application/x-ndjson'})
+
+
+def test_importacao_atualiza_resumo_apenas_dos_pedidos_importados(cliente):
+    """
+    Ao importar um pedido, o resumo das estatísticas desconta apenas os valores anteriores do mesmo pedido (mesmo tipo
+    e número), e não os de um pedido de outro tipo com o mesmo número.
+    """
+    assert cliente.post('/api/pedidos', json=dict(PEDIDO, tipo='RM', numero=7)).status_code == 201
+
+    response = _importar(cliente, dict(PEDIDO, tipo='SE', numero=7, secretaria_solicitante='EDUCACAO'))
+    assert response.status_code == 200
+    assert response.get_json()['importados'] == 1
+
+    grupos = cliente.get('/api/pedidos/stats?agrupar=tipo,secretaria_solicitante').get_json()['grupos']
+    assert [(grupo['tipo'], grupo['secretaria_solicitante'], grupo['quantidade']) for grupo in grupos] == [
+        ('RM', 'SAUDE', 1), ('SE', 'EDUCACAO', 1)]
+
+
+def test_importacao_nao_bloqueia_pedidos_de_outro_tipo(tempo_maximo, app, cliente):
+    """
+    A importação bloqueia (SELECT ... FOR UPDATE) apenas os pedidos do lote: um pedido de mesmo número e outro tipo,
+    bloqueado por outra transação, não impede a importação. O SQLite não possui bloqueios de linhas.
+    """
+    assert cliente.post('/api/pedidos', json=dict(PEDIDO, tipo='RM', numero=7)).status_code == 201
+
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip('Requer o PostgreSQL (TESTES_DATABASE_URL).')
+
+        with db.engine.connect() as conexao, conexao.begin():
+            conexao.execute(text("SELECT id FROM pedidos WHERE tipo = 'RM' AND numero = 7 FOR UPDATE"))
+
+            response = _importar(cliente, dict(PEDIDO, tipo='SE', numero=7))
+            assert response.status_code == 200
+            assert response.get_json()['importados'] == 1
+
+
+def test_importacao_rejeita_apenas_pedidos_arquivados(app, cliente):
+    """
+    Apenas o pedido arquivado (mesmo tipo e número) é rejeitado na importação: o pedido de outro tipo com o mesmo
+    número é importado.
+    """
+    arquivado = dict(PEDIDO, numero=8, data_envio_financeiro='2010-01-01', data_retorno_financeiro='2010-02-01')
+    assert cliente.post('/api/pedidos', json=arquivado).status_code == 201
+    assert app.test_cli_runner().invoke(args=['archive_pedidos']).output == '1 pedidos arquivados.\n'
+
+    response = _importar(cliente, dict(PEDIDO, tipo='SE', numero=8), dict(PEDIDO, tipo='RM', numero=8))
+    assert response.status_code == 200
+    assert response.get_json()['importados'] == 1
+    assert response.get_json()['erros'] == [{'linha': 1, 'error': 'Pedido já cadastrado (arquivado).'}]
+
+    assert cliente.get('/api/pedidos/RM/8').status_code == 200
+    assert cliente.post('/api/pedidos', json=dict(PEDIDO, numero=8)).status_code == 409
+
+
+def test_importacao_conta_pedidos_repetidos_uma_vez(cliente):
+    """
+    As ocorrências repetidas de um pedido no mesmo lote resultam em um único pedido importado (com os valores da
+    última ocorrência), e são indicadas em 'duplicados'.
+    """
+    response = _importar(cliente, PEDIDO, dict(PEDIDO, numero=2), dict(PEDIDO, descricao='Impressora'))
+    assert response.status_code == 200
+    assert (response.get_json()['importados'], response.get_json()['duplicados']) == (2, 1)
+
+    assert cliente.get('/api/pedidos/SE/1').get_json()['pedido']['descricao'] == 'Impressora'
@@ -0,0 +1,28 @@
+import pytest
+
+from src import instrumentacao
+from tests.conftest import PEDIDO
+
+
+@pytest.fixture
+def consultas_lentas(monkeypatch):
+    """
+    Registra todas as consultas como lentas, com o plano de execução, e torna inválido o comando EXPLAIN. Deve ser
+    informada antes da aplicação.
+    """
+    monkeypatch.setenv('CONSULTA_LENTA_MS', '0')
+    monkeypatch.setenv('CONSULTA_LENTA_EXPLAIN', '1')
+    for dialeto in ('postgresql', 'sqlite'):
+        monkeypatch.setitem(instrumentacao.PREFIXOS_EXPLAIN, dialeto, 'EXPLAIN INVALIDO ')
+
+
+def test_falha_do_plano_de_execucao_nao_invalida_a_transacao(consultas_lentas, cliente, caplog):
+    """
+    Uma falha ao obter o plano de execução de uma consulta lenta é registrada no log, sem invalidar a transação da
+    requisição (no PostgreSQL, um erro invalida a transação inteira).
+    """
+    response = cliente.post('/api/pedidos', json=PEDIDO)
+    assert response.status_code == 201
+    assert cliente.get('/api/pedidos/SE/1').status_code == 200
+
+    assert 'Falha ao obter o plano de execução' in caplog.text
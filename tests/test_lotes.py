@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import text
+
+from src.database import db
+from tests.conftest import PEDIDO
+
+
+def _cadastrar(cliente, *chaves):
+    """
+    Cadastra um pedido para cada chave (tipo, número) informada.
+    """
+    for tipo, numero in chaves:
+        assert cliente.post('/api/pedidos', json=dict(PEDIDO, tipo=tipo, numero=numero)).status_code == 201
+
+
+def test_alteracao_em_lote_retorna_resultado_de_cada_pedido(cliente):
+    """
+    Cada pedido informado recebe o seu resultado, na ordem da requisição: os pedidos de mesmo número e outro tipo
+    não são alterados.
+    """
+    _cadastrar(cliente, ('SE', 1), ('SE', 2), ('RM', 2), ('RM', 3))
+
+    response = cliente.patch('/api/pedidos', json={
+        'pedidos': [
+            {'tipo': 'SE', 'numero': 3},
+            {'tipo': 'SE', 'numero': 2, 'versao': 1},
+            {'tipo': 'SE', 'numero': 1, 'versao': 5},
+        ],
+        'alteracoes': {'projeto': 'Alterado'},
+    })
+    assert response.status_code == 200
+    assert response.get_json()['atualizados'] == 1
+    assert [(resultado['tipo'], resultado['numero'], resultado['status'])
+            for resultado in response.get_json()['resultados']] == [
+        ('SE', 3, 'nao_encontrado'), ('SE', 2, 'atualizado'), ('SE', 1, 'conflito')]
+    assert response.get_json()['resultados'][2]['versao'] == 1
+
+    assert cliente.get('/api/pedidos/SE/2').get_json()['pedido']['projeto'] == 'Alterado'
+    for tipo, numero in (('SE', 1), ('RM', 2), ('RM', 3)):
+        assert cliente.get('/api/pedidos/{}/{}'.format(tipo, numero)).get_json()['pedido']['projeto'] == 'Projeto'
+
+
+def test_exclusao_em_lote_mantem_pedidos_de_outro_tipo(cliente):
+    """
+    A exclusão em lote exclui apenas os pedidos informados, mantendo os pedidos de mesmo número e outro tipo.
+    """
+    _cadastrar(cliente, ('SE', 5), ('RM', 5))
+
+    response = cliente.delete('/api/pedidos', json={'pedidos': [{'tipo': 'SE', 'numero': 5}]})
+    assert response.status_code == 200
+    assert response.get_json()['resultados'] == [{'tipo': 'SE', 'numero': 5, 'status': 'excluido'}]
+
+    assert cliente.get('/api/pedidos/SE/5').status_code == 404
+    assert cliente.get('/api/pedidos/RM/5').status_code == 200
+
+
+def test_alteracao_em_lote_nao_bloqueia_pedidos_de_outro_tipo(tempo_maximo, app, cliente):
+    """
+    A seleção em lote bloqueia (SELECT ... FOR UPDATE) apenas os pedidos informados: um pedido de mesmo número e
+    outro tipo, bloqueado por outra transação, não impede a alteração. O SQLite não possui bloqueios de linhas.
+    """
+    _cadastrar(cliente, ('SE', 10), ('RM', 10))
+
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip('Requer o PostgreSQL (TESTES_DATABASE_URL).')
+
+        with db.engine.connect() as conexao, conexao.begin():
+            conexao.execute(text("SELECT id FROM pedidos WHERE tipo = 'RM' AND numero = 10 FOR UPDATE"))
+
+            response = cliente.patch('/api/pedidos', json={
+                'pedidos': [{'tipo': 'SE', 'numero': 10}],
+                'alteracoes': {'projeto': 'Alterado'},
+            })
+            assert response.status_code == 200
+            assert response.get_json()['atualizados'] == 1
+
+
+def test_selecao_por_filtro_acima_do_limite_nao_altera_pedidos(monkeypatch, cliente):
+    """
+    A seleção por filtro altera todos os pedidos selecionados, exceto quando a seleção excede o limite de pedidos da
+    operação: nesse caso, nenhum pedido é alterado.
+    """
+    _cadastrar(cliente, ('SE', 1), ('SE', 2), ('RM', 1))
+    alteracoes = {'alteracoes': {'projeto': 'Alterado'}}
+
+    monkeypatch.setitem(cliente.application.config, 'PEDIDOS_LIMITE_MAXIMO', 1)
+    response = cliente.patch('/api/pedidos', json=dict(alteracoes, filtro={'tipo': 'SE'}))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'A operação excede o limite de 1 pedidos.'
+
+    monkeypatch.setitem(cliente.application.config, 'PEDIDOS_LIMITE_MAXIMO', 2)
+    response = cliente.patch('/api/pedidos', json=dict(alteracoes, filtro={'tipo': 'SE'}))
+    assert response.status_code == 200
+    assert [(resultado['tipo'], resultado['numero'], resultado['status'])
+            for resultado in response.get_json()['resultados']] == [('SE', 1, 'atualizado'), ('SE', 2, 'atualizado')]
+    assert cliente.get('/api/pedidos/RM/1').get_json()['pedido']['projeto'] == 'Projeto'
@@ -0,0 +1,56 @@
+import base64
+import json
+
+import pytest
+
+from tests.conftest import PEDIDO
+
+
+def _cursor(dados) -> str:
+    """
+    Codifica os dados informados no formato do cursor da paginação.
+    """
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip('=')
+
+
+def test_paginacao_por_cursor(cliente):
+    """
+    O cursor retornado em cada página busca a página seguinte, até a última página, que não possui cursor.
+    """
+    for numero in range(1, 6):
+        assert cliente.post('/api/pedidos', json=dict(PEDIDO, numero=numero)).status_code == 201
+
+    numeros, uri = [], '/api/pedidos?limit=2&ordem=numero'
+    while uri:
+        pagina = cliente.get(uri).get_json()
+        numeros += [pedido['numero'] for pedido in pagina['pedidos']]
+        uri = pagina['links']['next'] if pagina.get('next_cursor') else None
+
+    assert numeros == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize('cursor', [
+    '!!!',
+    _cursor({'ordem': 'numero'}),
+    _cursor(['data_chegada', 'SE', 1]),
+    _cursor(['numero', 'SE']),
+    _cursor(['numero', 'SE', '1']),
+    _cursor(['numero', None, 1]),
+    _cursor(['numero', 'SE', [1]]),
+    _cursor(['data_chegada', '2021-13-01', 1]),
+])
+def test_cursor_invalido(cliente, cursor):
+    """
+    Um cursor inválido (adulterado ou gerado para outra ordenação) retorna o status 400, e não um erro do servidor.
+    """
+    response = cliente.get('/api/pedidos?limit=2&ordem=numero&cursor=' + cursor)
+    assert response.status_code == 400
+
+
+def test_cursor_sem_limite(cliente):
+    """
+    O cursor não é ignorado quando o parâmetro 'limit' não é informado: é retornado o status 400.
+    """
+    response = cliente.get('/api/pedidos?ordem=numero&cursor=' + _cursor(['numero', 'SE', 1]))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'O parâmetro "cursor" exige o parâmetro "limit".'